@@ -1,373 +1,45 @@
+import datetime
+import logging
+import math
+import os
+from functools import partial
+
+import altair as alt
+import numpy as np
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-import base64
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
+
+from calculo_cuotas import (CACHE_CUOTAS, COLUMNAS_PRESTAMO, COLUMNAS_RESUMEN,
+                            CONVENCIONES, FREQ_DICT, REGISTRO_METRICAS,
+                            abonos_recurrentes, barrer_escenarios,
+                            calcular_cronograma_abonos,
+                            calcular_cronograma_cacheado,
+                            calcular_cronograma_fechas,
+                            calcular_cronograma_reajustes, clave_prestamo,
+                            convencion_defecto,
+                            escribir_metricas, exportar_cacheado,
+                            formatear_tabla, matriz_escenarios, monto_maximo,
+                            plazo_minimo, resumen_escenarios,
+                            reajustes_periodicos, resumir_abonos_prestamo,
+                            resumir_prestamo, servir_metricas,
+                            tasa_implicita, tcea_cronograma, tcea_prestamo)
 
 # Configure the Streamlit page
 st.set_page_config(page_title="Cuotas de Préstamo", layout="wide")
 
+# Optional metrics export, configured through environment variables:
+# a Prometheus endpoint, a Prometheus text file and JSON logs per stage
+if os.environ.get("CALCULO_CUOTAS_METRICAS_PUERTO"):
+    servir_metricas(int(os.environ["CALCULO_CUOTAS_METRICAS_PUERTO"]))
+if os.environ.get("CALCULO_CUOTAS_LOG_METRICAS"):
+    registro_log = logging.getLogger("calculo_cuotas.metricas")
+    if not registro_log.handlers:
+        registro_log.addHandler(logging.StreamHandler())
+        registro_log.setLevel(logging.INFO)
+
 # Enhanced CSS for beautiful design
-st.markdown("""
-    <style>
-    /* Global app styling */
-    .stApp {
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }
-    
-    /* Header styling */
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        text-align: center;
-        margin-bottom: 2.5rem;
-        box-shadow: 0 15px 35px rgba(102, 126, 234, 0.3);
-        position: relative;
-        overflow: hidden;
-    }
-    .main-header::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: url("data:image/svg+xml,%3Csvg width='40' height='40' viewBox='0 0 40 40' xmlns='http://www.w3.org/2000/svg'%3E%3Cg fill='%23ffffff' fill-opacity='0.05'%3E%3Cpath d='M20 20c0 11.046-8.954 20-20 20v20h40V20H20z'/%3E%3C/g%3E%3C/svg%3E") repeat;
-    }
-    .main-title {
-        color: white;
-        font-size: 3rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-        text-shadow: 2px 2px 8px rgba(0,0,0,0.3);
-        position: relative;
-        z-index: 1;
-    }
-    .subtitle {
-        color: #e0e6ff;
-        font-size: 1.2rem;
-        margin: 0;
-        font-weight: 300;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /* Form container styling */
-    .form-container {
-        background: rgba(255, 255, 255, 0.95);
-        padding: 2.5rem;
-        border-radius: 20px;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
-        margin-bottom: 2rem;
-        border: 1px solid rgba(255, 255, 255, 0.8);
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Input sections */
-    .input-section {
-        background: linear-gradient(135deg, #f8f9ff 0%, #e6f2ff 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        margin-bottom: 1.5rem;
-        border: 1px solid #e1e8ff;
-        box-shadow: 0 5px 15px rgba(102, 126, 234, 0.08);
-        transition: all 0.3s ease;
-    }
-    .input-section:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.15);
-    }
-    
-    /* Result boxes with enhanced animations */
-    .result-box {
-        background: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 20px;
-        text-align: center;
-        margin: 0.5rem 0;
-        box-shadow: 0 10px 30px rgba(17, 153, 142, 0.3);
-        transition: all 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        position: relative;
-        overflow: hidden;
-    }
-    .result-box:hover {
-        transform: translateY(-5px) scale(1.02);
-        box-shadow: 0 15px 40px rgba(17, 153, 142, 0.4);
-    }
-    .result-box::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.2), transparent);
-        transition: left 0.6s;
-    }
-    .result-box:hover::before {
-        left: 100%;
-    }
-    .result-amount {
-        font-size: 2rem;
-        font-weight: 800;
-        margin: 0.5rem 0;
-        text-shadow: 2px 2px 8px rgba(0,0,0,0.3);
-        position: relative;
-        z-index: 1;
-    }
-    .result-box h4 {
-        margin: 0 0 0.8rem 0;
-        font-size: 1rem;
-        opacity: 0.95;
-        font-weight: 600;
-        position: relative;
-        z-index: 1;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    .result-box p {
-        margin: 0.5rem 0 0 0;
-        font-size: 0.9rem;
-        opacity: 0.9;
-        position: relative;
-        z-index: 1;
-    }
-    
-    /* Loan information card */
-    .loan-info {
-        background: linear-gradient(135deg, #ffffff 0%, #f8f9ff 100%);
-        padding: 2rem;
-        border-radius: 20px;
-        border: 1px solid #e1e8ff;
-        margin: 1.5rem 0;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-        position: relative;
-        overflow: hidden;
-    }
-    .loan-info::before {
-        content: '';
-        position: absolute;
-        left: 0;
-        top: 0;
-        bottom: 0;
-        width: 5px;
-        background: linear-gradient(180deg, #667eea 0%, #764ba2 100%);
-        border-radius: 0 5px 5px 0;
-    }
-    .loan-info h4 {
-        color: #2c3e50;
-        margin: 0 0 1.5rem 0;
-        font-weight: 700;
-        font-size: 1.3rem;
-        display: flex;
-        align-items: center;
-        gap: 0.8rem;
-    }
-    
-    /* Info grid enhanced */
-    .info-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-        gap: 1.2rem;
-        margin-top: 1.5rem;
-    }
-    .info-item {
-        background: rgba(255, 255, 255, 0.9);
-        padding: 1.2rem;
-        border-radius: 12px;
-        border: 1px solid rgba(102, 126, 234, 0.1);
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    }
-    .info-item:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 5px 15px rgba(102, 126, 234, 0.15);
-        border-color: rgba(102, 126, 234, 0.3);
-    }
-    .info-item strong {
-        color: #2c3e50;
-        display: block;
-        margin-bottom: 0.5rem;
-        font-size: 0.9rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    .info-item span {
-        color: #667eea;
-        font-size: 1.1rem;
-        font-weight: 700;
-    }
-    
-    /* Enhanced buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 30px;
-        padding: 1rem 2.5rem;
-        font-weight: 700;
-        font-size: 1.1rem;
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3);
-        transition: all 0.3s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    .stButton > button:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 10px 25px rgba(102, 126, 234, 0.4);
-        background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-    }
-    
-    /* Download section */
-    .download-section {
-        background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        text-align: center;
-        margin-top: 3rem;
-        border: 2px dashed #dee2e6;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-    }
-    .download-section h3 {
-        color: #2c3e50;
-        margin-bottom: 1rem;
-        font-weight: 700;
-    }
-    .download-button {
-        display: inline-block;
-        padding: 15px 30px;
-        margin: 0.5rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        text-decoration: none;
-        border-radius: 30px;
-        font-weight: 700;
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3);
-        transition: all 0.3s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-size: 0.9rem;
-    }
-    .download-button:hover {
-        transform: translateY(-3px);
-        text-decoration: none;
-        color: white;
-        box-shadow: 0 10px 25px rgba(102, 126, 234, 0.4);
-        background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-    }
-    
-    /* Results container */
-    .results-container {
-        margin: 2.5rem 0;
-    }
-    .results-title {
-        color: #2c3e50;
-        font-size: 2.2rem;
-        font-weight: 700;
-        margin-bottom: 2rem;
-        text-align: center;
-        position: relative;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-    }
-    .results-title::after {
-        content: '';
-        position: absolute;
-        bottom: -10px;
-        left: 50%;
-        transform: translateX(-50%);
-        width: 80px;
-        height: 4px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 2px;
-    }
-    
-    /* Enhanced grid */
-    .compact-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-        gap: 1.5rem;
-        margin: 2rem 0;
-    }
-    
-    /* Custom scrollbar */
-    .stDataFrame {
-        border-radius: 15px;
-        overflow: hidden;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-    }
-    
-    /* Enhanced selectbox and inputs */
-    .stSelectbox > div > div {
-        border-radius: 10px;
-        border: 2px solid #e1e8ff;
-        transition: all 0.3s ease;
-    }
-    .stSelectbox > div > div:focus-within {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    .stNumberInput > div > div > input {
-        border-radius: 10px;
-        border: 2px solid #e1e8ff;
-        transition: all 0.3s ease;
-    }
-    .stNumberInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    .stTextInput > div > div > input {
-        border-radius: 10px;
-        border: 2px solid #e1e8ff;
-        transition: all 0.3s ease;
-    }
-    .stTextInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    
-    /* Section headers */
-    h3 {
-        color: #2c3e50;
-        font-weight: 700;
-        margin-bottom: 1.5rem;
-        font-size: 1.4rem;
-    }
-    
-    /* Footer styling */
-    .footer {
-        background: linear-gradient(135deg, #2c3e50 0%, #34495e 100%);
-        color: white;
-        text-align: center;
-        padding: 2rem;
-        border-radius: 15px;
-        margin-top: 3rem;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-    }
-    
-    /* Responsive design */
-    @media (max-width: 768px) {
-        .main-title {
-            font-size: 2.2rem;
-        }
-        .compact-grid {
-            grid-template-columns: 1fr;
-        }
-        .info-grid {
-            grid-template-columns: 1fr;
-        }
-    }
-    </style>
-""",
-            unsafe_allow_html=True)
+with open(os.path.join(os.path.dirname(__file__), "estilos.css"),
+          encoding="utf-8") as estilos:
+    st.markdown(f"<style>\n{estilos.read()}</style>", unsafe_allow_html=True)
 
 # Enhanced header with icon and title
 st.markdown("""
@@ -378,396 +50,6 @@ st.markdown("""
 """,
             unsafe_allow_html=True)
 
-
-def calcular_seguro_danos(monto_asegurar, porcentaje_seguro_danos,
-                          impuesto_danos, bomberos_danos, papeleria_danos):
-    """
-    Calculate damage insurance based on the correct formula.
-    
-    Args:
-        monto_asegurar: Amount to insure
-        porcentaje_seguro_danos: Insurance percentage
-        impuesto_danos: Tax percentage
-        bomberos_danos: Firefighters percentage
-        papeleria_danos: Fixed paperwork expense
-        
-    Returns:
-        Monthly payment amount
-    """
-    if monto_asegurar <= 0:
-        return 0
-
-    # Fórmula: cantidad_asegurar / 1000 * porcentaje
-    seguro_base = (monto_asegurar / 1000) * porcentaje_seguro_danos
-    impuesto = seguro_base * (impuesto_danos / 100)
-    bomberos = seguro_base * (bomberos_danos / 100)
-
-    total_anual = seguro_base + impuesto + bomberos + papeleria_danos
-    pago_mensual = total_anual / 12
-
-    return pago_mensual
-
-
-def calcular_seguro_vehiculo(monto_vehiculo, porcentaje_seguro_vehiculo,
-                             impuesto_vehiculo, gasto_vehiculo):
-    """
-    Calculate vehicle insurance based on amount, percentage, tax and expenses.
-    
-    Args:
-        monto_vehiculo: Vehicle value
-        porcentaje_seguro_vehiculo: Insurance percentage
-        impuesto_vehiculo: Tax percentage (e.g., 15%)
-        gasto_vehiculo: Fixed expense amount
-        
-    Returns:
-        Monthly payment amount
-    """
-    if monto_vehiculo <= 0:
-        return 0
-
-    # Fórmula: valor_vehiculo * porcentaje / 100
-    seguro_base = monto_vehiculo * (porcentaje_seguro_vehiculo / 100)
-    impuesto = seguro_base * (impuesto_vehiculo / 100)
-
-    total_anual = seguro_base + impuesto + gasto_vehiculo
-    pago_mensual = total_anual / 12
-
-    return pago_mensual
-
-
-def calcular_cuotas_df(monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
-                       incluir_seguro, porcentaje_seguro, incluir_seguro_danos,
-                       monto_asegurar, porcentaje_seguro_danos, impuesto_danos,
-                       bomberos_danos, papeleria_danos,
-                       incluir_seguro_vehiculo, monto_vehiculo,
-                       porcentaje_seguro_vehiculo, impuesto_vehiculo,
-                       gasto_vehiculo):
-    """
-    Calculate loan amortization schedule with different payment frequencies and types.
-    
-    Args:
-        monto: Loan amount
-        tasa_anual: Annual interest rate (percentage)
-        plazo_meses: Loan term in months
-        frecuencia: Payment frequency
-        tipo_cuota: Payment type (Nivelada or Saldos Insolutos)
-        incluir_seguro: Whether to include insurance
-        porcentaje_seguro: Insurance percentage per 1000
-    
-    Returns:
-        DataFrame with amortization schedule
-    """
-    # Dictionary mapping payment frequencies to payments per year
-    freq_dict = {
-        'Diario': 360,
-        'Semanal': 52,
-        'Quincenal': 24,
-        'Mensual': 12,
-        'Bimensual': 6,
-        'Trimestral': 4,
-        'Cuatrimestral': 3,
-        'Semestral': 2,
-        'Anual': 1,
-        'Al vencimiento': 0
-    }
-
-    pagos_por_año = freq_dict[frecuencia]
-
-    # Calculate damage insurance per payment
-    pago_mensual_seguro_danos = calcular_seguro_danos(
-        monto_asegurar if incluir_seguro_danos == 'Sí' else 0,
-        porcentaje_seguro_danos if incluir_seguro_danos == 'Sí' else 0,
-        impuesto_danos if incluir_seguro_danos == 'Sí' else 0,
-        bomberos_danos if incluir_seguro_danos == 'Sí' else 0,
-        papeleria_danos if incluir_seguro_danos == 'Sí' else 0)
-
-    # Calculate vehicle insurance per payment
-    pago_mensual_seguro_vehiculo = calcular_seguro_vehiculo(
-        monto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
-        porcentaje_seguro_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
-        impuesto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
-        gasto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0)
-
-    # Handle "At maturity" payment
-    if pagos_por_año == 0:
-        tasa_total = tasa_anual / 100 * (plazo_meses / 12)
-        interes = monto * tasa_total
-        abono = monto
-        seguro = 0
-        cuota_total = interes + abono
-        seguro_danos = pago_mensual_seguro_danos * plazo_meses if incluir_seguro_danos == 'Sí' else 0
-        seguro_vehiculo = pago_mensual_seguro_vehiculo * plazo_meses if incluir_seguro_vehiculo == 'Sí' else 0
-        return pd.DataFrame([{
-            "Pago": 1,
-            "Cuota": cuota_total + seguro_danos + seguro_vehiculo,
-            "Interés": interes,
-            "Abono": abono,
-            "Seguro de Préstamo": seguro,
-            "Seguro Daños": seguro_danos,
-            "Seguro Vehículo": seguro_vehiculo,
-            "Saldo": 0
-        }])
-
-    # Calculate number of payments and interest rate per period
-    n_pagos = int(plazo_meses * pagos_por_año / 12)
-    tasa_periodo = tasa_anual / 100 / pagos_por_año
-    saldo = monto
-
-    # Calculate reference values for insurance calculation
-    ref_cuota_dict = {
-        'Diario': 360,
-        'Semanal': 52,
-        'Quincenal': 24,
-        'Mensual': 12,
-        'Bimensual': 6,
-        'Trimestral': 4,
-        'Cuatrimestral': 3,
-        'Semestral': 2,
-        'Anual': 1
-    }
-    ref_cuota = min(ref_cuota_dict.get(frecuencia, 1), n_pagos)
-    saldo_referencia = monto
-
-    # Calculate base payment amount and reference balance for insurance
-    cuota_base = 0  # Initialize to avoid unbound variable
-    if tipo_cuota == 'Nivelada':
-        # Level payment calculation using PMT formula
-        cuota_base = monto * (tasa_periodo * (1 + tasa_periodo)**n_pagos) / (
-            (1 + tasa_periodo)**n_pagos - 1)
-        # Simulate payments to get reference balance
-        for _ in range(ref_cuota):
-            interes = saldo_referencia * tasa_periodo
-            abono = cuota_base - interes
-            saldo_referencia -= abono
-    else:
-        # Declining balance payment - fixed principal payment
-        abono_fijo = monto / n_pagos
-        for _ in range(ref_cuota):
-            interes = saldo_referencia * tasa_periodo
-            saldo_referencia -= abono_fijo
-
-    # Calculate insurance amount per payment
-    seguro_unitario = 0
-    if incluir_seguro == 'Sí':
-        divisor = freq_dict[frecuencia]
-        seguro_unitario = (saldo_referencia /
-                           1000) * porcentaje_seguro * 12 / divisor
-
-    # Calculate damage and vehicle insurance per payment based on frequency
-    seguro_danos_por_pago = 0
-    seguro_vehiculo_por_pago = 0
-
-    if incluir_seguro_danos == 'Sí':
-        if frecuencia == 'Mensual':
-            seguro_danos_por_pago = pago_mensual_seguro_danos
-        elif frecuencia == 'Quincenal':
-            seguro_danos_por_pago = pago_mensual_seguro_danos / 2
-        elif frecuencia == 'Semanal':
-            seguro_danos_por_pago = pago_mensual_seguro_danos / 4.33
-        elif frecuencia == 'Diario':
-            seguro_danos_por_pago = pago_mensual_seguro_danos / 30
-        else:
-            # For other frequencies, calculate proportionally
-            pagos_mensuales = freq_dict[frecuencia] / 12 if freq_dict[
-                frecuencia] > 0 else 0
-            seguro_danos_por_pago = pago_mensual_seguro_danos / pagos_mensuales if pagos_mensuales > 0 else 0
-
-    if incluir_seguro_vehiculo == 'Sí':
-        if frecuencia == 'Mensual':
-            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo
-        elif frecuencia == 'Quincenal':
-            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 2
-        elif frecuencia == 'Semanal':
-            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 4.33
-        elif frecuencia == 'Diario':
-            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 30
-        else:
-            # For other frequencies, calculate proportionally
-            pagos_mensuales = freq_dict[frecuencia] / 12 if freq_dict[
-                frecuencia] > 0 else 0
-            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / pagos_mensuales if pagos_mensuales > 0 else 0
-
-    # Calculate number of payments that include insurance (not last year)
-    cuotas_con_seguro = max(0, n_pagos -
-                            pagos_por_año) if pagos_por_año > 0 else n_pagos
-    cuotas_con_seguro_danos = max(
-        0, n_pagos - pagos_por_año) if pagos_por_año > 0 else n_pagos
-    cuotas_con_seguro_vehiculo = max(
-        0, n_pagos - pagos_por_año) if pagos_por_año > 0 else n_pagos
-
-    # Generate amortization schedule
-    datos = []
-    saldo = monto
-
-    # Generate amortization schedule
-    if tipo_cuota == 'Nivelada':
-        # Level payments - same payment amount each period
-        for i in range(1, n_pagos + 1):
-            interes = saldo * tasa_periodo
-            abono = cuota_base - interes
-            saldo -= abono
-            saldo = max(saldo, 0)  # Prevent negative balance
-
-            # Apply insurance for specified number of payments
-            seguro_aplicado = seguro_unitario if incluir_seguro == 'Sí' and i <= cuotas_con_seguro else 0
-            seguro_danos_aplicado = seguro_danos_por_pago if incluir_seguro_danos == 'Sí' and i <= cuotas_con_seguro_danos else 0
-            seguro_vehiculo_aplicado = seguro_vehiculo_por_pago if incluir_seguro_vehiculo == 'Sí' and i <= cuotas_con_seguro_vehiculo else 0
-            cuota_total = cuota_base + seguro_aplicado + seguro_danos_aplicado + seguro_vehiculo_aplicado
-
-            datos.append({
-                "Pago": i,
-                "Cuota": cuota_total,
-                "Interés": interes,
-                "Abono": abono,
-                "Seguro de Préstamo": seguro_aplicado,
-                "Seguro Daños": seguro_danos_aplicado,
-                "Seguro Vehículo": seguro_vehiculo_aplicado,
-                "Saldo": saldo
-            })
-    else:
-        # Declining balance - fixed principal, varying interest
-        abono_fijo = monto / n_pagos
-        for i in range(1, n_pagos + 1):
-            interes = saldo * tasa_periodo
-            cuota_base = abono_fijo + interes
-            saldo -= abono_fijo
-            saldo = max(saldo, 0)  # Prevent negative balance
-
-            # Apply insurance for specified number of payments
-            seguro_aplicado = seguro_unitario if incluir_seguro == 'Sí' and i <= cuotas_con_seguro else 0
-            seguro_danos_aplicado = seguro_danos_por_pago if incluir_seguro_danos == 'Sí' and i <= cuotas_con_seguro_danos else 0
-            seguro_vehiculo_aplicado = seguro_vehiculo_por_pago if incluir_seguro_vehiculo == 'Sí' and i <= cuotas_con_seguro_vehiculo else 0
-            cuota_total = cuota_base + seguro_aplicado + seguro_danos_aplicado + seguro_vehiculo_aplicado
-
-            datos.append({
-                "Pago": i,
-                "Cuota": cuota_total,
-                "Interés": interes,
-                "Abono": abono_fijo,
-                "Seguro de Préstamo": seguro_aplicado,
-                "Seguro Daños": seguro_danos_aplicado,
-                "Seguro Vehículo": seguro_vehiculo_aplicado,
-                "Saldo": saldo
-            })
-
-    df = pd.DataFrame(datos)
-    return df
-
-
-def convertir_a_excel(df):
-    """
-    Convert DataFrame to Excel format in memory.
-    
-    Args:
-        df: DataFrame to convert
-        
-    Returns:
-        BytesIO object containing Excel data
-    """
-    from io import BytesIO
-    output = BytesIO()
-
-    # Use openpyxl engine with explicit type specification
-    try:
-        with pd.ExcelWriter(output, engine='openpyxl', mode='w') as writer:
-            df.to_excel(writer, index=False, sheet_name='Amortización')
-    except Exception as e:
-        # Fallback: use a temporary file approach
-        import tempfile
-        import os
-        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
-            df.to_excel(tmp.name,
-                        index=False,
-                        sheet_name='Amortización',
-                        engine='openpyxl')
-            tmp.seek(0)
-            with open(tmp.name, 'rb') as f:
-                output.write(f.read())
-            os.unlink(tmp.name)
-
-    output.seek(0)
-    return output
-
-
-def generar_link_descarga_excel(df):
-    """
-    Generate download link for Excel file.
-    
-    Args:
-        df: DataFrame to export
-        
-    Returns:
-        HTML string with download link
-    """
-    excel_data = convertir_a_excel(df)
-    b64 = base64.b64encode(excel_data.read()).decode()
-    return f'<a href="data:application/octet-stream;base64,{b64}" download="tabla_amortizacion.xlsx">📅 Descargar Excel</a>'
-
-
-def convertir_a_pdf(df):
-    """
-    Convert DataFrame to PDF format in memory.
-    
-    Args:
-        df: DataFrame to convert
-        
-    Returns:
-        BytesIO object containing PDF data
-    """
-    output = BytesIO()
-    doc = SimpleDocTemplate(output, pagesize=letter)
-    styles = getSampleStyleSheet()
-
-    # Create document elements
-    elements = [
-        Paragraph("Tabla de Amortización", styles['Heading1']),
-        Spacer(1, 12)
-    ]
-
-    # Prepare table data with headers
-    data = [list(df.columns)] + df.values.tolist()
-
-    # Format numeric values in the data
-    for i in range(1, len(data)):
-        data[i] = [
-            f"{x:,.2f}" if isinstance(x, (int, float)) else str(x)
-            for x in data[i]
-        ]
-
-    # Create and style the table
-    table = Table(data)
-    table.setStyle(
-        TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0),
-             colors.HexColor("#003366")),  # Header background
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header text color
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Grid lines
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header font
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Center alignment
-            ('FONTSIZE', (0, 0), (-1, -1), 8),  # Font size
-        ]))
-
-    elements.append(table)
-    doc.build(elements)
-    output.seek(0)
-    return output
-
-
-def generar_link_descarga_pdf(df):
-    """
-    Generate download link for PDF file.
-    
-    Args:
-        df: DataFrame to export
-        
-    Returns:
-        HTML string with download link
-    """
-    pdf_data = convertir_a_pdf(df)
-    b64 = base64.b64encode(pdf_data.read()).decode()
-    return f'<a href="data:application/pdf;base64,{b64}" download="tabla_amortizacion.pdf">📄 Descargar PDF</a>'
-
-
 # -------------------- USER INTERFACE --------------------
 
 # Create enhanced form for loan parameters input
@@ -805,6 +87,12 @@ with st.form("formulario"):
                                 value=36,
                                 step=1,
                                 min_value=1)
+        # Optional budget: solve for the loan that fits this cuota
+        cuota_objetivo = st.number_input("🎯 Cuota objetivo (opcional)",
+                                         value=0.0,
+                                         min_value=0.0,
+                                         step=100.0,
+                                         format="%.2f")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
@@ -899,6 +187,63 @@ with st.form("formulario"):
             gasto_vehiculo = 0.0
         st.markdown('</div>', unsafe_allow_html=True)
 
+    # Optional extra payments ("what if I pay L. 5,000 more in month 12?")
+    with st.expander("💸 Abonos extraordinarios (opcional)"):
+        col_e, col_f = st.columns(2)
+        with col_e:
+            monto_abono = st.number_input("💵 Monto del abono",
+                                          value=0.0,
+                                          min_value=0.0,
+                                          step=500.0,
+                                          format="%.2f")
+            pago_abono = st.number_input("🔢 Junto con el pago número",
+                                         value=12,
+                                         min_value=1,
+                                         step=1)
+        with col_f:
+            cada_abono = st.number_input(
+                "🔁 Repetir cada (pagos, 0 = una sola vez)",
+                value=0,
+                min_value=0,
+                step=1)
+            modo_abono = st.radio("🎯 El abono reduce",
+                                  ['plazo', 'cuota'],
+                                  format_func={
+                                      'plazo': "El plazo (misma cuota)",
+                                      'cuota': "La cuota (mismo plazo)"
+                                  }.get)
+
+    # Optional variable rate: resets every few months
+    with st.expander("📈 Tasa variable (opcional)"):
+        col_g, col_h = st.columns(2)
+        with col_g:
+            cada_reajuste = st.number_input(
+                "🔄 Reajustar la tasa cada (meses, 0 = tasa fija)",
+                value=0,
+                min_value=0,
+                step=1)
+        with col_h:
+            tasas_reajuste_str = st.text_input(
+                "📈 Tasas de los reajustes (% anual, separadas por coma)",
+                value="")
+
+    # Optional real payment dates and day-count convention
+    with st.expander("📅 Fechas de pago (opcional)"):
+        usar_fechas = st.checkbox("📅 Calcular con fechas de pago reales",
+                                  value=False)
+        col_i, col_j = st.columns(2)
+        with col_i:
+            fecha_desembolso = st.date_input("🗓️ Fecha de desembolso",
+                                             value=datetime.date.today())
+        with col_j:
+            # 'Automática' (None) counts actual days for weekly and daily
+            # payments and 30/360 for payments whole months apart
+            convencion = st.selectbox(
+                "📐 Convención de días", [None] + list(CONVENCIONES),
+                format_func=lambda c: c or "Automática",
+                help="Automática: Actual/365 para pagos semanales y "
+                "diarios, 30/360 para el resto de frecuencias.")
+
     st.markdown("---")
 
     col_check, col_button = st.columns([3, 1])
@@ -915,13 +260,23 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # Process calculation when form is submitted
 if calcular:
-    # Calculate amortization schedule
-    df_resultado = calcular_cuotas_df(
-        monto, tasa, plazo, frecuencia, tipo_cuota, incluir_seguro,
-        porcentaje_seguro, incluir_seguro_danos, monto_asegurar,
-        porcentaje_seguro_danos, impuesto_danos, bomberos_danos,
-        papeleria_danos, incluir_seguro_vehiculo, monto_vehiculo,
-        porcentaje_seguro_vehiculo, impuesto_vehiculo, gasto_vehiculo)
+    marca_metricas = REGISTRO_METRICAS.marca()
+    argumentos = (monto, tasa, plazo, frecuencia, tipo_cuota, incluir_seguro,
+                  porcentaje_seguro, incluir_seguro_danos, monto_asegurar,
+                  porcentaje_seguro_danos, impuesto_danos, bomberos_danos,
+                  papeleria_danos, incluir_seguro_vehiculo, monto_vehiculo,
+                  porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                  gasto_vehiculo)
+
+    # The result boxes only need the closed-form summary; the full schedule
+    # is built further down, and only when the table is requested
+    resumen = resumir_prestamo(*argumentos)
+    if resumen["Pagos"] < 1 or not math.isfinite(resumen["Primera Cuota"]):
+        st.error("❌ No hay cuotas que calcular con estos datos. Revise el "
+                 "plazo, la frecuencia de pago y la tasa de interés.")
+        st.stop()
+    tcea = tcea_prestamo(*argumentos)
+    texto_tcea = f"{tcea:,.2f}%" if math.isfinite(tcea) else "No disponible"
 
     # Enhanced results section
     st.markdown("""
@@ -966,23 +321,28 @@ if calcular:
                 unsafe_allow_html=True)
 
     # Display payment information in attractive box
-    if len(df_resultado) == 1:
+    if resumen["Pagos"] == 1:
         # Single payment (at maturity)
-        cuota_final = df_resultado["Cuota"].iloc[0]
+        cuota_final = resumen["Primera Cuota"]
         st.markdown(f"""
             <div class='result-box'>
                 <h3>💵 Cuota a Pagar</h3>
                 <div class='result-amount'>L. {cuota_final:,.2f}</div>
                 <p>Pago único al vencimiento</p>
             </div>
+            <div class='result-box' style='background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);'>
+                <h3>💹 TCEA</h3>
+                <div class='result-amount'>{texto_tcea}</div>
+                <p>Costo efectivo anual, seguros incluidos</p>
+            </div>
         """,
                     unsafe_allow_html=True)
     else:
         # Multiple payments - show first payment amount
-        primera_cuota = df_resultado["Cuota"].iloc[0]
-        total_cuotas = len(df_resultado)
-        total_pago = df_resultado["Cuota"].sum()
-        total_intereses = df_resultado["Interés"].sum()
+        primera_cuota = resumen["Primera Cuota"]
+        total_cuotas = resumen["Pagos"]
+        total_pago = resumen["Total a Pagar"]
+        total_intereses = resumen["Total Intereses"]
 
         st.markdown(f"""
             <div class='compact-grid'>
@@ -1001,40 +361,165 @@ if calcular:
                     <div class='result-amount'>L. {total_intereses:,.2f}</div>
                     <p>Durante el préstamo</p>
                 </div>
+                <div class='result-box' style='background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);'>
+                    <h4>💹 TCEA</h4>
+                    <div class='result-amount'>{texto_tcea}</div>
+                    <p>Costo efectivo anual, seguros incluidos</p>
+                </div>
+            </div>
+        """,
+                    unsafe_allow_html=True)
+
+    reajustes = None
+    if cada_reajuste > 0 and tasas_reajuste_str.strip():
+        try:
+            tasas_reajuste = [float(valor) for valor in
+                              tasas_reajuste_str.replace(";", ",").split(",")
+                              if valor.strip()]
+        except ValueError:
+            st.error("❌ Ingrese las tasas de los reajustes como números "
+                     "separados por coma.")
+            st.stop()
+        reajustes = reajustes_periodicos(tasas_reajuste, cada_reajuste,
+                                         frecuencia)
+        if monto_abono > 0:
+            st.warning("⚠️ Los abonos extraordinarios no se aplican a "
+                       "préstamos con tasa variable.")
+            monto_abono = 0.0
+
+    fechas = None
+    if usar_fechas:
+        if reajustes is not None or monto_abono > 0:
+            st.warning("⚠️ Las fechas de pago reales no se combinan con "
+                       "abonos extraordinarios ni con tasa variable.")
+        else:
+            fechas = (fecha_desembolso, convencion)
+
+    abonos = None
+    if monto_abono > 0 and resumen["Pagos"] > 1:
+        if cada_abono > 0:
+            abonos = abonos_recurrentes(monto_abono, cada_abono,
+                                        resumen["Pagos"], desde=pago_abono)
+        else:
+            abonos = ([pago_abono], [monto_abono])
+        efecto = resumir_abonos_prestamo(*abonos, modo_abono, *argumentos)
+        st.markdown(f"""
+            <div class='loan-info'>
+                <h4>💸 Con abonos extraordinarios</h4>
+                <div class='info-grid'>
+                    <div class='info-item'>
+                        <strong>📅 Pagos</strong>
+                        <span>{efecto["Pagos con Abonos"]} de {efecto["Pagos"]}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>💵 Cuota después del abono</strong>
+                        <span>{f"L. {efecto['Cuota con Abonos']:,.2f}" if efecto["Cuota con Abonos"] else "Préstamo liquidado"}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>💰 Total abonado</strong>
+                        <span>L. {efecto["Total Abonos Extra"]:,.2f}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>📉 Ahorro en intereses</strong>
+                        <span>L. {efecto["Ahorro en Intereses"]:,.2f}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>🛡️ Ahorro en seguros</strong>
+                        <span>L. {efecto["Ahorro en Seguros"]:,.2f}</span>
+                    </div>
+                </div>
             </div>
         """,
                     unsafe_allow_html=True)
 
-    # Format DataFrame for display
-    df_format = df_resultado.copy()
-    for col in [
-            "Cuota", "Interés", "Abono", "Seguro de Préstamo", "Seguro Daños",
-            "Seguro Vehículo", "Saldo"
-    ]:
-        if col in df_format.columns:
-            df_format[col] = df_format[col].apply(lambda x: f"L. {x:,.2f}")
+    if cuota_objetivo > 0:
+        # Each answer changes one input and keeps the others as entered
+        prestamo = dict(zip(COLUMNAS_PRESTAMO, argumentos))
+        monto_objetivo = monto_maximo(prestamo, cuota_objetivo)[0]
+        plazo_objetivo = plazo_minimo(prestamo, cuota_objetivo)[0]
+        tasa_objetivo = tasa_implicita(prestamo, cuota_objetivo)[0]
+        sin_solucion = "Sin solución"
+        st.markdown(f"""
+            <div class='loan-info'>
+                <h4>🎯 Para una cuota de L. {cuota_objetivo:,.2f}</h4>
+                <div class='info-grid'>
+                    <div class='info-item'>
+                        <strong>💰 Monto máximo</strong>
+                        <span>{f"L. {monto_objetivo:,.2f}" if math.isfinite(monto_objetivo) else sin_solucion}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>📅 Plazo mínimo</strong>
+                        <span>{f"{plazo_objetivo:.0f} meses" if math.isfinite(plazo_objetivo) else sin_solucion}</span>
+                    </div>
+                    <div class='info-item'>
+                        <strong>📈 Tasa implícita</strong>
+                        <span>{f"{tasa_objetivo:.2f}% anual" if math.isfinite(tasa_objetivo) else sin_solucion}</span>
+                    </div>
+                </div>
+            </div>
+        """,
+                    unsafe_allow_html=True)
 
     st.markdown("---")
     st.markdown("## 🧾 Tabla de Amortización")
 
     if mostrar_tabla:
-        # Show table with or without insurance columns
+        # Calculate amortization schedule (memoized across sessions); the
+        # cached Cronograma is shared, never copied
+        if reajustes is not None:
+            cronograma = calcular_cronograma_reajustes(*argumentos,
+                                                       *reajustes)
+            st.caption("📈 La tabla aplica los reajustes de tasa; los "
+                       "totales de arriba usan la tasa inicial.")
+        elif fechas is not None:
+            try:
+                cronograma = calcular_cronograma_fechas(*argumentos, *fechas)
+            except ZeroDivisionError:
+                st.error("❌ El plazo no alcanza para un solo pago.")
+                st.stop()
+            usada = convencion or convencion_defecto(frecuencia)
+            st.caption(f"📅 Intereses y seguros según los días de cada "
+                       f"periodo ({usada}); los totales de arriba "
+                       f"usan periodos iguales.")
+        elif abonos is None:
+            cronograma = calcular_cronograma_cacheado(*argumentos)
+        else:
+            cronograma = calcular_cronograma_abonos(*argumentos, *abonos,
+                                                    modo_abono)
+
+        estadisticas_cache = CACHE_CUOTAS.estadisticas()
+        st.caption(
+            f"⚡ Caché de cálculos: {estadisticas_cache['aciertos']} aciertos, "
+            f"{estadisticas_cache['fallos']} fallos, "
+            f"{estadisticas_cache['entradas']} resultados guardados "
+            f"({estadisticas_cache['bytes'] / 1024:,.0f} KB)")
+
+        # Hide the insurance columns that do not apply; the view shares the
+        # schedule's arrays and is what gets shown and exported
         columns_to_drop = []
-        if incluir_seguro == 'No' and "Seguro de Préstamo" in df_format.columns:
+        if incluir_seguro == 'No':
             columns_to_drop.append("Seguro de Préstamo")
-        if incluir_seguro_danos == 'No' and "Seguro Daños" in df_format.columns:
+        if incluir_seguro_danos == 'No':
             columns_to_drop.append("Seguro Daños")
-        if incluir_seguro_vehiculo == 'No' and "Seguro Vehículo" in df_format.columns:
+        if incluir_seguro_vehiculo == 'No':
             columns_to_drop.append("Seguro Vehículo")
+        df_exportar = cronograma.quitar(columns_to_drop)
 
-        if columns_to_drop:
-            st.dataframe(df_format.drop(columns=columns_to_drop),
-                         use_container_width=True,
-                         height=400)
-            df_exportar = df_resultado.drop(columns=columns_to_drop)
+        # The exports disclose the TCEA of the table itself, which differs
+        # from the one above with rate resets, extra payments or dates
+        if reajustes is None and abonos is None and fechas is None:
+            tcea_tabla = tcea
         else:
-            st.dataframe(df_format, use_container_width=True, height=400)
-            df_exportar = df_resultado
+            tcea_tabla = tcea_cronograma(
+                cronograma, frecuencia, plazo,
+                *(() if fechas is None else fechas))
+            st.caption("💹 TCEA de la tabla: " +
+                       (f"{tcea_tabla:,.2f}%" if math.isfinite(tcea_tabla)
+                        else "No disponible"))
+
+        st.dataframe(formatear_tabla(df_exportar),
+                     use_container_width=True,
+                     height=400)
 
         # Enhanced download section
         st.markdown("""
@@ -1045,23 +530,38 @@ if calcular:
         """,
                     unsafe_allow_html=True)
 
+        # Files are only built when a button is clicked, then cached by
+        # input so repeated downloads are served without rebuilding them
+        clave_exportacion = (clave_prestamo(*argumentos),
+                             tuple(df_exportar.columns), modo_abono,
+                             None if abonos is None else
+                             tuple(np.ravel(abonos).tolist()),
+                             None if reajustes is None else
+                             tuple(np.ravel(reajustes).tolist()),
+                             None if fechas is None else
+                             (fechas[0].isoformat(), fechas[1]))
         col1, col2 = st.columns(2)
 
         with col1:
-            excel_link = generar_link_descarga_excel(df_exportar)
-            # Style the download link with custom class
-            excel_link = excel_link.replace(
-                '<a href=', '<a class="download-button" href=')
-            st.markdown(f'<div style="text-align: center;">{excel_link}</div>',
-                        unsafe_allow_html=True)
+            st.download_button(
+                "📅 Descargar Excel",
+                data=partial(exportar_cacheado, 'xlsx', clave_exportacion,
+                             df_exportar, tcea=tcea_tabla),
+                file_name="tabla_amortizacion.xlsx",
+                mime="application/vnd.openxmlformats-officedocument."
+                "spreadsheetml.sheet",
+                on_click="ignore",
+                use_container_width=True)
 
         with col2:
-            pdf_link = generar_link_descarga_pdf(df_exportar)
-            # Style the download link with custom class
-            pdf_link = pdf_link.replace('<a href=',
-                                        '<a class="download-button" href=')
-            st.markdown(f'<div style="text-align: center;">{pdf_link}</div>',
-                        unsafe_allow_html=True)
+            st.download_button(
+                "📄 Descargar PDF",
+                data=partial(exportar_cacheado, 'pdf', clave_exportacion,
+                             df_exportar, tcea=tcea_tabla),
+                file_name="tabla_amortizacion.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                use_container_width=True)
 
         # Enhanced Footer
         st.markdown("""
@@ -1076,3 +576,155 @@ if calcular:
         st.info(
             "📋 Marque la casilla arriba para mostrar la tabla de amortización completa."
         )
+
+    # Stage timings of this run, for the debug panel
+    st.session_state["ultima_traza"] = [
+        medicion.como_dict()
+        for medicion in REGISTRO_METRICAS.recientes(marca_metricas)
+    ]
+    if os.environ.get("CALCULO_CUOTAS_METRICAS_ARCHIVO"):
+        escribir_metricas(os.environ["CALCULO_CUOTAS_METRICAS_ARCHIVO"])
+
+# -------------------- SCENARIO SWEEP --------------------
+
+st.markdown("---")
+st.markdown("## 🗺️ Barrido de Escenarios")
+st.caption("Cuota y total de intereses para muchas tasas, plazos y "
+           "frecuencias a la vez, con el monto y los seguros del formulario "
+           "de arriba.")
+
+with st.form("escenarios"):
+    col_tasas, col_plazos = st.columns(2)
+    with col_tasas:
+        tasa_min, tasa_max = st.slider("📈 Tasas de interés anual (%)",
+                                       min_value=0.5,
+                                       max_value=60.0,
+                                       value=(6.0, 36.0),
+                                       step=0.5)
+        pasos_tasa = st.number_input("Número de tasas",
+                                     value=50,
+                                     min_value=1,
+                                     max_value=200)
+    with col_plazos:
+        plazo_min, plazo_max = st.slider("📅 Plazos (meses)",
+                                         min_value=1,
+                                         max_value=360,
+                                         value=(12, 360))
+        pasos_plazo = st.number_input("Número de plazos",
+                                      value=50,
+                                      min_value=1,
+                                      max_value=200)
+    frecuencias_barrido = st.multiselect("📆 Frecuencias",
+                                         list(FREQ_DICT),
+                                         default=list(FREQ_DICT))
+    tipos_barrido = st.multiselect("🔁 Tipos de cuota",
+                                   ['Nivelada', 'Saldos Insolutos'],
+                                   default=['Nivelada', 'Saldos Insolutos'])
+    barrer = st.form_submit_button("🗺️ Calcular Escenarios")
+
+if barrer and frecuencias_barrido and tipos_barrido:
+    tasas_barrido = np.unique(
+        np.linspace(tasa_min, tasa_max, int(pasos_tasa)).round(2))
+    plazos_barrido = np.unique(
+        np.linspace(plazo_min, plazo_max, int(pasos_plazo)).round().astype(int))
+    prestamo_barrido = {
+        nombre: valor
+        for nombre, valor in zip(COLUMNAS_PRESTAMO, (
+            monto, tasa, plazo, frecuencia, tipo_cuota, incluir_seguro,
+            porcentaje_seguro, incluir_seguro_danos, monto_asegurar,
+            porcentaje_seguro_danos, impuesto_danos, bomberos_danos,
+            papeleria_danos, incluir_seguro_vehiculo, monto_vehiculo,
+            porcentaje_seguro_vehiculo, impuesto_vehiculo, gasto_vehiculo))
+        if nombre not in ("tasa_anual", "plazo_meses", "frecuencia",
+                          "tipo_cuota")
+    }
+    # Kept in the session so the view selectors below survive reruns
+    st.session_state["barrido"] = barrer_escenarios(tasas_barrido,
+                                                    plazos_barrido,
+                                                    frecuencias_barrido,
+                                                    tipos_barrido,
+                                                    **prestamo_barrido)
+    st.session_state["clave_barrido"] = (
+        tuple(sorted(prestamo_barrido.items())), tuple(tasas_barrido),
+        tuple(plazos_barrido))
+
+if "barrido" in st.session_state:
+    barrido = st.session_state["barrido"]
+    col_frec, col_tipo, col_valor = st.columns(3)
+    with col_frec:
+        frecuencia_vista = st.selectbox("Frecuencia a mostrar",
+                                        barrido["Frecuencia"].unique())
+    with col_tipo:
+        tipo_vista = st.selectbox("Tipo de cuota a mostrar",
+                                  barrido["Tipo de Cuota"].unique())
+    with col_valor:
+        valor_vista = st.selectbox(
+            "Resultado a mostrar",
+            ["Primera Cuota", "Total Intereses", "Total a Pagar"])
+
+    vista = barrido[(barrido["Frecuencia"] == frecuencia_vista) &
+                    (barrido["Tipo de Cuota"] == tipo_vista)]
+    st.altair_chart(alt.Chart(vista).mark_rect().encode(
+        x=alt.X("Plazo:O", title="Plazo (meses)"),
+        y=alt.Y("Tasa:O", title="Tasa anual (%)", sort="descending"),
+        color=alt.Color(f"{valor_vista}:Q", scale=alt.Scale(scheme="viridis")),
+        tooltip=["Tasa", "Plazo",
+                 alt.Tooltip(f"{valor_vista}:Q", format=",.2f")]),
+                    use_container_width=True)
+    matriz = matriz_escenarios(barrido, frecuencia_vista, tipo_vista,
+                               valor_vista)
+    st.dataframe(matriz.style.format("{:,.2f}", na_rep="—"),
+                 use_container_width=True)
+
+    # Same on-demand, cached exports as the amortization table
+    df_vista = vista[["Tasa", "Plazo"] + COLUMNAS_RESUMEN]
+    clave_vista = (st.session_state["clave_barrido"], frecuencia_vista,
+                   tipo_vista)
+    titulo_vista = f"Escenarios {frecuencia_vista} - {tipo_vista}"
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "📅 Descargar Excel",
+            data=partial(exportar_cacheado, 'xlsx', clave_vista, df_vista),
+            file_name="escenarios.xlsx",
+            mime="application/vnd.openxmlformats-officedocument."
+            "spreadsheetml.sheet",
+            on_click="ignore",
+            use_container_width=True,
+            key="excel_escenarios")
+    with col2:
+        st.download_button(
+            "📄 Descargar PDF",
+            data=partial(exportar_cacheado, 'pdf', clave_vista, df_vista,
+                         titulo=titulo_vista,
+                         resumen=resumen_escenarios(vista)),
+            file_name="escenarios.pdf",
+            mime="application/pdf",
+            on_click="ignore",
+            use_container_width=True,
+            key="pdf_escenarios")
+
+# -------------------- DEBUG PANEL --------------------
+
+if st.sidebar.checkbox("🐞 Panel de depuración"):
+    st.sidebar.markdown("### ⏱️ Última ejecución")
+    traza = st.session_state.get("ultima_traza")
+    if traza:
+        st.sidebar.dataframe(
+            [{
+                "Etapa": medicion["etapa"],
+                "ms": round(medicion["segundos"] * 1e3, 3),
+                "Filas": medicion["filas"],
+                "Bytes": medicion["bytes"]
+            } for medicion in traza],
+            hide_index=True,
+            use_container_width=True)
+        st.sidebar.caption(
+            f"Total medido: {sum(m['segundos'] for m in traza) * 1e3:,.1f} ms")
+    else:
+        st.sidebar.caption("Calcule un préstamo para ver el desglose.")
+    estadisticas_cache = CACHE_CUOTAS.estadisticas()
+    st.sidebar.caption(
+        f"Caché: {estadisticas_cache['tasa_aciertos']:.0%} de aciertos")
+    with st.sidebar.expander("Métricas Prometheus"):
+        st.code(REGISTRO_METRICAS.texto_prometheus(), language="text")
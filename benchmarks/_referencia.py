@@ -0,0 +1,325 @@
+"""
+Reference implementation of the amortization schedule.
+
+These are the row-by-row loop that calcular_cuotas_df used before the
+vectorized engine and the single-table PDF export that convertir_a_pdf
+used before pagination. They are kept only as baselines for benchmarks
+and equivalence checks; do not import them from the app.
+"""
+import pandas as pd
+
+from calculo_cuotas.seguros import (calcular_seguro_danos,
+                                    calcular_seguro_vehiculo)
+
+
+def calcular_cuotas_df_bucle(monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
+                             incluir_seguro, porcentaje_seguro, incluir_seguro_danos,
+                             monto_asegurar, porcentaje_seguro_danos, impuesto_danos,
+                             bomberos_danos, papeleria_danos,
+                             incluir_seguro_vehiculo, monto_vehiculo,
+                             porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                             gasto_vehiculo):
+    """
+    Calculate loan amortization schedule with different payment frequencies and types.
+    
+    Args:
+        monto: Loan amount
+        tasa_anual: Annual interest rate (percentage)
+        plazo_meses: Loan term in months
+        frecuencia: Payment frequency
+        tipo_cuota: Payment type (Nivelada or Saldos Insolutos)
+        incluir_seguro: Whether to include insurance
+        porcentaje_seguro: Insurance percentage per 1000
+    
+    Returns:
+        DataFrame with amortization schedule
+    """
+    # Dictionary mapping payment frequencies to payments per year
+    freq_dict = {
+        'Diario': 360,
+        'Semanal': 52,
+        'Quincenal': 24,
+        'Mensual': 12,
+        'Bimensual': 6,
+        'Trimestral': 4,
+        'Cuatrimestral': 3,
+        'Semestral': 2,
+        'Anual': 1,
+        'Al vencimiento': 0
+    }
+
+    pagos_por_año = freq_dict[frecuencia]
+
+    # Calculate damage insurance per payment
+    pago_mensual_seguro_danos = calcular_seguro_danos(
+        monto_asegurar if incluir_seguro_danos == 'Sí' else 0,
+        porcentaje_seguro_danos if incluir_seguro_danos == 'Sí' else 0,
+        impuesto_danos if incluir_seguro_danos == 'Sí' else 0,
+        bomberos_danos if incluir_seguro_danos == 'Sí' else 0,
+        papeleria_danos if incluir_seguro_danos == 'Sí' else 0)
+
+    # Calculate vehicle insurance per payment
+    pago_mensual_seguro_vehiculo = calcular_seguro_vehiculo(
+        monto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
+        porcentaje_seguro_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
+        impuesto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0,
+        gasto_vehiculo if incluir_seguro_vehiculo == 'Sí' else 0)
+
+    # Handle "At maturity" payment
+    if pagos_por_año == 0:
+        tasa_total = tasa_anual / 100 * (plazo_meses / 12)
+        interes = monto * tasa_total
+        abono = monto
+        seguro = 0
+        cuota_total = interes + abono
+        seguro_danos = pago_mensual_seguro_danos * plazo_meses if incluir_seguro_danos == 'Sí' else 0
+        seguro_vehiculo = pago_mensual_seguro_vehiculo * plazo_meses if incluir_seguro_vehiculo == 'Sí' else 0
+        return pd.DataFrame([{
+            "Pago": 1,
+            "Cuota": cuota_total + seguro_danos + seguro_vehiculo,
+            "Interés": interes,
+            "Abono": abono,
+            "Seguro de Préstamo": seguro,
+            "Seguro Daños": seguro_danos,
+            "Seguro Vehículo": seguro_vehiculo,
+            "Saldo": 0
+        }])
+
+    # Calculate number of payments and interest rate per period
+    n_pagos = int(plazo_meses * pagos_por_año / 12)
+    tasa_periodo = tasa_anual / 100 / pagos_por_año
+    saldo = monto
+
+    # Calculate reference values for insurance calculation
+    ref_cuota_dict = {
+        'Diario': 360,
+        'Semanal': 52,
+        'Quincenal': 24,
+        'Mensual': 12,
+        'Bimensual': 6,
+        'Trimestral': 4,
+        'Cuatrimestral': 3,
+        'Semestral': 2,
+        'Anual': 1
+    }
+    ref_cuota = min(ref_cuota_dict.get(frecuencia, 1), n_pagos)
+    saldo_referencia = monto
+
+    # Calculate base payment amount and reference balance for insurance
+    cuota_base = 0  # Initialize to avoid unbound variable
+    if tipo_cuota == 'Nivelada':
+        # Level payment calculation using PMT formula
+        cuota_base = monto * (tasa_periodo * (1 + tasa_periodo)**n_pagos) / (
+            (1 + tasa_periodo)**n_pagos - 1)
+        # Simulate payments to get reference balance
+        for _ in range(ref_cuota):
+            interes = saldo_referencia * tasa_periodo
+            abono = cuota_base - interes
+            saldo_referencia -= abono
+    else:
+        # Declining balance payment - fixed principal payment
+        abono_fijo = monto / n_pagos
+        for _ in range(ref_cuota):
+            interes = saldo_referencia * tasa_periodo
+            saldo_referencia -= abono_fijo
+
+    # Calculate insurance amount per payment
+    seguro_unitario = 0
+    if incluir_seguro == 'Sí':
+        divisor = freq_dict[frecuencia]
+        seguro_unitario = (saldo_referencia /
+                                 1000) * porcentaje_seguro * 12 / divisor
+
+    # Calculate damage and vehicle insurance per payment based on frequency
+    seguro_danos_por_pago = 0
+    seguro_vehiculo_por_pago = 0
+
+    if incluir_seguro_danos == 'Sí':
+        if frecuencia == 'Mensual':
+            seguro_danos_por_pago = pago_mensual_seguro_danos
+        elif frecuencia == 'Quincenal':
+            seguro_danos_por_pago = pago_mensual_seguro_danos / 2
+        elif frecuencia == 'Semanal':
+            seguro_danos_por_pago = pago_mensual_seguro_danos / 4.33
+        elif frecuencia == 'Diario':
+            seguro_danos_por_pago = pago_mensual_seguro_danos / 30
+        else:
+            # For other frequencies, calculate proportionally
+            pagos_mensuales = freq_dict[frecuencia] / 12 if freq_dict[
+                frecuencia] > 0 else 0
+            seguro_danos_por_pago = pago_mensual_seguro_danos / pagos_mensuales if pagos_mensuales > 0 else 0
+
+    if incluir_seguro_vehiculo == 'Sí':
+        if frecuencia == 'Mensual':
+            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo
+        elif frecuencia == 'Quincenal':
+            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 2
+        elif frecuencia == 'Semanal':
+            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 4.33
+        elif frecuencia == 'Diario':
+            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / 30
+        else:
+            # For other frequencies, calculate proportionally
+            pagos_mensuales = freq_dict[frecuencia] / 12 if freq_dict[
+                frecuencia] > 0 else 0
+            seguro_vehiculo_por_pago = pago_mensual_seguro_vehiculo / pagos_mensuales if pagos_mensuales > 0 else 0
+
+    # Calculate number of payments that include insurance (not last year)
+    cuotas_con_seguro = max(0, n_pagos -
+                                  pagos_por_año) if pagos_por_año > 0 else n_pagos
+    cuotas_con_seguro_danos = max(
+        0, n_pagos - pagos_por_año) if pagos_por_año > 0 else n_pagos
+    cuotas_con_seguro_vehiculo = max(
+        0, n_pagos - pagos_por_año) if pagos_por_año > 0 else n_pagos
+
+    # Generate amortization schedule
+    datos = []
+    saldo = monto
+
+    # Generate amortization schedule
+    if tipo_cuota == 'Nivelada':
+        # Level payments - same payment amount each period
+        for i in range(1, n_pagos + 1):
+            interes = saldo * tasa_periodo
+            abono = cuota_base - interes
+            saldo -= abono
+            saldo = max(saldo, 0)  # Prevent negative balance
+
+            # Apply insurance for specified number of payments
+            seguro_aplicado = seguro_unitario if incluir_seguro == 'Sí' and i <= cuotas_con_seguro else 0
+            seguro_danos_aplicado = seguro_danos_por_pago if incluir_seguro_danos == 'Sí' and i <= cuotas_con_seguro_danos else 0
+            seguro_vehiculo_aplicado = seguro_vehiculo_por_pago if incluir_seguro_vehiculo == 'Sí' and i <= cuotas_con_seguro_vehiculo else 0
+            cuota_total = cuota_base + seguro_aplicado + seguro_danos_aplicado + seguro_vehiculo_aplicado
+
+            datos.append({
+                "Pago": i,
+                "Cuota": cuota_total,
+                "Interés": interes,
+                "Abono": abono,
+                "Seguro de Préstamo": seguro_aplicado,
+                "Seguro Daños": seguro_danos_aplicado,
+                "Seguro Vehículo": seguro_vehiculo_aplicado,
+                "Saldo": saldo
+            })
+    else:
+        # Declining balance - fixed principal, varying interest
+        abono_fijo = monto / n_pagos
+        for i in range(1, n_pagos + 1):
+            interes = saldo * tasa_periodo
+            cuota_base = abono_fijo + interes
+            saldo -= abono_fijo
+            saldo = max(saldo, 0)  # Prevent negative balance
+
+            # Apply insurance for specified number of payments
+            seguro_aplicado = seguro_unitario if incluir_seguro == 'Sí' and i <= cuotas_con_seguro else 0
+            seguro_danos_aplicado = seguro_danos_por_pago if incluir_seguro_danos == 'Sí' and i <= cuotas_con_seguro_danos else 0
+            seguro_vehiculo_aplicado = seguro_vehiculo_por_pago if incluir_seguro_vehiculo == 'Sí' and i <= cuotas_con_seguro_vehiculo else 0
+            cuota_total = cuota_base + seguro_aplicado + seguro_danos_aplicado + seguro_vehiculo_aplicado
+
+            datos.append({
+                "Pago": i,
+                "Cuota": cuota_total,
+                "Interés": interes,
+                "Abono": abono_fijo,
+                "Seguro de Préstamo": seguro_aplicado,
+                "Seguro Daños": seguro_danos_aplicado,
+                "Seguro Vehículo": seguro_vehiculo_aplicado,
+                "Saldo": saldo
+            })
+
+    df = pd.DataFrame(datos)
+    return df
+
+
+def convertir_a_pdf_tabla_unica(df):
+    """
+    Convert DataFrame to PDF format in memory.
+
+    Args:
+        df: DataFrame to convert
+
+    Returns:
+        BytesIO object containing PDF data
+    """
+    from io import BytesIO
+
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import (Paragraph, SimpleDocTemplate, Spacer,
+                                    Table, TableStyle)
+
+    output = BytesIO()
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    styles = getSampleStyleSheet()
+
+    # Create document elements
+    elements = [
+        Paragraph("Tabla de Amortización", styles['Heading1']),
+        Spacer(1, 12)
+    ]
+
+    # Prepare table data with headers
+    data = [list(df.columns)] + df.values.tolist()
+
+    # Format numeric values in the data
+    for i in range(1, len(data)):
+        data[i] = [
+            f"{x:,.2f}" if isinstance(x, (int, float)) else str(x)
+            for x in data[i]
+        ]
+
+    # Create and style the table
+    table = Table(data)
+    table.setStyle(
+        TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0),
+             colors.HexColor("#003366")),  # Header background
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header text color
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Grid lines
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header font
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Center alignment
+            ('FONTSIZE', (0, 0), (-1, -1), 8),  # Font size
+        ]))
+
+    elements.append(table)
+    doc.build(elements)
+    output.seek(0)
+    return output
+
+
+def reajustes_bucle(monto, tasa_anual, plazo_meses, pagos_por_año, tipo_cuota,
+                    pagos_reajuste, tasas_reajuste):
+    """
+    Variable-rate schedule computed one payment at a time.
+
+    Returns:
+        List of (cuota, interés, abono, saldo) rows, without insurance
+    """
+    reajustes = dict(zip(pagos_reajuste, tasas_reajuste))
+    n_pagos = int(plazo_meses * pagos_por_año / 12)
+    tasa_periodo = tasa_anual / 100 / pagos_por_año
+    saldo = monto
+    abono_fijo = monto / n_pagos
+    cuota = None
+    filas = []
+    for pago in range(1, n_pagos + 1):
+        if pago in reajustes or cuota is None:
+            if pago in reajustes:
+                tasa_periodo = reajustes[pago] / 100 / pagos_por_año
+            restantes = n_pagos - pago + 1
+            if tasa_periodo == 0:
+                cuota = saldo / restantes
+            else:
+                factor = (1 + tasa_periodo)**restantes
+                cuota = saldo * tasa_periodo * factor / (factor - 1)
+        interes = saldo * tasa_periodo
+        if tipo_cuota == 'Nivelada':
+            abono = cuota - interes
+        else:
+            abono = abono_fijo
+        if pago == n_pagos:
+            abono = saldo
+        saldo = max(saldo - abono, 0)
+        filas.append((abono + interes, interes, abono, saldo))
+    return filas
@@ -0,0 +1,89 @@
+"""
+Benchmark of recomputing a schedule when only an insurance input changes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_capas
+
+Replays form edits that each change one insurance parameter (monto
+asegurado, porcentaje del vehículo, or a toggle of either insurance) on a
+long schedule, and times every edit built from scratch (calcular_cronograma)
+against the layered cache (calcular_cronograma_cacheado), which reuses the
+base layer and the untouched overlays. Every edit is a new input, so the
+full-schedule cache never hits. Exits with status 1 when both disagree.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from calculo_cuotas import (CacheCalculos, calcular_cronograma,
+                            calcular_cronograma_cacheado)
+from benchmarks.bench_motor import argumentos
+
+
+def ediciones(args, cantidad):
+    """cantidad argument tuples, each one insurance edit away from args."""
+    resultado = []
+    for i in range(cantidad):
+        editado = list(args)
+        paso = i % 4
+        if paso == 0:
+            editado[8] = args[8] + 1000.0 * (i + 1)  # monto_asegurar
+        elif paso == 1:
+            editado[15] = args[15] + 0.01 * (i + 1)  # porcentaje vehículo
+        elif paso == 2:
+            editado[7] = 'No'  # Seguro de Daños off
+            editado[8] = args[8] + 1000.0 * (i + 1)
+        else:
+            editado[13] = 'No'  # Seguro de Vehículo off
+            editado[15] = args[15] + 0.01 * (i + 1)
+        resultado.append(tuple(editado))
+    return resultado
+
+
+def tiempo_medio(funcion, casos):
+    """Mean wall time of funcion over casos, in seconds."""
+    inicio = time.perf_counter()
+    for caso in casos:
+        funcion(caso)
+    return (time.perf_counter() - inicio) / len(casos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frecuencia", default='Diario')
+    parser.add_argument("--plazo", type=int, default=360)
+    parser.add_argument("--ediciones", type=int, default=400)
+    opciones = parser.parse_args(argv)
+
+    ok = True
+    print(f"{'Tipo':<16} {'Filas':>6} {'Completo (ms)':>14} "
+          f"{'Por capas (ms)':>15} {'Speedup':>8}")
+    for tipo_cuota in ('Nivelada', 'Saldos Insolutos'):
+        args = argumentos(opciones.frecuencia, opciones.plazo, tipo_cuota)
+        casos = ediciones(args, opciones.ediciones)
+        cache, capas = CacheCalculos(), CacheCalculos()
+        calcular_cronograma_cacheado(*args, cache=cache, capas=capas)
+
+        completo = tiempo_medio(lambda c: calcular_cronograma(*c), casos)
+        por_capas = tiempo_medio(
+            lambda c: calcular_cronograma_cacheado(*c, cache=cache,
+                                                   capas=capas), casos)
+        for caso in casos[:8]:
+            esperado = calcular_cronograma(*caso)
+            obtenido = calcular_cronograma_cacheado(*caso, cache=cache,
+                                                    capas=capas)
+            ok &= all(np.array_equal(esperado[c], obtenido[c])
+                      for c in esperado.columns)
+        print(f"{tipo_cuota:<16} {len(calcular_cronograma(*args)):>6} "
+              f"{completo * 1e3:>14.3f} {por_capas * 1e3:>15.3f} "
+              f"{completo / por_capas:>7.1f}x")
+    if not ok:
+        print("Los resultados por capas no coinciden con el cálculo completo")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
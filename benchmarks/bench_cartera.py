@@ -0,0 +1,88 @@
+"""
+Benchmark of the batch portfolio API against one calcular_cuotas_df per loan.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cartera --prestamos 1000000
+
+The per-loan time of the schedule loop is measured on a sample and
+extrapolated to the whole portfolio; the sample is also used to check that
+both paths agree.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculo_cuotas import (COLUMNAS_PRESTAMO, FREQ_DICT, calcular_cuotas_df,
+                            resumir_cartera)
+
+
+def cartera_aleatoria(n_prestamos, semilla=0):
+    """Random portfolio mixing every frequency, type and insurance option."""
+    rng = np.random.default_rng(semilla)
+    si_no = np.array(['No', 'Sí'])
+    return pd.DataFrame({
+        "monto": rng.uniform(5_000, 500_000, n_prestamos).round(2),
+        "tasa_anual": rng.uniform(6, 36, n_prestamos).round(2),
+        "plazo_meses": rng.integers(12, 361, n_prestamos),
+        "frecuencia": rng.choice(list(FREQ_DICT), n_prestamos),
+        "tipo_cuota": rng.choice(['Nivelada', 'Saldos Insolutos'],
+                                 n_prestamos),
+        "incluir_seguro": si_no[rng.integers(0, 2, n_prestamos)],
+        "porcentaje_seguro": 0.5,
+        "incluir_seguro_danos": si_no[rng.integers(0, 2, n_prestamos)],
+        "monto_asegurar": 350_000.0,
+        "porcentaje_seguro_danos": 3.5,
+        "impuesto_danos": 15.0,
+        "bomberos_danos": 5.0,
+        "papeleria_danos": 50.0,
+        "incluir_seguro_vehiculo": si_no[rng.integers(0, 2, n_prestamos)],
+        "monto_vehiculo": 500_000.0,
+        "porcentaje_seguro_vehiculo": 12.0,
+        "impuesto_vehiculo": 15.0,
+        "gasto_vehiculo": 250.0
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=1_000_000)
+    parser.add_argument("--muestra", type=int, default=200)
+    opciones = parser.parse_args(argv)
+
+    cartera = cartera_aleatoria(opciones.prestamos)
+
+    inicio = time.perf_counter()
+    resumen = resumir_cartera(cartera)
+    t_lote = time.perf_counter() - inicio
+
+    muestra = cartera.sample(min(opciones.muestra, len(cartera)),
+                             random_state=0)
+    ok = True
+    inicio = time.perf_counter()
+    for indice, fila in muestra.iterrows():
+        df = calcular_cuotas_df(*[fila[c] for c in COLUMNAS_PRESTAMO])
+        esperado = [
+            len(df), df["Cuota"].iloc[0], df["Cuota"].sum(),
+            df["Interés"].sum(), df["Seguro de Préstamo"].sum(),
+            df["Seguro Daños"].sum(), df["Seguro Vehículo"].sum()
+        ]
+        if not np.allclose(esperado, resumen.loc[indice].to_numpy(float),
+                           rtol=1e-8, atol=1e-4):
+            print(f"Resumen distinto para el préstamo {indice}")
+            ok = False
+    t_por_prestamo = (time.perf_counter() - inicio) / len(muestra)
+
+    print(f"Préstamos:               {len(cartera):,}")
+    print(f"resumir_cartera:         {t_lote:.3f} s "
+          f"({len(cartera) / t_lote:,.0f} préstamos/s)")
+    print(f"calcular_cuotas_df c/u:  {t_por_prestamo * 1e3:.3f} ms "
+          f"(~{t_por_prestamo * len(cartera):,.0f} s para toda la cartera)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Throughput of the exact centavo engine against the float engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_centavos
+
+For each schedule it prints rows per second of both paths and how far the
+rounded float columns drift from the loan amount (the sum of the abonos
+rounded one by one). Exits with status 1 when the centavo path does not
+reconcile exactly or is more than --max-factor times slower.
+"""
+import argparse
+import sys
+
+from calculo_cuotas import (a_centavos, calcular_cuotas_arrays,
+                            calcular_cuotas_centavos)
+from benchmarks.bench_motor import CASOS, argumentos, mejor_tiempo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--max-factor", type=float, default=4.0)
+    opciones = parser.parse_args(argv)
+
+    ok = True
+    print(f"{'Frecuencia':<10} {'Plazo':>5} {'Tipo':<16} {'Filas':>6} "
+          f"{'Float (filas/s)':>16} {'Centavos (filas/s)':>19} "
+          f"{'Factor':>7} {'Descuadre float':>16}")
+    for frecuencia, plazo in CASOS:
+        for tipo_cuota in ('Nivelada', 'Saldos Insolutos'):
+            args = argumentos(frecuencia, plazo, tipo_cuota)
+            flotante = calcular_cuotas_arrays(*args)
+            exacto = calcular_cuotas_centavos(*args)
+            monto = a_centavos(args[0])
+            descuadre = int(a_centavos(flotante["Abono"]).sum()) - monto
+            if exacto["Abono"].sum() != monto or exacto["Saldo"][-1] != 0:
+                print(f"El modo en centavos no cuadra para {args}")
+                ok = False
+
+            filas = len(flotante["Pago"])
+            t_float = mejor_tiempo(calcular_cuotas_arrays, args,
+                                   opciones.repeticiones)
+            t_centavos = mejor_tiempo(calcular_cuotas_centavos, args,
+                                      opciones.repeticiones)
+            factor = t_centavos / t_float
+            print(f"{frecuencia:<10} {plazo:>5} {tipo_cuota:<16} {filas:>6} "
+                  f"{filas / t_float:>16,.0f} {filas / t_centavos:>19,.0f} "
+                  f"{factor:>6.2f}x {descuadre / 100:>+15.2f}")
+            if factor > opciones.max_factor:
+                ok = False
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Time of a scenario sweep against the target of well under a second.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_escenarios --tasas 50 --plazos 50
+
+Sweeps every frequency and both payment types with all three insurances,
+and estimates what one calcular_cuotas_df per cell would take from a
+sample of cells.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from calculo_cuotas import (COLUMNAS_PRESTAMO, barrer_escenarios,
+                            calcular_cuotas_df)
+
+PRESTAMO = {
+    "monto": 250_000.0,
+    "incluir_seguro": 'Sí',
+    "porcentaje_seguro": 0.5,
+    "incluir_seguro_danos": 'Sí',
+    "monto_asegurar": 350_000.0,
+    "porcentaje_seguro_danos": 3.5,
+    "impuesto_danos": 15.0,
+    "bomberos_danos": 5.0,
+    "papeleria_danos": 50.0,
+    "incluir_seguro_vehiculo": 'Sí',
+    "monto_vehiculo": 500_000.0,
+    "porcentaje_seguro_vehiculo": 12.0,
+    "impuesto_vehiculo": 15.0,
+    "gasto_vehiculo": 250.0
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasas", type=int, default=50)
+    parser.add_argument("--plazos", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--muestra", type=int, default=100)
+    parser.add_argument("--objetivo", type=float, default=1.0,
+                        help="Median sweep time target in seconds")
+    opciones = parser.parse_args(argv)
+
+    tasas = np.linspace(6, 36, opciones.tasas).round(2)
+    plazos = np.linspace(12, 360, opciones.plazos).round().astype(int)
+
+    tiempos = []
+    for _ in range(opciones.repeticiones):
+        inicio = time.perf_counter()
+        barrido = barrer_escenarios(tasas, plazos, **PRESTAMO)
+        tiempos.append(time.perf_counter() - inicio)
+    mediana = statistics.median(tiempos)
+
+    muestra = barrido.sample(min(opciones.muestra, len(barrido)),
+                             random_state=0)
+    inicio = time.perf_counter()
+    for _, fila in muestra.iterrows():
+        argumentos = dict(PRESTAMO, tasa_anual=fila["Tasa"],
+                          plazo_meses=fila["Plazo"],
+                          frecuencia=fila["Frecuencia"],
+                          tipo_cuota=fila["Tipo de Cuota"])
+        try:
+            calcular_cuotas_df(*[argumentos[c] for c in COLUMNAS_PRESTAMO])
+        except ZeroDivisionError:
+            pass
+    t_por_celda = (time.perf_counter() - inicio) / len(muestra)
+
+    print(f"Escenarios:              {len(barrido):,}")
+    print(f"barrer_escenarios:       mediana {mediana * 1e3:.1f} ms "
+          f"(objetivo {opciones.objetivo * 1e3:.0f} ms)")
+    print(f"calcular_cuotas_df c/u:  {t_por_celda * 1e3:.3f} ms "
+          f"(~{t_por_celda * len(barrido):,.1f} s para todo el barrido)")
+    return 0 if mediana <= opciones.objetivo else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
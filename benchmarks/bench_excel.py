@@ -0,0 +1,64 @@
+"""
+Peak memory and time of the Excel export, pandas writer vs streaming.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_excel
+
+Peak memory is the tracemalloc peak while writing one schedule to a file
+on disk. The streaming writer should stay flat as the row count grows.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from calculo_cuotas import calcular_cuotas_df
+from calculo_cuotas.exportar import convertir_a_excel, escribir_excel_streaming
+
+# (frecuencia, plazo_meses) -> 360, 3,600, 10,800 and 36,000 rows
+CASOS = [('Mensual', 360), ('Diario', 120), ('Diario', 360), ('Diario', 1200)]
+
+
+def medir(funcion):
+    """Run funcion() and return (seconds, peak traced bytes)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args(argv)
+
+    print(f"{'Filas':>7} {'pandas (s)':>11} {'pandas (MB)':>12} "
+          f"{'streaming (s)':>14} {'streaming (MB)':>15}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "tabla.xlsx")
+
+        def con_pandas():
+            with open(ruta, 'wb') as archivo:
+                archivo.write(convertir_a_excel(df, streaming=False).read())
+
+        def con_streaming():
+            escribir_excel_streaming([('Amortización', df)], ruta)
+
+        for frecuencia, plazo in CASOS:
+            df = calcular_cuotas_df(100000.0, 12.0, plazo, frecuencia,
+                                    'Nivelada', 'Sí', 0.5, 'No', 0, 0, 0, 0,
+                                    0, 'No', 0, 0, 0, 0)
+            t_pandas, m_pandas = medir(con_pandas)
+            t_stream, m_stream = medir(con_streaming)
+            print(f"{len(df):>7,} {t_pandas:>11.2f} {m_pandas / 2**20:>12.1f} "
+                  f"{t_stream:>14.2f} {m_stream / 2**20:>15.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Benchmark of dated schedules against the undated engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fechas
+
+Builds the same loan with every insurance as an undated schedule
+(calcular_cronograma) and as a dated one (calcular_cronograma_fechas) for
+every day-count convention, and reports the time of each. A 30-year
+'Diario' loan has 10,800 undated payments and 10,957 dated ones. Exits
+with status 1 when a dated schedule is more than --max-ratio times slower
+than the undated one.
+"""
+import argparse
+import datetime
+import sys
+
+from calculo_cuotas import (CONVENCIONES, calcular_cronograma,
+                            calcular_cronograma_fechas)
+from benchmarks.bench_motor import argumentos, mejor_tiempo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frecuencia", default='Diario')
+    parser.add_argument("--plazo", type=int, default=360)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    opciones = parser.parse_args(argv)
+
+    desembolso = datetime.date(2025, 1, 31)
+    ok = True
+    print(f"{'Tipo':<16} {'Convención':<11} {'Filas':>6} "
+          f"{'Sin fechas (ms)':>16} {'Con fechas (ms)':>16} {'Ratio':>6}")
+    for tipo_cuota in ('Nivelada', 'Saldos Insolutos'):
+        args = argumentos(opciones.frecuencia, opciones.plazo, tipo_cuota)
+        sin_fechas = mejor_tiempo(calcular_cronograma, args,
+                                  opciones.repeticiones)
+        for convencion in CONVENCIONES:
+            con_fechas = mejor_tiempo(calcular_cronograma_fechas,
+                                      args + (desembolso, convencion),
+                                      opciones.repeticiones)
+            filas = len(calcular_cronograma_fechas(*args, desembolso,
+                                                   convencion))
+            ratio = con_fechas / sin_fechas
+            ok &= ratio <= opciones.max_ratio
+            print(f"{tipo_cuota:<16} {convencion:<11} {filas:>6} "
+                  f"{sin_fechas * 1e3:>16.3f} {con_fechas * 1e3:>16.3f} "
+                  f"{ratio:>5.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark of the monthly cash-flow projection of a portfolio.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_flujos --prestamos 1000000
+
+Projects a random portfolio mixing every frequency with proyectar_flujos
+and compares it with building every schedule (calcular_cuotas_arrays) and
+adding its payments into their months, timed on --muestra loans and
+extrapolated. Reports the peak memory traced during the projection:
+--memoria-mb plus about 24 bytes per loan. The first loans are checked
+against their schedules; exits with status 1 when they disagree.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from calculo_cuotas import (COLUMNAS_FLUJO, COLUMNAS_PRESTAMO, FREQ_DICT,
+                            calcular_cuotas_arrays, proyectar_flujos)
+from benchmarks.bench_cartera import cartera_aleatoria
+
+
+def flujos_bucle(cartera):
+    """COLUMNAS_FLUJO[1:] by month, from the schedule of every loan."""
+    columnas = COLUMNAS_FLUJO[2:-1]
+    meses = int(np.ceil(cartera["plazo_meses"].max()))
+    totales = np.zeros((len(COLUMNAS_FLUJO) - 1, meses))
+    for prestamo in cartera[list(COLUMNAS_PRESTAMO)].itertuples(index=False):
+        cronograma = calcular_cuotas_arrays(*prestamo)
+        pago = cronograma["Pago"]
+        pagos_por_año = FREQ_DICT[prestamo[3]]
+        if pagos_por_año:
+            mes = np.ceil(pago * 12 / pagos_por_año - 1e-9).astype(int)
+        else:
+            mes = np.full(len(pago), max(int(np.ceil(prestamo[2])), 1))
+        totales[0] += np.bincount(mes - 1, minlength=meses)
+        for fila, nombre in enumerate(columnas, start=1):
+            totales[fila] += np.bincount(mes - 1, cronograma[nombre],
+                                         minlength=meses)
+        # The balance of a month is the one left by its last payment
+        ultimo = np.searchsorted(mes, np.arange(1, mes[-1] + 1),
+                                 side="right") - 1
+        totales[-1, :mes[-1]] += np.where(
+            ultimo >= 0, cronograma["Saldo"][np.maximum(ultimo, 0)],
+            prestamo[0])
+    return totales
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=1_000_000)
+    parser.add_argument("--muestra", type=int, default=500)
+    parser.add_argument("--memoria-mb", type=float, default=16.0)
+    opciones = parser.parse_args(argv)
+
+    cartera = cartera_aleatoria(opciones.prestamos)
+    memoria = int(opciones.memoria_mb * 2**20)
+
+    inicio = time.perf_counter()
+    flujos = proyectar_flujos(cartera, memoria_lote=memoria)
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    proyectar_flujos(cartera, memoria_lote=memoria)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    muestra = cartera.iloc[:opciones.muestra]
+    inicio = time.perf_counter()
+    esperado = flujos_bucle(muestra)
+    estimado = (time.perf_counter() - inicio) / len(muestra) * len(cartera)
+    obtenido = proyectar_flujos(muestra).iloc[:, 1:].to_numpy().T
+    ok = np.allclose(obtenido, esperado[:, :obtenido.shape[1]], rtol=1e-9,
+                     atol=1e-6)
+
+    print(f"Préstamos: {len(cartera):,}  meses: {len(flujos)}")
+    print(f"{'Método':<28} {'Segundos':>10} {'Préstamos/s':>12}")
+    print(f"{'Cronograma por préstamo':<28} {estimado:>10.1f} "
+          f"{len(cartera) / estimado:>12,.0f}")
+    print(f"{'proyectar_flujos':<28} {segundos:>10.2f} "
+          f"{len(cartera) / segundos:>12,.0f}")
+    print(f"Speedup: {estimado / segundos:,.1f}x  memoria pico: "
+          f"{pico / 2**20:,.1f} MB")
+    if not ok:
+        print("La proyección no coincide con los cronogramas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
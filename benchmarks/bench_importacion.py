@@ -0,0 +1,59 @@
+"""
+Cold-import time of the engine, as paid by every batch worker.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_importacion
+
+Each measurement is a fresh interpreter that imports the array engine the
+way a worker of generar_cronogramas does. Exits with status 1 when the
+median exceeds --objetivo seconds or when Streamlit, reportlab, openpyxl or
+pandas end up imported.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROHIBIDOS = ("streamlit", "reportlab", "openpyxl", "pandas")
+
+_SCRIPT = f"""
+import json, sys, time
+inicio = time.perf_counter()
+from calculo_cuotas.paralelo import _procesar_lote
+from calculo_cuotas import calcular_cuotas_arrays
+segundos = time.perf_counter() - inicio
+print(json.dumps({{
+    "segundos": segundos,
+    "cargados": [m for m in {PROHIBIDOS!r} if m in sys.modules]
+}}))
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=7)
+    parser.add_argument("--objetivo", type=float, default=0.15,
+                        help="Median cold-import time target in seconds")
+    opciones = parser.parse_args(argv)
+
+    tiempos, cargados = [], set()
+    for _ in range(opciones.repeticiones):
+        salida = subprocess.run([sys.executable, "-c", _SCRIPT],
+                                capture_output=True, text=True, check=True)
+        medicion = json.loads(salida.stdout)
+        tiempos.append(medicion["segundos"])
+        cargados.update(medicion["cargados"])
+
+    mediana = statistics.median(tiempos)
+    print(f"Importación en frío: mediana {mediana * 1e3:.1f} ms, "
+          f"mínimo {min(tiempos) * 1e3:.1f} ms "
+          f"(objetivo {opciones.objetivo * 1e3:.0f} ms)")
+    if cargados:
+        print(f"Módulos que no deberían importarse: {sorted(cargados)}")
+    return 0 if mediana <= opciones.objetivo and not cargados else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
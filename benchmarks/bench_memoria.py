@@ -0,0 +1,86 @@
+"""
+Memory per schedule row: list of dicts and DataFrames against Cronograma.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memoria
+
+Measures a daily 30-year schedule (10,800 rows) with all insurances, as
+the app used to hold it and as it holds it now:
+
+- antes: the row dicts of the original loop, the DataFrame built from
+  them, the copy returned by the cache and the copy without the unused
+  insurance columns for the export
+- ahora: one cached Cronograma (float64 or int64 centavos), the export
+  view sharing its arrays
+
+Sizes of Python objects are measured with tracemalloc, arrays and
+DataFrames by their buffers. The formatted display strings are the same
+in both cases and are left out. Exits with status 1 when the Cronograma
+takes more than --max-bytes-fila bytes per row.
+"""
+import argparse
+import sys
+import tracemalloc
+
+from calculo_cuotas import COLUMNAS, calcular_cronograma, calcular_cuotas_df
+from benchmarks.bench_motor import argumentos
+
+
+def bytes_de(construir):
+    """(object, bytes still allocated by construir() when it returns)."""
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        objeto = construir()
+        return objeto, tracemalloc.get_traced_memory()[0] - antes
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frecuencia", default='Diario')
+    parser.add_argument("--plazo", type=int, default=360)
+    parser.add_argument("--max-bytes-fila", type=float, default=64.0)
+    opciones = parser.parse_args(argv)
+
+    args = argumentos(opciones.frecuencia, opciones.plazo, 'Nivelada')
+    df = calcular_cuotas_df(*args)
+    filas = len(df)
+
+    # The original loop appended one dict per payment
+    registros = list(zip(*(df[c].tolist() for c in COLUMNAS)))
+    dicts, b_dicts = bytes_de(
+        lambda: [dict(zip(COLUMNAS, fila)) for fila in registros])
+    del dicts
+    b_df = int(df.memory_usage(index=True, deep=True).sum())
+    copia = df.copy()
+    b_copia = int(copia.memory_usage(index=True, deep=True).sum())
+    exportar = df.drop(columns=["Seguro Vehículo"])
+    b_exportar = int(exportar.memory_usage(index=True, deep=True).sum())
+
+    cronograma = calcular_cronograma(*args)
+    vista, b_vista = bytes_de(lambda: cronograma.quitar(["Seguro Vehículo"]))
+    centavos = calcular_cronograma(*args, exacto=True)
+
+    filas_tabla = [
+        ("antes: lista de dicts", b_dicts),
+        ("antes: DataFrame", b_df),
+        ("antes: copia del caché", b_copia),
+        ("antes: copia para exportar", b_exportar),
+        ("antes: total", b_dicts + b_df + b_copia + b_exportar),
+        ("ahora: Cronograma (float64)", cronograma.nbytes),
+        ("ahora: vista para exportar", b_vista),
+        ("ahora: total", cronograma.nbytes + b_vista),
+        ("ahora: Cronograma (centavos)", centavos.nbytes),
+    ]
+    print(f"{opciones.frecuencia}, {opciones.plazo} meses: {filas:,} filas")
+    print(f"{'Estructura':<30} {'Bytes':>12} {'Bytes/fila':>11}")
+    for nombre, total in filas_tabla:
+        print(f"{nombre:<30} {total:>12,} {total / filas:>11,.1f}")
+    return 0 if cronograma.nbytes / filas <= opciones.max_bytes_fila else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
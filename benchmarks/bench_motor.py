@@ -0,0 +1,80 @@
+"""
+Benchmark of the vectorized engine against the original row-by-row loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_motor
+
+Exits with status 1 when the vectorized engine is less than --min-speedup
+times faster on the long daily schedules, or when both engines disagree.
+"""
+import argparse
+import sys
+import timeit
+
+import numpy as np
+
+from calculo_cuotas import calcular_cuotas_df
+from benchmarks._referencia import calcular_cuotas_df_bucle
+
+# (frecuencia, plazo_meses) pairs; the daily ones gate the speedup check
+CASOS = [
+    ('Diario', 360),
+    ('Diario', 120),
+    ('Semanal', 360),
+    ('Mensual', 360),
+    ('Mensual', 36),
+]
+
+
+def argumentos(frecuencia, plazo, tipo_cuota):
+    """Full argument tuple for calcular_cuotas_df with all insurances on."""
+    return (100000.0, 12.0, plazo, frecuencia, tipo_cuota, 'Sí', 0.5, 'Sí',
+            350000.0, 3.5, 15.0, 5.0, 50.0, 'Sí', 500000.0, 12.0, 15.0,
+            250.0)
+
+
+def mejor_tiempo(funcion, args, repeticiones):
+    """Best wall time of one call, in seconds."""
+    temporizador = timeit.Timer(lambda: funcion(*args))
+    numero, _ = temporizador.autorange()
+    tiempos = temporizador.repeat(repeat=repeticiones, number=numero)
+    return min(tiempos) / numero
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    opciones = parser.parse_args(argv)
+
+    ok = True
+    print(f"{'Frecuencia':<10} {'Plazo':>5} {'Tipo':<16} {'Filas':>6} "
+          f"{'Bucle (ms)':>11} {'Vector (ms)':>12} {'Speedup':>8}")
+    for frecuencia, plazo in CASOS:
+        for tipo_cuota in ('Nivelada', 'Saldos Insolutos'):
+            args = argumentos(frecuencia, plazo, tipo_cuota)
+            esperado = calcular_cuotas_df_bucle(*args)
+            obtenido = calcular_cuotas_df(*args)
+            if not np.allclose(esperado.to_numpy(float),
+                               obtenido.to_numpy(float),
+                               rtol=1e-6, atol=1e-2):
+                print(f"Resultados distintos para {args}")
+                ok = False
+
+            t_bucle = mejor_tiempo(calcular_cuotas_df_bucle, args,
+                                   opciones.repeticiones)
+            t_vector = mejor_tiempo(calcular_cuotas_df, args,
+                                    opciones.repeticiones)
+            speedup = t_bucle / t_vector
+            print(f"{frecuencia:<10} {plazo:>5} {tipo_cuota:<16} "
+                  f"{len(obtenido):>6} {t_bucle * 1e3:>11.3f} "
+                  f"{t_vector * 1e3:>12.3f} {speedup:>7.1f}x")
+            if frecuencia == 'Diario' and speedup < opciones.min_speedup:
+                ok = False
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
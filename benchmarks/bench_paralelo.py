@@ -0,0 +1,66 @@
+"""
+Scaling benchmark of the process-pool schedule runner.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_paralelo --prestamos 5000
+
+Generates the full schedules of the same random portfolio with 1, 2, 4 and
+8 workers, reports rows per second and the speedup over one worker, and
+checks that every run returns identical, identically ordered results.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from calculo_cuotas import generar_cronogramas
+from benchmarks.bench_cartera import cartera_aleatoria
+
+
+def ejecutar(cartera, max_workers, tamano_lote):
+    """Run the whole portfolio and return (seconds, rows, checksum)."""
+    inicio = time.perf_counter()
+    filas = 0
+    huella = []
+    for lote in generar_cronogramas(cartera, max_workers=max_workers,
+                                    tamano_lote=tamano_lote):
+        filas += len(lote.pago)
+        huella.append((lote.inicio, lote.desplazamientos[-1],
+                       float(lote.valores.sum())))
+    return time.perf_counter() - inicio, filas, huella
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=5000)
+    parser.add_argument("--tamano-lote", type=int, default=250)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    opciones = parser.parse_args(argv)
+
+    cartera = cartera_aleatoria(opciones.prestamos)
+    print(f"Préstamos: {len(cartera):,}  CPUs: {os.cpu_count()}  "
+          f"lote: {opciones.tamano_lote}")
+    print(f"{'Workers':>7} {'Segundos':>9} {'Filas/s':>12} {'Speedup':>8}")
+
+    ok = True
+    referencia = None
+    for workers in opciones.workers:
+        segundos, filas, huella = ejecutar(cartera, workers,
+                                           opciones.tamano_lote)
+        if referencia is None:
+            referencia = (segundos, huella)
+        elif [h[:2] for h in huella] != [h[:2] for h in referencia[1]] or \
+                not np.allclose([h[2] for h in huella],
+                                [h[2] for h in referencia[1]]):
+            print(f"Resultados distintos con {workers} workers")
+            ok = False
+        print(f"{workers:>7} {segundos:>9.2f} {filas / segundos:>12,.0f} "
+              f"{referencia[0] / segundos:>7.2f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Build time of the PDF export for short, long and daily schedules.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf
+
+Compares the paginated renderer with the previous single-table export.
+The time per row of the paginated renderer should stay roughly constant
+as the schedule grows. Use --sin-referencia to skip the slow baseline.
+"""
+import argparse
+import sys
+import time
+
+from calculo_cuotas import calcular_cuotas_df, convertir_a_pdf
+from benchmarks._referencia import convertir_a_pdf_tabla_unica
+
+# (frecuencia, plazo_meses) -> 36, 360 and 10,800 rows
+CASOS = [('Mensual', 36), ('Mensual', 360), ('Diario', 360)]
+
+
+def cronometrar(funcion, df):
+    """Seconds taken by one call."""
+    inicio = time.perf_counter()
+    funcion(df)
+    return time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sin-referencia", action="store_true")
+    opciones = parser.parse_args(argv)
+
+    # Warm up imports and the shared styles so they are not billed to the
+    # first case
+    muestra = calcular_cuotas_df(1000.0, 12.0, 12, 'Mensual', 'Nivelada', 'No',
+                                 0, 'No', 0, 0, 0, 0, 0, 'No', 0, 0, 0, 0)
+    convertir_a_pdf(muestra)
+    convertir_a_pdf_tabla_unica(muestra)
+
+    print(f"{'Filas':>7} {'Paginado (s)':>13} {'µs/fila':>8} "
+          f"{'Tabla única (s)':>16} {'µs/fila':>8}")
+    for frecuencia, plazo in CASOS:
+        df = calcular_cuotas_df(100000.0, 12.0, plazo, frecuencia, 'Nivelada',
+                                'Sí', 0.5, 'Sí', 350000.0, 3.5, 15.0, 5.0,
+                                50.0, 'No', 0, 0, 0, 0)
+        t_nuevo = cronometrar(convertir_a_pdf, df)
+        linea = (f"{len(df):>7,} {t_nuevo:>13.3f} "
+                 f"{t_nuevo / len(df) * 1e6:>8.0f}")
+        if not opciones.sin_referencia:
+            t_viejo = cronometrar(convertir_a_pdf_tabla_unica, df)
+            linea += f" {t_viejo:>16.3f} {t_viejo / len(df) * 1e6:>8.0f}"
+        print(linea)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark of the Monte Carlo rate simulation against one schedule per path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_simulacion --prestamos 2000 --trayectorias 1000
+
+Prices a random portfolio under seeded rate paths with simular_tasas and
+compares it with what the naive approach would take: one variable-rate
+schedule (calcular_cronograma_reajustes) per loan and path, timed on
+--muestra pairs and extrapolated. The total interest of a small slice of
+the portfolio is checked against those schedules; exits with status 1 when
+they disagree.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from calculo_cuotas import (FREQ_DICT, calcular_cronograma_reajustes,
+                            generar_trayectorias, reajustes_periodicos,
+                            simular_tasas)
+from benchmarks.bench_cartera import cartera_aleatoria
+
+
+def interes_bucle(prestamo, trayectoria, cada_meses):
+    """Total interest of one loan under one path, from its schedule."""
+    argumentos = tuple(prestamo)
+    tasas = np.maximum(argumentos[1] + trayectoria[1:] - trayectoria[0], 0)
+    if FREQ_DICT[argumentos[3]] == 0:
+        pagos = tasas = []
+    else:
+        pagos, tasas = reajustes_periodicos(tasas, cada_meses, argumentos[3])
+    cronograma = calcular_cronograma_reajustes(*argumentos, pagos, tasas)
+    return float(np.sum(cronograma["Interés"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=2000)
+    parser.add_argument("--trayectorias", type=int, default=1000)
+    parser.add_argument("--cada-meses", type=int, default=6)
+    parser.add_argument("--muestra", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=None)
+    opciones = parser.parse_args(argv)
+
+    cartera = cartera_aleatoria(opciones.prestamos)
+    n_periodos = 360 // opciones.cada_meses
+    trayectorias = generar_trayectorias(8.0, opciones.trayectorias,
+                                        n_periodos, 0.75, reversion=0.1,
+                                        semilla=0)
+
+    inicio = time.perf_counter()
+    simulacion = simular_tasas(cartera, trayectorias, opciones.cada_meses,
+                               max_workers=opciones.workers)
+    segundos = time.perf_counter() - inicio
+
+    # The naive loop, on a sample of (loan, path) pairs
+    rng = np.random.default_rng(1)
+    filas = list(cartera.itertuples(index=False))
+    pares = [(filas[i], trayectorias[k]) for i, k in zip(
+        rng.integers(0, len(filas), opciones.muestra),
+        rng.integers(0, len(trayectorias), opciones.muestra))]
+    inicio = time.perf_counter()
+    for prestamo, trayectoria in pares:
+        interes_bucle(prestamo, trayectoria, opciones.cada_meses)
+    por_par = (time.perf_counter() - inicio) / len(pares)
+    estimado = por_par * len(filas) * len(trayectorias)
+
+    # Total interest of the first loans under the first paths
+    parte = cartera.iloc[:20]
+    esperado = [sum(interes_bucle(prestamo, trayectoria, opciones.cada_meses)
+                    for prestamo in parte.itertuples(index=False))
+                for trayectoria in trayectorias[:3]]
+    obtenido = simular_tasas(parte, trayectorias[:3], opciones.cada_meses,
+                             max_workers=1).total_intereses
+    ok = np.allclose(obtenido, esperado, rtol=1e-9)
+
+    pares_totales = len(filas) * len(trayectorias)
+    print(f"Préstamos: {len(filas):,}  trayectorias: {len(trayectorias):,}  "
+          f"periodos: {len(simulacion.meses)}  CPUs: {os.cpu_count()}")
+    print(f"{'Método':<28} {'Segundos':>10} {'Pares/s':>12}")
+    print(f"{'Cronograma por par (est.)':<28} {estimado:>10.1f} "
+          f"{1 / por_par:>12,.0f}")
+    print(f"{'simular_tasas':<28} {segundos:>10.2f} "
+          f"{pares_totales / segundos:>12,.0f}")
+    print(f"Speedup: {estimado / segundos:,.0f}x")
+    print(simulacion.percentiles().iloc[::max(1, n_periodos // 10)]
+          .to_string(index=False, float_format="{:,.0f}".format))
+    if not ok:
+        print("La simulación no coincide con los cronogramas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark of variable-rate schedules against a payment-by-payment loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tasas
+
+Builds a 30-year daily loan repriced every --cada-meses months (60 resets
+by default) with the closed-form segments of aplicar_reajustes and with
+the loop of benchmarks._referencia, and times a fixed-rate base layer of
+the same loan for scale. Exits with status 1 when both disagree or the
+closed form is less than --min-speedup times faster than the loop.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from calculo_cuotas import (FREQ_DICT, aplicar_reajustes, calcular_base,
+                            reajustes_periodicos)
+from benchmarks._referencia import reajustes_bucle
+from benchmarks.bench_motor import mejor_tiempo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frecuencia", default='Diario')
+    parser.add_argument("--plazo", type=int, default=360)
+    parser.add_argument("--cada-meses", type=int, default=6)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--min-speedup", type=float, default=5.0)
+    opciones = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    n_reajustes = opciones.plazo // opciones.cada_meses - 1
+    pagos, tasas = reajustes_periodicos(
+        np.round(rng.uniform(8, 20, n_reajustes), 2), opciones.cada_meses,
+        opciones.frecuencia)
+
+    ok = True
+    print(f"{opciones.frecuencia}, {opciones.plazo} meses, "
+          f"{len(pagos)} reajustes")
+    print(f"{'Tipo':<16} {'Filas':>6} {'Tasa fija (ms)':>15} "
+          f"{'Bucle (ms)':>11} {'Tramos (ms)':>12} {'Speedup':>8}")
+    for tipo_cuota in ('Nivelada', 'Saldos Insolutos'):
+        argumentos = (100000.0, 12.0, opciones.plazo, opciones.frecuencia,
+                      tipo_cuota)
+        base = calcular_base(*argumentos)
+        capa = aplicar_reajustes(base, pagos, tasas)
+        bucle = np.array(reajustes_bucle(
+            100000.0, 12.0, opciones.plazo, FREQ_DICT[opciones.frecuencia],
+            tipo_cuota, pagos.tolist(), tasas.tolist()))
+        obtenido = np.column_stack((capa.cuota, capa.interes, capa.abono,
+                                    capa.saldo))
+        if not np.allclose(obtenido, bucle, rtol=1e-6, atol=1e-6):
+            print(f"Resultados distintos para {tipo_cuota}")
+            ok = False
+
+        t_fija = mejor_tiempo(calcular_base, argumentos,
+                              opciones.repeticiones)
+        t_bucle = mejor_tiempo(reajustes_bucle, (
+            100000.0, 12.0, opciones.plazo, FREQ_DICT[opciones.frecuencia],
+            tipo_cuota, pagos.tolist(), tasas.tolist()),
+                               opciones.repeticiones)
+        t_tramos = mejor_tiempo(aplicar_reajustes, (base, pagos, tasas),
+                                opciones.repeticiones)
+        speedup = t_bucle / t_tramos
+        print(f"{tipo_cuota:<16} {len(capa.pago):>6} {t_fija * 1e3:>15.3f} "
+              f"{t_bucle * 1e3:>11.3f} {t_tramos * 1e3:>12.3f} "
+              f"{speedup:>7.1f}x")
+        ok &= speedup >= opciones.min_speedup
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark of the batch TCEA of a portfolio against one IRR per schedule.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tcea --prestamos 1000000
+
+Prices a random portfolio mixing every frequency with tcea_cartera and
+compares it with building every schedule (calcular_cronograma) and solving
+its own IRR (tcea_cronograma), timed on --muestra loans and extrapolated.
+The sample is also used to check that both paths agree; exits with status
+1 when they do not.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from calculo_cuotas import (COLUMNAS_PRESTAMO, calcular_cronograma,
+                            tcea_cartera, tcea_cronograma)
+from benchmarks.bench_cartera import cartera_aleatoria
+
+
+def tcea_bucle(cartera):
+    """TCEA of every loan from its own schedule."""
+    tceas = []
+    for prestamo in cartera[list(COLUMNAS_PRESTAMO)].itertuples(index=False):
+        try:
+            cronograma = calcular_cronograma(*prestamo)
+        except ZeroDivisionError:
+            tceas.append(np.nan)
+            continue
+        tceas.append(tcea_cronograma(cronograma, prestamo[3], prestamo[2]))
+    return np.array(tceas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prestamos", type=int, default=1_000_000)
+    parser.add_argument("--muestra", type=int, default=500)
+    opciones = parser.parse_args(argv)
+
+    cartera = cartera_aleatoria(opciones.prestamos)
+
+    inicio = time.perf_counter()
+    tceas = tcea_cartera(cartera)
+    segundos = time.perf_counter() - inicio
+
+    muestra = cartera.iloc[:opciones.muestra]
+    inicio = time.perf_counter()
+    esperado = tcea_bucle(muestra)
+    estimado = (time.perf_counter() - inicio) / len(muestra) * len(cartera)
+    ok = np.allclose(tceas[:len(muestra)], esperado, rtol=1e-9,
+                     equal_nan=True)
+
+    print(f"Préstamos: {len(cartera):,}  TCEA mediana: "
+          f"{np.nanmedian(tceas):,.2f}%")
+    print(f"{'Método':<28} {'Segundos':>10} {'Préstamos/s':>12}")
+    print(f"{'Cronograma + TIR (est.)':<28} {estimado:>10.1f} "
+          f"{len(cartera) / estimado:>12,.0f}")
+    print(f"{'tcea_cartera':<28} {segundos:>10.2f} "
+          f"{len(cartera) / segundos:>12,.0f}")
+    print(f"Speedup: {estimado / segundos:,.0f}x")
+    if not ok:
+        print("La TCEA no coincide con la de los cronogramas")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""
+Load test of the local HTTP API: requests per second and p99 latency.
+
+Run from the repository root:
+
+    python -m benchmarks.carga_servicio --ruta resumen --conexiones 32
+    python -m benchmarks.carga_servicio --ruta prestamo --variedad 1000
+    python -m benchmarks.carga_servicio --url http://127.0.0.1:8000
+
+Without --url it starts 'python -m calculo_cuotas servir' in a separate
+process on a free port, so the client does not compete with the server
+for the GIL. Each connection is kept alive and sends its next request as
+soon as the previous answer is read, cycling the bodies in its own
+random order. --variedad sets how many distinct loans are cycled: 1
+measures the response cache, a large value mostly measures the engine.
+
+Before the load, --fallidas clients send the same failing request (a
+zero-rate 'Nivelada' loan) at once: identical requests are computed once
+and shared, and every client must still get its 422 answer and keep its
+connection.
+
+Exits with status 1 when any request fails (or a failing one is not
+answered) or the p99 latency exceeds --objetivo-p99-ms.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from calculo_cuotas import FREQ_DICT
+
+# Loan fields shared by every generated request
+BASE = {
+    "incluir_seguro": 'Sí',
+    "porcentaje_seguro": 0.5,
+    "incluir_seguro_danos": 'Sí',
+    "monto_asegurar": 350000.0,
+    "porcentaje_seguro_danos": 3.5,
+    "impuesto_danos": 15.0,
+    "bomberos_danos": 5.0,
+    "papeleria_danos": 50.0
+}
+
+
+def prestamos(variedad, semilla=0):
+    """variedad distinct loan bodies with random amount, rate and term."""
+    rng = np.random.default_rng(semilla)
+    frecuencias = list(FREQ_DICT)
+    return [dict(BASE, monto=round(float(rng.uniform(5e3, 5e5)), 2),
+                 tasa_anual=round(float(rng.uniform(6, 36)), 2),
+                 plazo_meses=int(rng.integers(12, 241)),
+                 frecuencia=frecuencias[int(rng.integers(len(frecuencias)))],
+                 tipo_cuota=('Nivelada', 'Saldos Insolutos')[
+                     int(rng.integers(2))])
+            for _ in range(variedad)]
+
+
+def cuerpos(ruta, variedad, tamano_lote):
+    """Encoded request bodies cycled by the clients."""
+    datos = prestamos(variedad * (tamano_lote if ruta == "lote" else 1))
+    if ruta == "lote":
+        datos = [datos[i:i + tamano_lote]
+                 for i in range(0, len(datos), tamano_lote)]
+    return [json.dumps(d, ensure_ascii=False).encode("utf-8") for d in datos]
+
+
+async def _leer_respuesta(reader):
+    """Status code and body length of one HTTP/1.1 response."""
+    estado = int((await reader.readline()).split()[1])
+    cabeceras = {}
+    while True:
+        linea = await reader.readline()
+        if linea in (b"\r\n", b""):
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+
+    if cabeceras.get("transfer-encoding") == "chunked":
+        total = 0
+        while True:
+            largo = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(largo + 2)
+            if largo == 0:
+                return estado, total
+            total += largo
+    largo = int(cabeceras.get("content-length", 0))
+    await reader.readexactly(largo)
+    return estado, largo
+
+
+async def _cliente(host, puerto, ruta, lista, fin, latencias, errores, bytes_):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        for cuerpo in lista:
+            if time.perf_counter() >= fin:
+                break
+            solicitud = (f"POST {ruta} HTTP/1.1\r\nHost: {host}\r\n"
+                         "Content-Type: application/json\r\n"
+                         f"Content-Length: {len(cuerpo)}\r\n\r\n").encode(
+                             "latin-1") + cuerpo
+            inicio = time.perf_counter()
+            writer.write(solicitud)
+            await writer.drain()
+            estado, largo = await _leer_respuesta(reader)
+            latencias.append(time.perf_counter() - inicio)
+            bytes_.append(largo)
+            if estado != 200:
+                errores.append(estado)
+    finally:
+        writer.close()
+
+
+async def _fallida(host, puerto, cuerpo):
+    """
+    Whether a failing /prestamo request gets its 422 and the connection
+    stays usable for the next request (GET /salud).
+    """
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        writer.write((f"POST /prestamo HTTP/1.1\r\nHost: {host}\r\n"
+                      "Content-Type: application/json\r\n"
+                      f"Content-Length: {len(cuerpo)}\r\n\r\n").encode(
+                          "latin-1") + cuerpo)
+        await writer.drain()
+        estado = (await asyncio.wait_for(_leer_respuesta(reader), 10))[0]
+        writer.write(f"GET /salud HTTP/1.1\r\nHost: {host}\r\n\r\n"
+                     .encode("latin-1"))
+        await writer.drain()
+        salud = (await asyncio.wait_for(_leer_respuesta(reader), 10))[0]
+        return estado == 422 and salud == 200
+    except (asyncio.TimeoutError, ConnectionError, ValueError,
+            IndexError):
+        return False
+    finally:
+        writer.close()
+
+
+async def comprobar_fallidas(host, puerto, clientes):
+    """
+    Send one identical failing request from several clients at once.
+
+    Returns:
+        Number of clients that did not get a 422 answer on a connection
+        that is still alive
+    """
+    # A distinct amount per run keeps the response cache out of the way
+    cuerpo = json.dumps(dict(BASE, monto=1000 + time.time_ns() % 10**6,
+                             tasa_anual=0, plazo_meses=12,
+                             frecuencia='Mensual', tipo_cuota='Nivelada'),
+                        ensure_ascii=False).encode("utf-8")
+    respondidas = await asyncio.gather(*(_fallida(host, puerto, cuerpo)
+                                         for _ in range(clientes)))
+    return respondidas.count(False)
+
+
+async def cargar(host, puerto, ruta, datos, conexiones, duracion):
+    """
+    Hammer one route from several keep-alive connections.
+
+    Returns:
+        (latencies in seconds, failed status codes, body sizes, wall time)
+    """
+    latencias, errores, bytes_ = [], [], []
+    rng = np.random.default_rng(1)
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    # Each connection cycles the bodies in its own order
+    await asyncio.gather(*(
+        _cliente(host, puerto, ruta,
+                 itertools.cycle([datos[j]
+                                  for j in rng.permutation(len(datos))]),
+                 fin, latencias, errores, bytes_)
+        for _ in range(conexiones)))
+    return latencias, errores, bytes_, time.perf_counter() - inicio
+
+
+def puerto_libre():
+    """A TCP port nobody is listening on right now."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(puerto, hilos):
+    """Start the API in a child process and wait until it answers."""
+    comando = [sys.executable, "-m", "calculo_cuotas", "servir",
+               "--puerto", str(puerto)]
+    if hilos:
+        comando += ["--hilos", str(hilos)]
+    proceso = subprocess.Popen(comando, stderr=subprocess.DEVNULL,
+                               cwd=os.path.dirname(os.path.dirname(
+                                   os.path.abspath(__file__))))
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", puerto), 0.2).close()
+            return proceso
+        except OSError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError("The API did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="API already running (by default one "
+                        "is started on a free port)")
+    parser.add_argument("--ruta", choices=["resumen", "prestamo", "lote"],
+                        default="resumen")
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--duracion", type=float, default=10.0,
+                        help="Seconds of load")
+    parser.add_argument("--calentamiento", type=float, default=1.0,
+                        help="Seconds of unmeasured load first")
+    parser.add_argument("--variedad", type=int, default=100,
+                        help="Distinct request bodies cycled")
+    parser.add_argument("--tamano-lote", type=int, default=100,
+                        help="Loans per /lote request")
+    parser.add_argument("--hilos", type=int,
+                        help="--hilos of the started API")
+    parser.add_argument("--objetivo-p99-ms", type=float)
+    parser.add_argument("--fallidas", type=int, default=8,
+                        help="Concurrent identical failing requests sent "
+                        "first (0: none)")
+    opciones = parser.parse_args(argv)
+
+    proceso = None
+    if opciones.url:
+        url = urlsplit(opciones.url)
+        host, puerto = url.hostname, url.port or 80
+    else:
+        host, puerto = "127.0.0.1", puerto_libre()
+        proceso = iniciar_servidor(puerto, opciones.hilos)
+
+    try:
+        datos = cuerpos(opciones.ruta, opciones.variedad,
+                        opciones.tamano_lote)
+        ruta = "/" + opciones.ruta
+        sin_respuesta = asyncio.run(comprobar_fallidas(
+            host, puerto, opciones.fallidas)) if opciones.fallidas else 0
+        if opciones.calentamiento > 0:
+            asyncio.run(cargar(host, puerto, ruta, datos,
+                               opciones.conexiones, opciones.calentamiento))
+        latencias, errores, bytes_, segundos = asyncio.run(cargar(
+            host, puerto, ruta, datos, opciones.conexiones,
+            opciones.duracion))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    ms = np.array(latencias) * 1e3
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    print(f"Ruta:         {ruta} ({opciones.conexiones} conexiones, "
+          f"{opciones.variedad} cuerpos distintos)")
+    print(f"Solicitudes:  {len(ms):,} en {segundos:.1f} s -> "
+          f"{len(ms) / segundos:,.0f} req/s")
+    print(f"Latencia:     p50 {p50:.2f} ms, p90 {p90:.2f} ms, "
+          f"p99 {p99:.2f} ms, máx {ms.max():.2f} ms")
+    print(f"Respuesta:    {np.mean(bytes_):,.0f} bytes de media")
+    print(f"Errores:      {len(errores)}")
+    if opciones.fallidas:
+        print(f"Fallidas:     {opciones.fallidas - sin_respuesta} de "
+              f"{opciones.fallidas} respondidas con 422")
+    ok = (not errores and not sin_respuesta and
+          (opciones.objetivo_p99_ms is None or
+           p99 <= opciones.objetivo_p99_ms))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Benchmark suite of every stage from schedule build to download links.
+
+Run from the repository root; it needs no network access:
+
+    python -m benchmarks.suite ejecutar --salida base.json
+    python -m benchmarks.suite ejecutar --salida nuevo.json --plazos 1-360
+    python -m benchmarks.suite comparar base.json nuevo.json
+
+'ejecutar' times each stage for every combination of frequency, payment
+type, insurance on/off and term, and writes the results as JSON.
+Build, exact-centavo build and display formatting sweep the whole grid.
+The exports (Excel, PDF and their base64 links) are far slower per case,
+so they sweep --plazos-exportacion, unless --completo is given.
+
+'comparar' matches the cases of two result files and exits with status 1
+when the geometric mean time of a stage got slower than the threshold.
+Single cases are too noisy to gate on; the ones that slowed down the most
+are listed to help find the cause.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculo_cuotas import (FREQ_DICT, calcular_cuotas_df, convertir_a_excel,
+                            convertir_a_pdf, formatear_tabla,
+                            generar_link_descarga_excel,
+                            generar_link_descarga_pdf)
+
+# Stage name -> function of the schedule DataFrame (None: the build itself)
+ETAPAS = {
+    "construccion": None,
+    "centavos": None,
+    "formato": formatear_tabla,
+    "excel": convertir_a_excel,
+    "pdf": convertir_a_pdf,
+    "enlace_excel": generar_link_descarga_excel,
+    "enlace_pdf": generar_link_descarga_pdf,
+}
+ETAPAS_EXPORTACION = ("excel", "pdf", "enlace_excel", "enlace_pdf")
+
+# Fields identifying a case in the results
+CLAVE = ("etapa", "frecuencia", "tipo_cuota", "seguros", "plazo")
+
+
+def leer_plazos(texto):
+    """Parse '1-360' or '12,36,60-120' into a sorted list of months."""
+    plazos = set()
+    for parte in texto.split(","):
+        desde, _, hasta = parte.partition("-")
+        plazos.update(range(int(desde), int(hasta or desde) + 1))
+    return sorted(plazos)
+
+
+def argumentos(frecuencia, tipo_cuota, seguros, plazo):
+    """calcular_cuotas_df arguments; seguros holds three on/off flags."""
+    prestamo, danos, vehiculo = ('Sí' if s else 'No' for s in seguros)
+    return (100000.0, 12.0, plazo, frecuencia, tipo_cuota, prestamo, 0.5,
+            danos, 350000.0, 3.5, 15.0, 5.0, 50.0, vehiculo, 500000.0, 12.0,
+            15.0, 250.0)
+
+
+def mejor_tiempo(funcion, repeticiones):
+    """Best wall time of repeticiones calls, in seconds."""
+    mejor = math.inf
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def ejecutar(etapas, plazos, plazos_exportacion, repeticiones, progreso=None):
+    """
+    Time every stage over the grid of cases.
+
+    Args:
+        etapas: Names of ETAPAS to run
+        plazos: Terms (months) for the build and formatting stages
+        plazos_exportacion: Terms for the export stages
+        repeticiones: Calls per case; the best time is kept
+        progreso: Optional function called with each result
+
+    Returns:
+        List of dicts with the CLAVE fields, 'filas' and 'segundos'
+        (None when the term holds no whole payment)
+    """
+    resultados = []
+    combinaciones = itertools.product(
+        FREQ_DICT, ('Nivelada', 'Saldos Insolutos'),
+        itertools.product((False, True), repeat=3), sorted(
+            set(plazos) | set(plazos_exportacion)))
+    for frecuencia, tipo_cuota, seguros, plazo in combinaciones:
+        args = argumentos(frecuencia, tipo_cuota, seguros, plazo)
+        try:
+            df = calcular_cuotas_df(*args)
+        except ZeroDivisionError:
+            df = None
+
+        for etapa in etapas:
+            en_rejilla = plazos_exportacion if etapa in ETAPAS_EXPORTACION \
+                else plazos
+            if plazo not in en_rejilla:
+                continue
+            if df is None:
+                segundos = None
+            elif etapa == "construccion":
+                segundos = mejor_tiempo(lambda: calcular_cuotas_df(*args),
+                                        repeticiones)
+            elif etapa == "centavos":
+                segundos = mejor_tiempo(
+                    lambda: calcular_cuotas_df(*args, exacto=True),
+                    repeticiones)
+            else:
+                funcion = ETAPAS[etapa]
+                segundos = mejor_tiempo(lambda: funcion(df), repeticiones)
+            resultado = {
+                "etapa": etapa,
+                "frecuencia": frecuencia,
+                "tipo_cuota": tipo_cuota,
+                "seguros": "".join("SDV"[i] if s else "-"
+                                   for i, s in enumerate(seguros)),
+                "plazo": plazo,
+                "filas": 0 if df is None else len(df),
+                "segundos": segundos
+            }
+            resultados.append(resultado)
+            if progreso is not None:
+                progreso(resultado)
+    return resultados
+
+
+def entorno():
+    """Versions and machine the results were measured on."""
+    return {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine()
+    }
+
+
+def comparar(base, nuevo, umbral, minimo):
+    """
+    Regressions of nuevo against base.
+
+    Args:
+        base: Results list of the reference run
+        nuevo: Results list of the run to check
+        umbral: Allowed slowdown, as a fraction (0.25 is 25 % slower)
+        minimo: Noise floor in seconds; single cases whose time grew by
+            less are never flagged
+
+    Returns:
+        (stage summary rows, slowed-down case rows); each summary row is
+        (etapa, cases, geometric mean ratio, flagged)
+    """
+    anteriores = {tuple(r[c] for c in CLAVE): r for r in base}
+    cocientes, casos = {}, []
+    for r in nuevo:
+        anterior = anteriores.get(tuple(r[c] for c in CLAVE))
+        if anterior is None or not anterior["segundos"] or \
+                r["segundos"] is None:
+            continue
+        cociente = r["segundos"] / anterior["segundos"]
+        cocientes.setdefault(r["etapa"], []).append(cociente)
+        if cociente > 1 + umbral and \
+                r["segundos"] - anterior["segundos"] > minimo:
+            casos.append((r, anterior["segundos"], cociente))
+
+    etapas = []
+    for etapa, valores in cocientes.items():
+        media = math.exp(sum(math.log(v) for v in valores) / len(valores))
+        etapas.append((etapa, len(valores), media, media > 1 + umbral))
+    return etapas, casos
+
+
+def _comando_ejecutar(opciones):
+    plazos = leer_plazos(opciones.plazos)
+    plazos_exportacion = plazos if opciones.completo else leer_plazos(
+        opciones.plazos_exportacion)
+
+    def progreso(resultado):
+        if opciones.verbose:
+            segundos = resultado["segundos"]
+            texto = "-" if segundos is None else f"{segundos * 1e3:.3f} ms"
+            print(" ".join(str(resultado[c]) for c in CLAVE), texto,
+                  file=sys.stderr)
+
+    inicio = time.perf_counter()
+    resultados = ejecutar(opciones.etapas, plazos, plazos_exportacion,
+                          opciones.repeticiones, progreso)
+    with open(opciones.salida, "w", encoding="utf-8") as archivo:
+        json.dump({"entorno": entorno(),
+                   "repeticiones": opciones.repeticiones,
+                   "resultados": resultados}, archivo, ensure_ascii=False,
+                  indent=1)
+
+    tabla = pd.DataFrame(resultados).dropna(subset=["segundos"])
+    resumen = tabla.groupby("etapa", sort=False).agg(
+        casos=("segundos", "size"), total_s=("segundos", "sum"),
+        mediana_ms=("segundos", lambda s: s.median() * 1e3),
+        filas_por_s=("filas", "sum"))
+    resumen["filas_por_s"] = resumen["filas_por_s"] / resumen["total_s"]
+    print(resumen.to_string(float_format=lambda x: f"{x:,.3f}"))
+    print(f"{len(resultados):,} mediciones en "
+          f"{time.perf_counter() - inicio:,.1f} s -> {opciones.salida}")
+    return 0
+
+
+def _comando_comparar(opciones):
+    with open(opciones.base, encoding="utf-8") as archivo:
+        base = json.load(archivo)["resultados"]
+    with open(opciones.nuevo, encoding="utf-8") as archivo:
+        nuevo = json.load(archivo)["resultados"]
+
+    etapas, casos = comparar(base, nuevo, opciones.umbral,
+                             opciones.minimo_ms / 1e3)
+    print(f"{'Etapa':<14} {'Casos':>6} {'Nuevo/base':>11}")
+    for etapa, n_casos, media, lenta in etapas:
+        marca = "  <- REGRESIÓN" if lenta else ""
+        print(f"{etapa:<14} {n_casos:>6} {media:>10.2f}x{marca}")
+    casos = sorted(casos, key=lambda c: -c[2])[:opciones.mostrar]
+    if casos:
+        print(f"\nCasos más lentos (de {opciones.mostrar} como máximo):")
+    for r, anterior, cociente in casos:
+        print(f"  {' '.join(str(r[c]) for c in CLAVE)}: "
+              f"{anterior * 1e3:.3f} -> {r['segundos'] * 1e3:.3f} ms "
+              f"({cociente:.2f}x)")
+    return 1 if any(lenta for *_, lenta in etapas) else 0
+
+
+def crear_parser():
+    """Build the argument parser of the suite."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite",
+        description=__doc__.splitlines()[1])
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    correr = comandos.add_parser("ejecutar", help="Measure and save results")
+    correr.add_argument("--salida", default="resultados_benchmark.json")
+    correr.add_argument("--etapas", nargs="+", choices=list(ETAPAS),
+                        default=list(ETAPAS))
+    correr.add_argument("--plazos", default="1,6,12,13,24,36,60,120,240,360",
+                        help="Months, e.g. '1-360' or '12,36,60-120'")
+    correr.add_argument("--plazos-exportacion", default="12,120",
+                        help="Months for the Excel, PDF and link stages")
+    correr.add_argument("--completo", action="store_true",
+                        help="Use --plazos for the export stages too")
+    correr.add_argument("--repeticiones", type=int, default=3)
+    correr.add_argument("--verbose", action="store_true",
+                        help="Print every measurement to stderr")
+    correr.set_defaults(funcion=_comando_ejecutar)
+
+    comparacion = comandos.add_parser(
+        "comparar", help="Flag regressions between two result files")
+    comparacion.add_argument("base")
+    comparacion.add_argument("nuevo")
+    comparacion.add_argument("--umbral", type=float, default=0.25,
+                             help="Allowed slowdown (0.25 = 25 %%)")
+    comparacion.add_argument("--minimo-ms", type=float, default=1.0,
+                             help="Noise floor for single cases, in ms")
+    comparacion.add_argument("--mostrar", type=int, default=10,
+                             help="Slowed-down cases to list")
+    comparacion.set_defaults(funcion=_comando_comparar)
+    return parser
+
+
+def main(argv=None):
+    opciones = crear_parser().parse_args(argv)
+    return opciones.funcion(opciones)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Loan payment calculation engine used by the Streamlit app.
+
+The package has no Streamlit dependency. Public names are loaded from
+their submodule on first access, so ``import calculo_cuotas`` stays cheap
+and batch workers only pay for the modules they actually use (pandas,
+reportlab and openpyxl are never imported by the array engine).
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "COLUMNAS": "motor",
+    "CapaBase": "motor",
+    "FREQ_DICT": "motor",
+    "a_centavos": "motor",
+    "base_en_centavos": "motor",
+    "calcular_base": "motor",
+    "calcular_cuotas_arrays": "motor",
+    "calcular_cuotas_centavos": "motor",
+    "calcular_cuotas_df": "motor",
+    "capa_seguro_danos": "motor",
+    "capa_seguro_prestamo": "motor",
+    "capa_seguro_vehiculo": "motor",
+    "combinar_capas": "motor",
+    "cuota_nivelada": "motor",
+    "saldo_nivelada": "motor",
+    "seguro_en_centavos": "motor",
+    "calcular_seguro_danos": "seguros",
+    "calcular_seguro_vehiculo": "seguros",
+    "seguro_por_pago": "seguros",
+    "BANDERAS_SEGURO": "cartera",
+    "COLUMNAS_PRESTAMO": "cartera",
+    "COLUMNAS_RESUMEN": "cartera",
+    "leer_cartera": "cartera",
+    "normalizar_banderas": "cartera",
+    "parametros_cartera": "cartera",
+    "resumir_cartera": "cartera",
+    "resumir_prestamo": "cartera",
+    "totales_cartera": "cartera",
+    "tcea_cartera": "costo",
+    "tcea_cronograma": "costo",
+    "tcea_flujos": "costo",
+    "tcea_prestamo": "costo",
+    "COLUMNAS_FLUJO": "flujos",
+    "proyectar_flujos": "flujos",
+    "COLUMNAS_CONSULTA": "consultas",
+    "consultar_saldo": "consultas",
+    "saldo_en_pago": "consultas",
+    "monto_maximo": "objetivo",
+    "plazo_minimo": "objetivo",
+    "tasa_implicita": "objetivo",
+    "COLUMNAS_ESCENARIO": "escenarios",
+    "barrer_escenarios": "escenarios",
+    "matriz_escenarios": "escenarios",
+    "resumen_escenarios": "escenarios",
+    "COLUMNAS_ABONOS": "abonos",
+    "COLUMNAS_RESUMEN_ABONOS": "abonos",
+    "MODOS_ABONO": "abonos",
+    "abonos_recurrentes": "abonos",
+    "aplicar_abonos": "abonos",
+    "calcular_cronograma_abonos": "abonos",
+    "resumir_abonos": "abonos",
+    "resumir_abonos_prestamo": "abonos",
+    "COLUMNAS_TASA_VARIABLE": "tasa_variable",
+    "aplicar_reajustes": "tasa_variable",
+    "calcular_cronograma_reajustes": "tasa_variable",
+    "cuota_tramo": "tasa_variable",
+    "reajustes_periodicos": "tasa_variable",
+    "saldo_tramo": "tasa_variable",
+    "MEDIDAS_SIMULACION": "simulacion",
+    "SimulacionTasas": "simulacion",
+    "generar_trayectorias": "simulacion",
+    "simular_tasas": "simulacion",
+    "COLUMNAS_FECHAS": "fechas",
+    "CONVENCIONES": "fechas",
+    "calcular_base_fechas": "fechas",
+    "calcular_cronograma_fechas": "fechas",
+    "convencion_defecto": "fechas",
+    "fechas_pago": "fechas",
+    "fraccion_año": "fechas",
+    "sumar_meses": "fechas",
+    "Cronograma": "cronograma",
+    "calcular_cronograma": "cronograma",
+    "LoteCronogramas": "paralelo",
+    "generar_cronogramas": "paralelo",
+    "leer_archivo_cartera": "paralelo",
+    "FORMATOS_ESTADO": "estados",
+    "generar_estados": "estados",
+    "LIMITES_SEGUNDOS": "metricas",
+    "REGISTRO_METRICAS": "metricas",
+    "RegistroMetricas": "metricas",
+    "escribir_metricas": "metricas",
+    "medir": "metricas",
+    "servir_metricas": "metricas",
+    "CACHE_RESPUESTAS": "servicio",
+    "ErrorSolicitud": "servicio",
+    "ServicioCalculo": "servicio",
+    "leer_prestamo": "servicio",
+    "servir": "servicio",
+    "CACHE_CAPAS": "cache",
+    "CACHE_CUOTAS": "cache",
+    "CACHE_EXPORTACIONES": "cache",
+    "CacheCalculos": "cache",
+    "calcular_cronograma_cacheado": "cache",
+    "calcular_cuotas_df_cacheado": "cache",
+    "clave_prestamo": "cache",
+    "exportar_cacheado": "cache",
+    "convertir_a_excel": "exportar",
+    "convertir_a_pdf": "exportar",
+    "formatear_tabla": "exportar",
+    "generar_link_descarga_excel": "exportar",
+    "generar_link_descarga_pdf": "exportar",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTS.get(nombre)
+    if modulo is None:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,252 @@
+"""
+Command line entry point.
+
+    python -m calculo_cuotas prestamo 10000 12 36 --frecuencia Mensual
+    python -m calculo_cuotas prestamo 10000 12 36 --seguro 0.5 --salida tabla.pdf
+    python -m calculo_cuotas prestamo 10000 12 36 --abono 12 2000 --modo-abono cuota
+    python -m calculo_cuotas prestamo 10000 12 36 --reajuste 13 15 --reajuste 25 18
+    python -m calculo_cuotas prestamo 10000 12 36 --fecha-desembolso 2025-01-31
+    python -m calculo_cuotas cartera prestamos.csv --salida resumen.csv
+    python -m calculo_cuotas flujos prestamos.csv --mes-desembolso mes
+    python -m calculo_cuotas estados prestamos.csv --salida estados.zip
+    python -m calculo_cuotas servir --puerto 8000
+"""
+import argparse
+import datetime
+import os
+import sys
+
+from .fechas import CONVENCIONES
+from .motor import FREQ_DICT
+
+
+def _argumentos_prestamo(opciones):
+    """calcular_cuotas_df arguments for the 'prestamo' command."""
+    danos = opciones.seguro_danos or [0.0] * 5
+    vehiculo = opciones.seguro_vehiculo or [0.0] * 4
+    return (opciones.monto, opciones.tasa, opciones.plazo, opciones.frecuencia,
+            opciones.tipo_cuota, 'Sí' if opciones.seguro is not None else 'No',
+            opciones.seguro or 0.0, 'Sí' if opciones.seguro_danos else 'No',
+            *danos, 'Sí' if opciones.seguro_vehiculo else 'No', *vehiculo)
+
+
+def _guardar(df, salida):
+    """Write a DataFrame to CSV, Excel or PDF depending on the extension."""
+    extension = os.path.splitext(salida)[1].lower()
+    if extension == '.xlsx':
+        from .exportar import convertir_a_excel
+        datos = convertir_a_excel(df).getvalue()
+    elif extension == '.pdf':
+        from .exportar import convertir_a_pdf
+        datos = convertir_a_pdf(df).getvalue()
+    else:
+        datos = df.to_csv(index=False).encode('utf-8')
+    with open(salida, 'wb') as archivo:
+        archivo.write(datos)
+
+
+def _comando_prestamo(opciones):
+    from .motor import calcular_cuotas_df
+
+    if sum(map(bool, (opciones.centavos, opciones.abono, opciones.reajuste,
+                      opciones.fecha_desembolso))) > 1:
+        print("--centavos, --abono, --reajuste y --fecha-desembolso no se "
+              "pueden combinar", file=sys.stderr)
+        return 2
+    if opciones.fecha_desembolso:
+        from .fechas import calcular_cronograma_fechas
+
+        df = calcular_cronograma_fechas(
+            *_argumentos_prestamo(opciones), opciones.fecha_desembolso,
+            opciones.convencion).a_dataframe()
+    elif opciones.reajuste:
+        from .tasa_variable import calcular_cronograma_reajustes
+
+        pagos, tasas = zip(*opciones.reajuste)
+        df = calcular_cronograma_reajustes(
+            *_argumentos_prestamo(opciones), [int(p) for p in pagos],
+            tasas).a_dataframe()
+    elif opciones.abono:
+        from .abonos import calcular_cronograma_abonos
+
+        pagos, montos = zip(*opciones.abono)
+        df = calcular_cronograma_abonos(
+            *_argumentos_prestamo(opciones), [int(p) for p in pagos], montos,
+            opciones.modo_abono).a_dataframe()
+    else:
+        df = calcular_cuotas_df(*_argumentos_prestamo(opciones),
+                                exacto=opciones.centavos)
+    if opciones.salida:
+        _guardar(df, opciones.salida)
+    else:
+        print(df.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
+    return 0
+
+
+def _comando_cartera(opciones):
+    from .cartera import resumir_cartera
+    from .paralelo import leer_archivo_cartera
+
+    cartera = leer_archivo_cartera(opciones.archivo)
+    resumen = resumir_cartera(cartera)
+    if opciones.salida:
+        resumen.to_csv(opciones.salida, index=False)
+    else:
+        resumen.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def _comando_flujos(opciones):
+    from .flujos import proyectar_flujos
+
+    flujos = proyectar_flujos(opciones.archivo,
+                              mes_desembolso=opciones.mes_desembolso or 0,
+                              meses=opciones.meses)
+    if opciones.salida:
+        _guardar(flujos, opciones.salida)
+    else:
+        print(flujos.to_string(index=False,
+                               float_format=lambda x: f"{x:,.2f}"))
+    return 0
+
+
+def _comando_estados(opciones):
+    from .estados import generar_estados
+
+    def progreso(hechos, total):
+        print(f"\r{hechos:,} / {total:,} préstamos", end="", file=sys.stderr,
+              flush=True)
+
+    resultado = generar_estados(
+        opciones.archivo, opciones.salida, formatos=opciones.formatos,
+        columna_id=opciones.columna_id, max_workers=opciones.procesos,
+        progreso=progreso)
+    print(file=sys.stderr)
+    print(f"Generados: {resultado['generados']:,}, ya existentes: "
+          f"{resultado['omitidos']:,}, sin tabla: "
+          f"{len(resultado['sin_tabla']):,} "
+          f"({resultado['bytes'] / 1e6:,.1f} MB)")
+    return 0
+
+
+def _comando_servir(opciones):
+    from .servicio import servir
+
+    print(f"API en http://{opciones.direccion}:{opciones.puerto}",
+          file=sys.stderr)
+    servir(opciones.puerto, opciones.direccion, opciones.hilos)
+    return 0
+
+
+def crear_parser():
+    """Build the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m calculo_cuotas",
+        description="Cálculo de cuotas y tablas de amortización.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    prestamo = comandos.add_parser(
+        "prestamo", help="Tabla de amortización de un préstamo")
+    prestamo.add_argument("monto", type=float, help="Monto del préstamo")
+    prestamo.add_argument("tasa", type=float, help="Tasa de interés anual (%%)")
+    prestamo.add_argument("plazo", type=int, help="Plazo en meses")
+    prestamo.add_argument("--frecuencia", choices=list(FREQ_DICT),
+                          default='Mensual')
+    prestamo.add_argument("--tipo-cuota", choices=['Nivelada',
+                                                   'Saldos Insolutos'],
+                          default='Nivelada')
+    prestamo.add_argument("--seguro", type=float, metavar="PORCENTAJE",
+                          help="Seguro de préstamo, %% por cada L. 1,000")
+    prestamo.add_argument("--seguro-danos", type=float, nargs=5,
+                          metavar=("MONTO", "PORCENTAJE", "IMPUESTO",
+                                   "BOMBEROS", "PAPELERIA"),
+                          help="Seguro de daños")
+    prestamo.add_argument("--seguro-vehiculo", type=float, nargs=4,
+                          metavar=("VALOR", "PORCENTAJE", "IMPUESTO", "GASTO"),
+                          help="Seguro de vehículo")
+    prestamo.add_argument("--centavos", action="store_true",
+                          help="Redondear cada monto a centavos para que "
+                          "la tabla cuadre exactamente")
+    prestamo.add_argument("--abono", type=float, nargs=2, action="append",
+                          metavar=("PAGO", "MONTO"),
+                          help="Abono extraordinario junto con el pago "
+                          "PAGO (se puede repetir)")
+    prestamo.add_argument("--modo-abono", choices=["plazo", "cuota"],
+                          default="plazo",
+                          help="Qué reducen los abonos: el plazo (misma "
+                          "cuota) o la cuota (mismo plazo)")
+    prestamo.add_argument("--reajuste", type=float, nargs=2, action="append",
+                          metavar=("PAGO", "TASA"),
+                          help="Nueva tasa anual (%%) desde el pago PAGO "
+                          "(se puede repetir)")
+    prestamo.add_argument("--fecha-desembolso", metavar="AAAA-MM-DD",
+                          type=datetime.date.fromisoformat,
+                          help="Fechas de pago reales desde esta fecha de "
+                          "desembolso")
+    prestamo.add_argument("--convencion", choices=list(CONVENCIONES),
+                          help="Convención de días con --fecha-desembolso "
+                          "(por defecto, Actual/365 para pagos semanales y "
+                          "diarios y 30/360 para el resto)")
+    prestamo.add_argument("--salida",
+                          help="Archivo .csv, .xlsx o .pdf (por defecto, "
+                          "la tabla se imprime)")
+    prestamo.set_defaults(funcion=_comando_prestamo)
+
+    cartera = comandos.add_parser(
+        "cartera", help="Resumen por préstamo de un archivo de cartera")
+    cartera.add_argument("archivo",
+                         help="Archivo CSV, Excel o Parquet de préstamos")
+    cartera.add_argument("--salida", help="Archivo CSV del resumen")
+    cartera.set_defaults(funcion=_comando_cartera)
+
+    flujos = comandos.add_parser(
+        "flujos", help="Flujo de caja mensual de un archivo de cartera")
+    flujos.add_argument("archivo",
+                        help="Archivo CSV, Excel o Parquet de préstamos")
+    flujos.add_argument("--mes-desembolso", metavar="COLUMNA",
+                        help="Columna con el mes de desembolso de cada "
+                        "préstamo (0 = este mes, negativo = ya desembolsado)")
+    flujos.add_argument("--meses", type=int,
+                        help="Meses a proyectar (por defecto, hasta el "
+                        "último pago)")
+    flujos.add_argument("--salida",
+                        help="Archivo .csv, .xlsx o .pdf (por defecto, "
+                        "la proyección se imprime)")
+    flujos.set_defaults(funcion=_comando_flujos)
+
+    estados = comandos.add_parser(
+        "estados", help="Estado de cuenta PDF y Excel de cada préstamo")
+    estados.add_argument("archivo",
+                         help="Archivo CSV, Excel o Parquet de préstamos")
+    estados.add_argument("--salida", required=True,
+                         help="Carpeta o archivo .zip; si ya existe, se "
+                         "continúa donde quedó")
+    estados.add_argument("--formatos", nargs="+", choices=["pdf", "xlsx"],
+                         default=["pdf", "xlsx"])
+    estados.add_argument("--columna-id",
+                         help="Columna con el identificador de cada "
+                         "préstamo, usado como nombre de archivo")
+    estados.add_argument("--procesos", type=int,
+                         help="Procesos de trabajo (por defecto, uno por "
+                         "CPU)")
+    estados.set_defaults(funcion=_comando_estados)
+
+    servidor = comandos.add_parser(
+        "servir", help="API HTTP JSON local del motor de cálculo")
+    servidor.add_argument("--puerto", type=int, default=8000)
+    servidor.add_argument("--direccion", default="127.0.0.1",
+                          help="Dirección en la que escuchar (por defecto, "
+                          "solo conexiones locales)")
+    servidor.add_argument("--hilos", type=int,
+                          help="Hilos que calculan y serializan respuestas")
+    servidor.set_defaults(funcion=_comando_servir)
+    return parser
+
+
+def main(argv=None):
+    opciones = crear_parser().parse_args(argv)
+    return opciones.funcion(opciones)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""
+Extra payments (abonos extraordinarios) and their effect on a loan.
+
+An extra payment is made together with a regular payment and goes wholly
+to principal. After it the loan either keeps its cuota and ends sooner
+('plazo') or keeps its term and pays a lower cuota ('cuota'). Both follow
+from the original schedule in closed form:
+
+- 'plazo': an extra payment E made with payment k lowers every later
+  balance by E * (1 + r)**(j - k) on a 'Nivelada' loan (the unchanged
+  cuota no longer pays interest on E) and by E on a 'Saldos Insolutos'
+  loan (the fixed principal payment does not change).
+- 'cuota': spreading the remaining balance over the remaining payments
+  scales every later row of the original schedule by one factor, which
+  drops by E / saldo original at each extra payment.
+
+So a schedule with any number of extra payments is a few cumulative sums
+over the rows from the first extra payment on; the rows before it are
+those of the original schedule. resumir_abonos answers the same question
+for a whole portfolio without building any schedule: it steps from one
+extra payment to the next for every loan at once, with the closed-form
+balance and interest of the regular payments in between.
+"""
+import numpy as np
+import pandas as pd
+
+from .cartera import COLUMNAS_PRESTAMO, parametros_cartera
+from .metricas import medir
+from .motor import (COLUMNAS, calcular_base, capa_seguro_danos,
+                    capa_seguro_prestamo, capa_seguro_vehiculo,
+                    combinar_capas)
+
+# What the loan keeps after an extra payment: its cuota ('plazo', the
+# term gets shorter) or its term ('cuota', the cuota gets lower)
+MODOS_ABONO = ("plazo", "cuota")
+
+# Columns of a schedule with extra payments, in display order
+COLUMNAS_ABONOS = COLUMNAS[:4] + ["Abono Extra"] + COLUMNAS[4:]
+
+# Columns returned by resumir_abonos
+COLUMNAS_RESUMEN_ABONOS = [
+    "Pagos", "Pagos con Abonos", "Cuota con Abonos", "Total Abonos Extra",
+    "Total Intereses", "Total Intereses con Abonos", "Ahorro en Intereses",
+    "Ahorro en Seguros"
+]
+
+# A balance at or below half a centavo counts as paid off
+_TOLERANCIA = 0.005
+
+
+def _validar_modo(modo):
+    if modo not in MODOS_ABONO:
+        raise ValueError(f"modo must be one of {MODOS_ABONO}")
+
+
+def abonos_recurrentes(monto, cada, hasta, desde=None):
+    """
+    Payment numbers and amounts of a recurring extra payment.
+
+    Args:
+        monto: Amount paid on each occasion
+        cada: Number of payments between two extra payments
+        hasta: Last payment number that may carry one
+        desde: First payment carrying one (defaults to cada)
+
+    Returns:
+        (pagos, montos) arrays, ready for the pagos_abono and
+        montos_abono arguments
+    """
+    if cada < 1:
+        raise ValueError("cada must be at least 1")
+    pagos = np.arange(cada if desde is None else desde, hasta + 1, cada)
+    return pagos, np.full(len(pagos), float(monto))
+
+
+def _extras_por_pago(n_pagos, pagos_abono, montos_abono):
+    """
+    Extra amount of every payment of a schedule.
+
+    Extra payments on or after the last payment are dropped (there is no
+    balance left to prepay) and several on one payment are added up.
+    """
+    pagos, montos = np.broadcast_arrays(
+        np.asarray(pagos_abono, dtype=np.int64),
+        np.asarray(montos_abono, dtype=float))
+    pagos, montos = pagos.ravel(), montos.ravel()
+    if (montos < 0).any():
+        raise ValueError("montos_abono may not be negative")
+    validos = (pagos >= 1) & (pagos < n_pagos) & (montos > 0)
+    return np.bincount(pagos[validos] - 1, weights=montos[validos],
+                       minlength=n_pagos).astype(float)
+
+
+def _anteriores(valores, primero):
+    """valores shifted one row down, with primero in the first row."""
+    anteriores = np.empty_like(valores)
+    anteriores[:1] = primero
+    anteriores[1:] = valores[:-1]
+    return anteriores
+
+
+def aplicar_abonos(base, pagos_abono, montos_abono, modo="plazo"):
+    """
+    Base layer of a loan after extra payments.
+
+    Args:
+        base: CapaBase in Lempiras (see calcular_base)
+        pagos_abono: Payment number of each extra payment (it is made
+            together with that payment)
+        montos_abono: Amount of each extra payment, or one for all
+        modo: 'plazo' to keep the cuota and shorten the term, 'cuota' to
+            keep the term and lower the cuota
+
+    Returns:
+        (CapaBase, extra amount of each payment); the layer ends on the
+        payment that leaves no balance and only charges insurance up to
+        a year before that payment, as calcular_base does
+    """
+    _validar_modo(modo)
+    if np.ndim(base.tasa_periodo):
+        raise ValueError("aplicar_abonos needs a fixed-rate base layer")
+    n_pagos = len(base.pago)
+    extra = _extras_por_pago(n_pagos, pagos_abono, montos_abono)
+    con_extra = np.flatnonzero(extra)
+    if not len(con_extra):
+        return base, extra
+
+    # Rows before the first extra payment are those of the base layer
+    desde = con_extra[0]
+    saldo_inicial = base.saldo[desde - 1] if desde else base.monto
+    r = base.tasa_periodo
+    saldo_original = base.saldo[desde:]
+    extra_cola = extra[desde:]
+
+    if modo == "plazo":
+        crecimiento = 1 + r if base.tipo_cuota == 'Nivelada' else 1.0
+        potencia = crecimiento**np.arange(len(extra_cola), dtype=float)
+        # Balance paid ahead by the extra payments, grown by the interest
+        # the regular cuota no longer has to pay on it
+        adelanto = potencia * np.cumsum(extra_cola / potencia)
+        adelanto_anterior = _anteriores(adelanto, 0.0)
+        saldo = saldo_original - adelanto
+        interes = base.interes[desde:] - r * adelanto_anterior
+        abono = base.abono[desde:] + (crecimiento - 1) * adelanto_anterior
+    else:
+        # Share of the original schedule still owed
+        factor = 1 - np.cumsum(np.divide(
+            extra_cola, saldo_original, out=np.zeros_like(extra_cola),
+            where=extra_cola > 0))
+        factor_anterior = _anteriores(factor, 1.0)
+        saldo = saldo_original * factor
+        interes = base.interes[desde:] * factor_anterior
+        abono = base.abono[desde:] * factor_anterior
+
+    # The loan ends on the first payment that leaves no balance: either
+    # the regular payment covers what was left, or the extra payment does
+    fin = np.flatnonzero(saldo <= _TOLERANCIA)[0]
+    saldo_anterior = saldo[fin - 1] if fin else saldo_inicial
+    antes_del_extra = saldo[fin] + extra_cola[fin]
+    if antes_del_extra <= _TOLERANCIA:
+        abono[fin] = saldo_anterior
+        interes[fin] = saldo_anterior * r
+        extra_cola[fin] = 0.0
+    else:
+        extra_cola[fin] = antes_del_extra
+    saldo[fin] = 0.0
+
+    n_final = desde + fin + 1
+    pago = base.pago[:n_final]
+    capa = base._replace(
+        pago=pago,
+        cuota=np.concatenate((base.cuota[:desde],
+                              (abono + interes)[:fin + 1])),
+        interes=np.concatenate((base.interes[:desde], interes[:fin + 1])),
+        abono=np.concatenate((base.abono[:desde], abono[:fin + 1])),
+        saldo=np.concatenate((base.saldo[:desde], saldo[:fin + 1])),
+        con_seguro=pago <= max(0, n_final - base.pagos_por_año))
+    return capa, extra[:n_final]
+
+
+def calcular_cronograma_abonos(monto, tasa_anual, plazo_meses, frecuencia,
+                               tipo_cuota, incluir_seguro, porcentaje_seguro,
+                               incluir_seguro_danos, monto_asegurar,
+                               porcentaje_seguro_danos, impuesto_danos,
+                               bomberos_danos, papeleria_danos,
+                               incluir_seguro_vehiculo, monto_vehiculo,
+                               porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                               gasto_vehiculo, pagos_abono, montos_abono,
+                               modo="plazo"):
+    """
+    Amortization schedule with extra payments, as a Cronograma.
+
+    Takes the same arguments as calcular_cuotas_df followed by those of
+    aplicar_abonos. 'Cuota' is the regular payment; the extra payments are
+    in their own 'Abono Extra' column.
+
+    Returns:
+        Cronograma with the COLUMNAS_ABONOS columns
+    """
+    from .cronograma import Cronograma
+
+    with medir("calculo") as medicion:
+        base, extra = aplicar_abonos(
+            calcular_base(monto, tasa_anual, plazo_meses, frecuencia,
+                          tipo_cuota), pagos_abono, montos_abono, modo)
+        columnas = combinar_capas(
+            base, capa_seguro_prestamo(base, incluir_seguro,
+                                       porcentaje_seguro),
+            capa_seguro_danos(base, incluir_seguro_danos, monto_asegurar,
+                              porcentaje_seguro_danos, impuesto_danos,
+                              bomberos_danos, papeleria_danos),
+            capa_seguro_vehiculo(base, incluir_seguro_vehiculo,
+                                 monto_vehiculo, porcentaje_seguro_vehiculo,
+                                 impuesto_vehiculo, gasto_vehiculo))
+        columnas["Abono Extra"] = extra
+        cronograma = Cronograma.desde_columnas(
+            {nombre: columnas[nombre] for nombre in COLUMNAS_ABONOS})
+        medicion.filas = len(cronograma)
+    return cronograma
+
+
+def _saldo_tras(saldo, cuota, abono_fijo, r, nivelada, t):
+    """Balance left t regular payments after saldo."""
+    potencia = (1 + r)**t
+    return np.where(nivelada, saldo * potencia - cuota * (potencia - 1) / r,
+                    saldo - abono_fijo * t)
+
+
+def _simular(p, pagos, montos, modo):
+    """
+    Walk the extra payments of every loan in closed form.
+
+    Loans drop out of the arrays as soon as they are paid off, so each
+    step only costs as much as the loans still running.
+
+    Args:
+        p: Dict returned by parametros_cartera
+        pagos, montos: 2-D arrays with one row of extra payments per loan
+        modo: One of MODOS_ABONO
+
+    Returns:
+        Dict with the payments, interest, extra paid and regular cuota
+        after the last extra payment of every loan
+    """
+    n_pagos = p["n_pagos"]
+
+    # Extra payments that cannot apply are moved to the last payment with
+    # no amount, which is also where every loan without them ends
+    montos = np.where((pagos >= 1) & (pagos < n_pagos[:, None]), montos, 0.0)
+    pagos = np.where(montos > 0, pagos, n_pagos[:, None])
+    pagos = np.column_stack((pagos, n_pagos))
+    montos = np.column_stack((montos, np.zeros(len(n_pagos))))
+    orden = np.argsort(pagos, axis=1, kind="stable")
+    pagos = np.take_along_axis(pagos, orden, axis=1)
+    montos = np.take_along_axis(montos, orden, axis=1)
+
+    fin = n_pagos.copy()
+    intereses = np.zeros(len(n_pagos))
+    extras = np.zeros(len(n_pagos))
+    cuota_final = np.where(p["nivelada"], p["cuota_base"],
+                           p["abono_fijo"] + p["tasa_periodo"] * p["monto"])
+
+    # State of the loans still running
+    vivos = np.flatnonzero(n_pagos >= 1)
+    n, r, nivelada, cuota, abono_fijo, saldo = (
+        p[nombre][vivos] for nombre in ("n_pagos", "tasa_periodo",
+                                        "nivelada", "cuota_base",
+                                        "abono_fijo", "monto"))
+    k = np.zeros_like(n)
+
+    for pago, monto in zip(pagos.T, montos.T):
+        if not len(vivos):
+            break
+        pago, monto = pago[vivos], monto[vivos]
+
+        # Regular payments from k on: does the balance run out before
+        # this extra payment?
+        if modo == "plazo":
+            restantes = np.where(
+                nivelada,
+                np.log((cuota - _TOLERANCIA * r) / (cuota - saldo * r)) /
+                np.log1p(r), (saldo - _TOLERANCIA) / abono_fijo)
+            restantes = np.maximum(np.ceil(restantes - 1e-9), 1)
+        else:
+            restantes = n - k
+        tramo = pago - k
+        cierra = (restantes <= tramo) | (pago == n)
+        t = np.where(cierra, np.minimum(restantes, tramo), tramo)
+
+        # Interest of the t regular payments; a closing level payment
+        # only covers the balance left plus its interest
+        saldo_t = _saldo_tras(saldo, cuota, abono_fijo, r, nivelada, t)
+        saldo_penultimo = _saldo_tras(saldo, cuota, abono_fijo, r, nivelada,
+                                      t - 1)
+        intereses[vivos] += np.where(
+            nivelada & cierra,
+            (t - 1) * cuota + (1 + r) * saldo_penultimo - saldo,
+            np.where(nivelada, t * cuota - (saldo - saldo_t),
+                     r * (t * saldo - abono_fijo * t * (t - 1) / 2)))
+
+        # The extra payment itself, which may pay off what is left
+        liquida = ~cierra & (monto >= saldo_t - _TOLERANCIA)
+        aplica = ~cierra & ~liquida
+        extras[vivos] += np.where(liquida, saldo_t,
+                                  np.where(aplica, monto, 0.0))
+        fin[vivos[cierra]] = (k + t)[cierra]
+        fin[vivos[liquida]] = pago[liquida]
+        cuota_final[vivos[liquida]] = 0.0
+
+        # Only the loans that made the extra payment go on
+        vivos = vivos[aplica]
+        n, r, nivelada, cuota, abono_fijo, k = (
+            valores[aplica] for valores in (n, r, nivelada, cuota,
+                                            abono_fijo, pago))
+        saldo = (saldo_t - monto)[aplica]
+        if modo == "cuota":
+            quedan = n - k
+            cuota = saldo * r / (1 - (1 + r)**-quedan)
+            abono_fijo = saldo / quedan
+        cuota_final[vivos] = np.where(nivelada, cuota, abono_fijo + r * saldo)
+
+    return {"pagos": fin, "intereses": intereses, "extras": extras,
+            "cuota": cuota_final}
+
+
+def _resumir(p, pagos, montos, modo):
+    """COLUMNAS_RESUMEN_ABONOS per loan for parametros_cartera output."""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        sin_abonos = np.empty((len(p["monto"]), 0))
+        original = _simular(p, sin_abonos.astype(np.int64), sin_abonos, modo)
+        con_abonos = _simular(p, pagos, montos, modo)
+
+    # Insurance stops a year before the last payment, which comes sooner
+    cuotas_con_seguro = np.where(
+        p["al_vencimiento"], 1,
+        np.maximum(0, con_abonos["pagos"] - p["pagos_por_año"]))
+    seguro_por_pago = (p["seguro_unitario"] + p["seguro_danos_por_pago"] +
+                       p["seguro_vehiculo_por_pago"])
+    resumen = {
+        "Pagos": original["pagos"],
+        "Pagos con Abonos": con_abonos["pagos"],
+        "Cuota con Abonos": con_abonos["cuota"],
+        "Total Abonos Extra": con_abonos["extras"],
+        "Total Intereses": original["intereses"],
+        "Total Intereses con Abonos": con_abonos["intereses"],
+        "Ahorro en Intereses": original["intereses"] - con_abonos["intereses"],
+        "Ahorro en Seguros": seguro_por_pago *
+        (p["cuotas_con_seguro"] - cuotas_con_seguro)
+    }
+    sin_pagos = p["n_pagos"] < 1
+    for nombre in COLUMNAS_RESUMEN_ABONOS[2:]:
+        resumen[nombre] = np.where(sin_pagos, np.nan, resumen[nombre])
+    return resumen
+
+
+def _matriz_abonos(valores, dtype):
+    """Extra payment argument as one row per loan."""
+    valores = np.asarray(valores, dtype=dtype)
+    if valores.ndim < 2:
+        valores = valores.reshape(-1, 1)
+    return valores
+
+
+def resumir_abonos(prestamos, pagos_abono, montos_abono, modo="plazo"):
+    """
+    Effect of extra payments on every loan of a portfolio, in closed form.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO)
+        pagos_abono: Payment number of the extra payments: a scalar, one
+            per loan, or a 2-D array with one row per loan (or one row
+            shared by all); see abonos_recurrentes
+        montos_abono: Amounts, broadcast against pagos_abono
+        modo: 'plazo' to keep the cuota and shorten the term, 'cuota' to
+            keep the term and lower the cuota
+
+    Returns:
+        DataFrame with the COLUMNAS_RESUMEN_ABONOS columns, one row per
+        loan (keeping the index when prestamos is a DataFrame). 'Cuota con
+        Abonos' is the regular cuota, before insurance, of the payment
+        after the last extra payment (0 when an extra payment pays off
+        the loan); the savings are against the same loan without extra
+        payments.
+    """
+    _validar_modo(modo)
+    p = parametros_cartera(prestamos)
+    pagos = _matriz_abonos(pagos_abono, np.int64)
+    montos = _matriz_abonos(montos_abono, float)
+    if (montos < 0).any():
+        raise ValueError("montos_abono may not be negative")
+    forma = (len(p["monto"]), np.broadcast_shapes(pagos.shape,
+                                                  montos.shape)[1])
+
+    with medir("abonos", filas=forma[0]):
+        resumen = _resumir(p, np.broadcast_to(pagos, forma),
+                           np.broadcast_to(montos, forma), modo)
+    indice = prestamos.index if isinstance(prestamos, pd.DataFrame) else None
+    return pd.DataFrame(resumen, index=indice)
+
+
+def resumir_abonos_prestamo(pagos_abono, montos_abono, modo, *argumentos):
+    """
+    Effect of extra payments on one loan, in time proportional to them.
+
+    Args:
+        pagos_abono, montos_abono, modo: As for aplicar_abonos
+        *argumentos: Same positional arguments as calcular_cuotas_df
+
+    Returns:
+        Dict with the COLUMNAS_RESUMEN_ABONOS keys
+    """
+    _validar_modo(modo)
+    prestamo = dict(zip(COLUMNAS_PRESTAMO, argumentos))
+    pagos, montos = np.broadcast_arrays(
+        np.reshape(np.asarray(pagos_abono, dtype=np.int64), (1, -1)),
+        np.reshape(np.asarray(montos_abono, dtype=float), (1, -1)))
+    if (montos < 0).any():
+        raise ValueError("montos_abono may not be negative")
+    with medir("abonos", filas=1):
+        resumen = _resumir(parametros_cartera(prestamo), pagos, montos, modo)
+    return {nombre: valores[0].item() for nombre, valores in resumen.items()}
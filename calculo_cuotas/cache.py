@@ -0,0 +1,264 @@
+"""
+Bounded in-process cache of calculation results.
+
+Streamlit reruns app.py on every interaction, but this module is imported
+once per server process, so CACHE_CUOTAS is shared by every user session.
+Entries are evicted least-recently-used first once the entry count or the
+memory cap is exceeded, and expire after a TTL.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Insurance parameters that only matter when their flag is 'Sí'
+_PARAMETROS_SEGURO = {
+    5: (6,),
+    7: (8, 9, 10, 11, 12),
+    13: (14, 15, 16, 17),
+}
+
+
+def tamano_en_bytes(valor):
+    """Approximate memory footprint of a cached value."""
+    if hasattr(valor, "memory_usage"):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    return sys.getsizeof(valor)
+
+
+class CacheCalculos:
+    """
+    Thread-safe LRU cache with TTL expiry and a memory cap.
+
+    Args:
+        max_entradas: Maximum number of cached results
+        max_bytes: Maximum total size of the cached results
+        ttl: Seconds an entry stays valid (None for no expiry)
+        medir: Function returning the size in bytes of a value
+        reloj: Monotonic clock, replaceable for testing
+    """
+
+    def __init__(self, max_entradas=256, max_bytes=64 * 1024 * 1024,
+                 ttl=3600, medir=tamano_en_bytes, reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._medir = medir
+        self._reloj = reloj
+        self._entradas = OrderedDict()  # clave -> (valor, bytes, creado)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiraciones = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _quitar(self, clave):
+        _, tamano, _ = self._entradas.pop(clave)
+        self._bytes -= tamano
+
+    def buscar(self, clave):
+        """
+        Return the cached value for clave, or None on a miss.
+
+        Counts the hit or miss like obtener(); None is never cached.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if self.ttl is not None and \
+                        self._reloj() - entrada[2] > self.ttl:
+                    self._quitar(clave)
+                    self.expiraciones += 1
+                else:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return entrada[0]
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, valor):
+        """Store valor under clave, evicting old entries to make room."""
+        tamano = self._medir(valor)
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (valor, tamano, self._reloj())
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entradas or \
+                    self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.expulsiones += 1
+
+    def obtener(self, clave, calcular):
+        """
+        Return the cached value for clave, calling calcular() on a miss.
+
+        The calculation runs outside the lock, so a slow miss does not
+        block other sessions.
+        """
+        valor = self.buscar(clave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(clave, valor)
+        return valor
+
+    def limpiar(self):
+        """Drop every entry (the counters are kept)."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """Hit/miss counters and current size of the cache."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "expiraciones": self.expiraciones,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes
+            }
+
+
+def clave_prestamo(*argumentos):
+    """
+    Normalized cache key for the calcular_cuotas_df arguments.
+
+    Numbers are compared by value (10000 and 10000.0 are the same key) and
+    the parameters of an insurance that is not included are ignored.
+    """
+    clave = [
+        float(valor) if isinstance(valor, (int, float)) else valor
+        for valor in argumentos
+    ]
+    for bandera, parametros in _PARAMETROS_SEGURO.items():
+        if clave[bandera] != 'Sí':
+            for i in parametros:
+                clave[i] = 0.0
+    return tuple(clave)
+
+
+# Shared by every session of the Streamlit server
+CACHE_CUOTAS = CacheCalculos()
+
+
+# Base layers and insurance overlays of the schedules, reused while only
+# some of the inputs change
+CACHE_CAPAS = CacheCalculos(max_entradas=1024)
+
+# Insurance overlays: name, layer function (see motor) and the slice of the
+# calcular_cuotas_df arguments it depends on
+_CAPAS_SEGURO = (
+    ("seguro", "capa_seguro_prestamo", 5, 7),
+    ("danos", "capa_seguro_danos", 7, 13),
+    ("vehiculo", "capa_seguro_vehiculo", 13, 18),
+)
+
+
+def _componer_cronograma(argumentos, clave, exacto, capas):
+    """
+    Build a Cronograma from cached layers, computing only the missing ones.
+
+    The base layer is keyed by monto, tasa, plazo, frecuencia and
+    tipo_cuota, and each insurance overlay by the base key plus its own
+    normalized parameters, so changing one insurance input recomputes
+    that overlay and 'Cuota' only.
+    """
+    from . import motor
+    from .cronograma import Cronograma
+    from .metricas import medir
+
+    def calcular_base():
+        base = motor.calcular_base(*argumentos[:5])
+        return motor.base_en_centavos(base) if exacto else base
+
+    def calcular_capa(funcion, desde, hasta):
+        columna = getattr(motor, funcion)(base, *argumentos[desde:hasta])
+        return motor.seguro_en_centavos(columna) if exacto else columna
+
+    clave_base = ("base", clave[:5], exacto)
+    with medir("calculo") as medicion:
+        base = capas.obtener(clave_base, calcular_base)
+        seguros = [
+            capas.obtener((nombre, clave_base) + clave[desde:hasta],
+                          lambda: calcular_capa(funcion, desde, hasta))
+            for nombre, funcion, desde, hasta in _CAPAS_SEGURO
+        ]
+        cronograma = Cronograma.desde_columnas(
+            motor.combinar_capas(base, *seguros), centavos=exacto)
+        medicion.filas = len(cronograma)
+    return cronograma
+
+
+def calcular_cronograma_cacheado(*argumentos, exacto=False, cache=None,
+                                 capas=None):
+    """
+    calcular_cronograma with memoization in a shared cache.
+
+    Takes the same arguments as calcular_cuotas_df. The cached Cronograma
+    is returned as is: its arrays are read-only, so every session can share
+    it without a defensive copy. On a miss the schedule is assembled from
+    the layers in capas (defaults to CACHE_CAPAS), so a change to one
+    insurance reuses the amortization and the other insurances.
+    """
+    cache = CACHE_CUOTAS if cache is None else cache
+    capas = CACHE_CAPAS if capas is None else capas
+    clave = clave_prestamo(*argumentos)
+    return cache.obtener(
+        (clave, exacto),
+        lambda: _componer_cronograma(argumentos, clave, exacto, capas))
+
+
+def calcular_cuotas_df_cacheado(*argumentos, cache=None):
+    """
+    calcular_cuotas_df with memoization in a shared cache.
+
+    Takes the same positional arguments as calcular_cuotas_df. The cache
+    holds the compact Cronograma and every call gets a new DataFrame built
+    from it, so callers may modify it freely.
+    """
+    return calcular_cronograma_cacheado(*argumentos, cache=cache).a_dataframe()
+
+
+# Generated Excel/PDF files, keyed by the loan inputs and exported columns
+CACHE_EXPORTACIONES = CacheCalculos(max_entradas=64,
+                                    max_bytes=128 * 1024 * 1024,
+                                    medir=len)
+
+
+def exportar_cacheado(formato, clave, df, cache=None, **opciones):
+    """
+    Build an export file once per input and serve repeats from the cache.
+
+    Args:
+        formato: 'xlsx' or 'pdf'
+        clave: Hashable key identifying the inputs of df (e.g. the
+            clave_prestamo tuple plus the exported columns)
+        df: DataFrame to export, only converted on a cache miss
+        cache: CacheCalculos to use (defaults to CACHE_EXPORTACIONES)
+        **opciones: Extra arguments of the converter (e.g. titulo and
+            resumen for PDF); clave must already identify them
+
+    Returns:
+        File contents as bytes
+    """
+    from .exportar import convertir_a_excel, convertir_a_pdf
+
+    convertidores = {'xlsx': convertir_a_excel, 'pdf': convertir_a_pdf}
+    if formato not in convertidores:
+        raise ValueError(f"Unknown export format: {formato!r}")
+    cache = CACHE_EXPORTACIONES if cache is None else cache
+    return cache.obtener((formato, clave),
+                         lambda: convertidores[formato](df, **opciones).getvalue())
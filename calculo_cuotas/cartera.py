@@ -0,0 +1,307 @@
+"""
+Columnar batch API for pricing a whole loan portfolio in one call.
+
+Each loan parameter is a column (NumPy array or DataFrame column) and every
+loan is priced at once with array arithmetic. Frequencies and payment types
+are resolved through lookup tables, so a portfolio mixing all of them is
+still a single vectorized pass; the per-loan totals come from closed forms
+and no schedule is ever built.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from .metricas import medir
+from .motor import FREQ_DICT, cuota_nivelada, saldo_nivelada
+from .seguros import (DIVISOR_MENSUAL, prima_mensual_danos,
+                      prima_mensual_vehiculo)
+
+# Loan parameter columns, in calcular_cuotas_df argument order, with the
+# value used when an optional column is missing (None means required)
+COLUMNAS_PRESTAMO = {
+    "monto": None,
+    "tasa_anual": None,
+    "plazo_meses": None,
+    "frecuencia": None,
+    "tipo_cuota": None,
+    "incluir_seguro": 'No',
+    "porcentaje_seguro": 0.0,
+    "incluir_seguro_danos": 'No',
+    "monto_asegurar": 0.0,
+    "porcentaje_seguro_danos": 0.0,
+    "impuesto_danos": 0.0,
+    "bomberos_danos": 0.0,
+    "papeleria_danos": 0.0,
+    "incluir_seguro_vehiculo": 'No',
+    "monto_vehiculo": 0.0,
+    "porcentaje_seguro_vehiculo": 0.0,
+    "impuesto_vehiculo": 0.0,
+    "gasto_vehiculo": 0.0
+}
+
+# Columns returned by resumir_cartera
+COLUMNAS_RESUMEN = [
+    "Pagos", "Primera Cuota", "Total a Pagar", "Total Intereses",
+    "Total Seguro de Préstamo", "Total Seguro Daños", "Total Seguro Vehículo"
+]
+
+# Insurance flag columns: 'Sí'/'No' strings or booleans
+BANDERAS_SEGURO = ("incluir_seguro", "incluir_seguro_danos",
+                   "incluir_seguro_vehiculo")
+
+# Lookup tables indexed by the position of the frequency in FREQ_DICT
+_FRECUENCIAS = list(FREQ_DICT)
+_PAGOS_POR_AÑO = np.array([FREQ_DICT[f] for f in _FRECUENCIAS], dtype=float)
+_DIVISOR = np.array([
+    DIVISOR_MENSUAL.get(f, FREQ_DICT[f] / 12) for f in _FRECUENCIAS
+], dtype=float)
+
+
+def _bandera(valores):
+    """Turn a 'Sí'/'No' column (or a boolean one) into a boolean array."""
+    valores = np.asarray(valores)
+    if valores.dtype == bool:
+        return valores
+    return valores == 'Sí'
+
+
+def normalizar_banderas(columnas):
+    """
+    Loan columns with every insurance flag as 'Sí'/'No'.
+
+    calcular_cuotas_df only understands 'Sí'/'No', so boolean flags are
+    converted before loans reach it (or a worker process).
+
+    Args:
+        columnas: Mapping of loan columns, e.g. from leer_cartera; the
+            flags may be arrays or scalars, missing ones are left out
+
+    Returns:
+        New dict; array flags become arrays of 'Sí'/'No' and scalar flags
+        plain strings
+    """
+    normalizadas = dict(columnas)
+    for nombre in BANDERAS_SEGURO:
+        if nombre in normalizadas:
+            si = _bandera(normalizadas[nombre])
+            normalizadas[nombre] = np.where(si, 'Sí', 'No') if si.ndim \
+                else ('Sí' if si else 'No')
+    return normalizadas
+
+
+def leer_cartera(prestamos):
+    """
+    Read loan parameters into one array per column.
+
+    Args:
+        prestamos: DataFrame or mapping with the columns of
+            COLUMNAS_PRESTAMO; optional columns may be missing and scalars
+            are broadcast to every loan
+
+    Returns:
+        Dict mapping each name in COLUMNAS_PRESTAMO to a 1-D array
+    """
+    if not isinstance(prestamos, (pd.DataFrame, Mapping)):
+        raise TypeError("prestamos must be a DataFrame or a mapping of columns")
+
+    n_prestamos = np.size(prestamos["monto"])
+    columnas = {}
+    for nombre, defecto in COLUMNAS_PRESTAMO.items():
+        if nombre in prestamos:
+            valores = prestamos[nombre]
+            if isinstance(valores, pd.Series):
+                valores = valores.to_numpy()
+        elif defecto is None:
+            raise KeyError(nombre)
+        else:
+            valores = defecto
+        columnas[nombre] = np.broadcast_to(np.asarray(valores), (n_prestamos,))
+    return columnas
+
+
+def parametros_cartera(prestamos):
+    """
+    Derive the per-loan pricing parameters used by calcular_cuotas_df.
+
+    Args:
+        prestamos: Loan parameters accepted by leer_cartera
+
+    Returns:
+        Dict of arrays, one entry per loan: monto, pagos_por_año, n_pagos,
+        tasa_periodo, nivelada, al_vencimiento, cuota_base (level payment),
+        abono_fijo, seguro_unitario, seguro_danos_por_pago,
+        seguro_vehiculo_por_pago, cuotas_con_seguro and the monthly damage
+        and vehicle premiums. Loans whose term holds no whole payment get
+        NaN amounts, where calcular_cuotas_df would raise.
+    """
+    c = leer_cartera(prestamos)
+
+    codigos = pd.Categorical(c["frecuencia"], categories=_FRECUENCIAS).codes
+    if (codigos < 0).any():
+        raise KeyError(c["frecuencia"][codigos < 0][0])
+    pagos_por_año = _PAGOS_POR_AÑO[codigos]
+    divisor = _DIVISOR[codigos]
+    al_vencimiento = pagos_por_año == 0
+
+    monto = c["monto"].astype(float)
+    tasa_anual = c["tasa_anual"].astype(float)
+    plazo_meses = c["plazo_meses"].astype(float)
+    nivelada = c["tipo_cuota"] == 'Nivelada'
+
+    incluir_seguro = _bandera(c["incluir_seguro"])
+    incluir_seguro_danos = _bandera(c["incluir_seguro_danos"])
+    incluir_seguro_vehiculo = _bandera(c["incluir_seguro_vehiculo"])
+    monto_asegurar = c["monto_asegurar"].astype(float)
+    monto_vehiculo = c["monto_vehiculo"].astype(float)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Calculate damage and vehicle insurance per month
+        pago_mensual_seguro_danos = np.where(
+            incluir_seguro_danos & (monto_asegurar > 0),
+            prima_mensual_danos(monto_asegurar,
+                                c["porcentaje_seguro_danos"].astype(float),
+                                c["impuesto_danos"].astype(float),
+                                c["bomberos_danos"].astype(float),
+                                c["papeleria_danos"].astype(float)), 0.0)
+        pago_mensual_seguro_vehiculo = np.where(
+            incluir_seguro_vehiculo & (monto_vehiculo > 0),
+            prima_mensual_vehiculo(
+                monto_vehiculo, c["porcentaje_seguro_vehiculo"].astype(float),
+                c["impuesto_vehiculo"].astype(float),
+                c["gasto_vehiculo"].astype(float)), 0.0)
+
+        # "At maturity" loans are one payment priced with simple interest
+        n_pagos = np.where(al_vencimiento, 1,
+                           np.trunc(plazo_meses * pagos_por_año / 12))
+        tasa_periodo = np.where(al_vencimiento,
+                                tasa_anual / 100 * (plazo_meses / 12),
+                                tasa_anual / 100 / pagos_por_año)
+
+        cuota_base = cuota_nivelada(monto, tasa_periodo, n_pagos)
+        abono_fijo = monto / n_pagos
+
+        # The loan insurance is priced on the balance after the first year
+        ref_cuota = np.minimum(pagos_por_año, n_pagos)
+        saldo_referencia = np.where(
+            nivelada, saldo_nivelada(monto, tasa_periodo, n_pagos, ref_cuota),
+            monto - ref_cuota * abono_fijo)
+        seguro_unitario = np.where(
+            incluir_seguro & ~al_vencimiento,
+            (saldo_referencia / 1000) * c["porcentaje_seguro"].astype(float) *
+            12 / pagos_por_año, 0.0)
+
+        seguro_danos_por_pago = np.where(
+            al_vencimiento, pago_mensual_seguro_danos * plazo_meses,
+            pago_mensual_seguro_danos / divisor)
+        seguro_vehiculo_por_pago = np.where(
+            al_vencimiento, pago_mensual_seguro_vehiculo * plazo_meses,
+            pago_mensual_seguro_vehiculo / divisor)
+
+    # Insurance is charged on every payment except those of the last year
+    cuotas_con_seguro = np.where(al_vencimiento, 1,
+                                 np.maximum(0, n_pagos - pagos_por_año))
+
+    # Terms too short for a single payment have no schedule
+    sin_pagos = n_pagos < 1
+    if sin_pagos.any():
+        for valores in (cuota_base, abono_fijo, seguro_unitario,
+                        seguro_danos_por_pago, seguro_vehiculo_por_pago):
+            valores[sin_pagos] = np.nan
+
+    return {
+        "monto": monto,
+        "pagos_por_año": pagos_por_año,
+        "n_pagos": n_pagos.astype(np.int64),
+        "tasa_periodo": tasa_periodo,
+        "nivelada": nivelada & ~al_vencimiento,
+        "al_vencimiento": al_vencimiento,
+        "cuota_base": cuota_base,
+        "abono_fijo": abono_fijo,
+        "seguro_unitario": seguro_unitario,
+        "seguro_danos_por_pago": seguro_danos_por_pago,
+        "seguro_vehiculo_por_pago": seguro_vehiculo_por_pago,
+        "cuotas_con_seguro": cuotas_con_seguro.astype(np.int64),
+        "pago_mensual_seguro_danos": pago_mensual_seguro_danos,
+        "pago_mensual_seguro_vehiculo": pago_mensual_seguro_vehiculo
+    }
+
+
+def totales_cartera(p):
+    """
+    Closed-form per-loan totals from the output of parametros_cartera.
+
+    Args:
+        p: Dict returned by parametros_cartera
+
+    Returns:
+        Dict mapping each name in COLUMNAS_RESUMEN to a per-loan array
+    """
+    monto = p["monto"]
+    n_pagos = p["n_pagos"]
+    tasa_periodo = p["tasa_periodo"]
+    nivelada = p["nivelada"]
+    al_vencimiento = p["al_vencimiento"]
+
+    # Interest over the whole term: level payments pay n * cuota - monto,
+    # fixed principal payments accrue on an arithmetic series of balances
+    total_intereses = np.where(
+        nivelada, n_pagos * p["cuota_base"] - monto,
+        tasa_periodo * monto * (n_pagos + 1) / 2)
+    total_intereses = np.where(al_vencimiento, monto * tasa_periodo,
+                               total_intereses)
+    total_intereses[n_pagos < 1] = np.nan
+    primera_base = np.where(nivelada, p["cuota_base"],
+                            p["abono_fijo"] + monto * tasa_periodo)
+
+    cuotas_con_seguro = p["cuotas_con_seguro"]
+    primera_con_seguro = cuotas_con_seguro >= 1
+    seguros = (p["seguro_unitario"], p["seguro_danos_por_pago"],
+               p["seguro_vehiculo_por_pago"])
+    primer_seguro = np.where(primera_con_seguro, sum(seguros), 0.0)
+    totales_seguro = [s * cuotas_con_seguro for s in seguros]
+
+    return {
+        "Pagos": n_pagos,
+        "Primera Cuota": primera_base + primer_seguro,
+        "Total a Pagar": monto + total_intereses + sum(totales_seguro),
+        "Total Intereses": total_intereses,
+        "Total Seguro de Préstamo": totales_seguro[0],
+        "Total Seguro Daños": totales_seguro[1],
+        "Total Seguro Vehículo": totales_seguro[2]
+    }
+
+
+def resumir_cartera(prestamos):
+    """
+    Summarize every loan of a portfolio without building any schedule.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); 'Sí'/'No' or boolean insurance flags
+
+    Returns:
+        DataFrame with the COLUMNAS_RESUMEN columns, one row per loan
+        (keeping the index when prestamos is a DataFrame)
+    """
+    resumen = totales_cartera(parametros_cartera(prestamos))
+    indice = prestamos.index if isinstance(prestamos, pd.DataFrame) else None
+    return pd.DataFrame(resumen, index=indice)
+
+
+def resumir_prestamo(*argumentos):
+    """
+    Summary of one loan in constant time and memory.
+
+    Takes the same positional arguments as calcular_cuotas_df and gives
+    the same figures as the schedule's first row and column sums, without
+    building the schedule.
+
+    Returns:
+        Dict with the COLUMNAS_RESUMEN keys ('Pagos' is 0 and the amounts
+        are NaN when the term holds no whole payment)
+    """
+    with medir("resumen", filas=1):
+        prestamo = dict(zip(COLUMNAS_PRESTAMO, argumentos))
+        resumen = totales_cartera(parametros_cartera(prestamo))
+    return {nombre: valores[0].item() for nombre, valores in resumen.items()}
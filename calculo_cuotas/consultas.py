@@ -0,0 +1,102 @@
+"""
+Point-in-time balance and payoff queries.
+
+Answers "where does this loan stand after payment k" in closed form, with
+the same conventions as calcular_cuotas_df: the per-period rate, the
+max(saldo, 0) clamp and the rule that insurance is not charged during the
+last year. Works for one (loan, k) pair or for whole arrays of them.
+"""
+import numpy as np
+import pandas as pd
+
+from .cartera import COLUMNAS_PRESTAMO, parametros_cartera
+from .motor import saldo_nivelada
+
+# Columns returned by consultar_saldo
+COLUMNAS_CONSULTA = [
+    "Pago", "Pagos Restantes", "Saldo", "Abono Pagado", "Interés Pagado",
+    "Interés Próximo", "Seguro de Préstamo Pendiente",
+    "Seguro Daños Pendiente", "Seguro Vehículo Pendiente",
+    "Monto de Liquidación"
+]
+
+
+def _consultar(p, k):
+    """Closed-form position after k payments for parametros_cartera output."""
+    monto = p["monto"]
+    n_pagos = p["n_pagos"]
+    tasa_periodo = p["tasa_periodo"]
+    nivelada = p["nivelada"]
+
+    k = np.clip(np.broadcast_to(np.asarray(k), monto.shape), 0, n_pagos)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        saldo = np.where(
+            nivelada, saldo_nivelada(monto, tasa_periodo, n_pagos, k),
+            monto - k * p["abono_fijo"])
+    saldo = np.maximum(saldo, 0)  # Prevent negative balance
+    abono_pagado = monto - saldo
+
+    # Level payments: k cuotas minus the principal repaid; fixed principal:
+    # interest on the arithmetic series of the first k balances
+    interes_pagado = np.where(
+        nivelada, k * p["cuota_base"] - abono_pagado,
+        tasa_periodo * (k * monto - p["abono_fijo"] * k * (k - 1) / 2))
+    interes_proximo = np.where(k < n_pagos, saldo * tasa_periodo, 0.0)
+
+    # Insurance is only charged on the first cuotas_con_seguro payments
+    restantes_con_seguro = np.maximum(0, p["cuotas_con_seguro"] - k)
+    pendiente = [
+        p[nombre] * restantes_con_seguro
+        for nombre in ("seguro_unitario", "seguro_danos_por_pago",
+                       "seguro_vehiculo_por_pago")
+    ]
+
+    return {
+        "Pago": k,
+        "Pagos Restantes": n_pagos - k,
+        "Saldo": saldo,
+        "Abono Pagado": abono_pagado,
+        "Interés Pagado": interes_pagado,
+        "Interés Próximo": interes_proximo,
+        "Seguro de Préstamo Pendiente": pendiente[0],
+        "Seguro Daños Pendiente": pendiente[1],
+        "Seguro Vehículo Pendiente": pendiente[2],
+        "Monto de Liquidación": saldo + interes_proximo
+    }
+
+
+def consultar_saldo(prestamos, k):
+    """
+    Position of many loans after k payments, in one vectorized pass.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); repeat a loan to query it at several k
+        k: Payments already made, scalar or one value per loan; clipped
+            to the 0..n_pagos range
+
+    Returns:
+        DataFrame with the COLUMNAS_CONSULTA columns, one row per loan.
+        'Interés Próximo' is the interest of payment k + 1 and 'Monto de
+        Liquidación' the payoff amount due on that payment date.
+    """
+    consulta = _consultar(parametros_cartera(prestamos), k)
+    indice = prestamos.index if isinstance(prestamos, pd.DataFrame) else None
+    return pd.DataFrame(consulta, index=indice)
+
+
+def saldo_en_pago(k, *argumentos):
+    """
+    Position of one loan after k payments, in constant time.
+
+    Args:
+        k: Payments already made
+        *argumentos: Same positional arguments as calcular_cuotas_df
+
+    Returns:
+        Dict with the COLUMNAS_CONSULTA keys
+    """
+    prestamo = dict(zip(COLUMNAS_PRESTAMO, argumentos))
+    consulta = _consultar(parametros_cartera(prestamo), k)
+    return {nombre: valores[0].item() for nombre, valores in consulta.items()}
@@ -0,0 +1,232 @@
+"""
+Effective annual cost of credit (TCEA), insurance included.
+
+The TCEA is the annual rate at which everything the borrower pays, the
+three insurance charges included, is worth the amount lent: with payment
+F_k made t_k years after disbursement, sum F_k / (1 + TCEA) ** t_k =
+monto. For periodic payments t_k = k / pagos_por_año, so the TCEA is the
+periodic internal rate of return compounded over a year.
+
+In x = ln(1 + TCEA) the left side is a sum of decreasing convex
+exponentials, so Newton's method converges from any start, monotonically
+once below the root. Every loan of a batch is solved at once: each Newton
+step updates the rate of all the loans still moving, and the converged
+ones drop out.
+
+tcea_flujos works on cash-flow arrays (one row per loan). tcea_cartera
+prices a whole portfolio without building any schedule: the payments of
+a loan are a + b * (k - 1), plus the insurance s on the first m of them,
+so their present value and its derivative are closed-form geometric sums.
+"""
+import numpy as np
+
+from .cartera import COLUMNAS_PRESTAMO, parametros_cartera
+from .metricas import medir
+from .motor import FREQ_DICT
+
+
+def _newton(valor, x, tolerancia, max_iteraciones):
+    """
+    Roots of many decreasing convex functions at once.
+
+    Args:
+        valor: Function (x, activos) -> (value, derivative) of the loans
+            whose indices are activos, at their points x
+        x: Starting point of every loan (NaN: skipped); updated in place
+        tolerancia: Newton step below which a loan has converged
+        max_iteraciones: Steps before giving up on the remaining loans
+
+    Returns:
+        x, NaN where it did not converge
+    """
+    activos = np.flatnonzero(np.isfinite(x))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(max_iteraciones):
+            if not len(activos):
+                break
+            f, derivada = valor(x[activos], activos)
+            paso = f / derivada
+            x[activos] -= paso
+            # NaN steps fail the comparison and leave x as NaN
+            activos = activos[np.abs(paso) > tolerancia]
+    x[activos] = np.nan
+    return x
+
+
+def tcea_flujos(flujos, monto, tiempos=None, pagos_por_año=12,
+                tolerancia=1e-12, max_iteraciones=100):
+    """
+    Effective annual rate (%) that prices a set of payments at monto.
+
+    Args:
+        flujos: Payments of one loan (1-D) or of many (2-D, one row per
+            loan, padded with zeros); every payment should be >= 0
+        monto: Amount lent, scalar or one per loan
+        tiempos: Years from disbursement to every payment, shaped like
+            flujos (defaults to k / pagos_por_año for payment k)
+        pagos_por_año: Payments per year when tiempos is not given,
+            scalar or one per loan
+        tolerancia: Convergence threshold on ln(1 + TCEA)
+        max_iteraciones: Newton steps before giving up
+
+    Returns:
+        TCEA in % (float for 1-D flujos, array otherwise), NaN where it
+        was not found
+    """
+    flujos = np.asarray(flujos, dtype=float)
+    una = flujos.ndim == 1
+    flujos = np.atleast_2d(flujos)
+    n_prestamos = len(flujos)
+    if tiempos is None:
+        pagos_por_año = np.broadcast_to(
+            np.asarray(pagos_por_año, dtype=float), (n_prestamos,))
+        tiempos = np.arange(1, flujos.shape[1] + 1) / pagos_por_año[:, None]
+    tiempos = np.broadcast_to(np.atleast_2d(np.asarray(tiempos, dtype=float)),
+                              flujos.shape)
+    monto = np.broadcast_to(np.asarray(monto, dtype=float), (n_prestamos,))
+
+    def valor(x, activos):
+        t = tiempos[activos]
+        descontados = flujos[activos] * np.exp(-x[:, None] * t)
+        return (descontados.sum(axis=1) - monto[activos],
+                -(descontados * t).sum(axis=1))
+
+    x = _newton(valor, np.zeros(n_prestamos), tolerancia, max_iteraciones)
+    tcea = np.expm1(x) * 100
+    return float(tcea[0]) if una else tcea
+
+
+def tcea_cronograma(cronograma, frecuencia, plazo_meses=None,
+                    fecha_desembolso=None, convencion=None):
+    """
+    TCEA of an amortization schedule, insurance included.
+
+    The payments are the 'Cuota' column (plus 'Abono Extra' when there is
+    one) and the amount lent is the balance before the first payment, so
+    any schedule of this package works, in Lempiras or in centavos.
+
+    Args:
+        cronograma: Cronograma or DataFrame
+        frecuencia: Payment frequency of the loan
+        plazo_meses: Loan term, needed for 'Al vencimiento'
+        fecha_desembolso: Disbursement date, needed when the schedule has
+            a 'Fecha' column; the times are then its year fractions
+        convencion: Day-count convention of those year fractions
+            (defaults to that of calcular_cronograma_fechas)
+
+    Returns:
+        TCEA in %
+    """
+    if hasattr(cronograma, "en_lempiras"):
+        cronograma = cronograma.en_lempiras()
+    flujos = np.asarray(cronograma["Cuota"], dtype=float)
+    monto = (np.asarray(cronograma["Saldo"])[0] +
+             np.asarray(cronograma["Abono"])[0])
+    if "Abono Extra" in cronograma.columns:
+        extra = np.asarray(cronograma["Abono Extra"], dtype=float)
+        flujos = flujos + extra
+        monto += extra[0]
+
+    if "Fecha" in cronograma.columns:
+        from .fechas import convencion_defecto, fraccion_año
+
+        if fecha_desembolso is None:
+            raise ValueError("fecha_desembolso is required for a dated "
+                             "schedule")
+        if convencion is None:
+            convencion = convencion_defecto(frecuencia)
+        tiempos = fraccion_año(fecha_desembolso,
+                               np.asarray(cronograma["Fecha"]), convencion)
+    elif FREQ_DICT[frecuencia] == 0:
+        tiempos = np.full(len(flujos), plazo_meses / 12)
+    else:
+        tiempos = np.asarray(cronograma["Pago"]) / FREQ_DICT[frecuencia]
+    return tcea_flujos(flujos, monto, tiempos)
+
+
+def _sumas(h, n):
+    """
+    sum_{k=1}^n k^j exp(-h k) for j = 0, 1, 2, element-wise.
+
+    (1 - v) S_j telescopes into lower sums (v = exp(-h)); when n * h is
+    tiny those differences cancel out, and a second-order expansion of
+    exp(-h k) over the power sums is used instead.
+    """
+    v = np.exp(-h)
+    u = -np.expm1(-h)
+    ultimo = n * v * np.exp(-n * h)  # n v^(n + 1)
+    s0 = -np.expm1(-n * h) * v / u
+    s1 = (s0 - ultimo) / u
+    s2 = (2 * s1 - s0 - n * ultimo) / u
+
+    p1 = n * (n + 1) / 2
+    p2 = p1 * (2 * n + 1) / 3
+    p3 = p1 * p1
+    p4 = p2 * (3 * n * n + 3 * n - 1) / 5
+    cerca = np.abs(n * h) < 1e-4
+    return [np.where(cerca, p - h * q + h * h / 2 * r, s)
+            for s, p, q, r in ((s0, n, p1, p2), (s1, p1, p2, p3),
+                               (s2, p2, p3, p4))]
+
+
+def tcea_cartera(prestamos, tolerancia=1e-12, max_iteraciones=100):
+    """
+    TCEA of every loan of a portfolio, without building any schedule.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); 'Sí'/'No' or boolean insurance flags
+        tolerancia: Convergence threshold on ln(1 + TCEA)
+        max_iteraciones: Newton steps before giving up
+
+    Returns:
+        Array of TCEA in %, one per loan, NaN where the term holds no
+        whole payment
+    """
+    with medir("tcea", filas=np.size(prestamos["monto"])):
+        p = parametros_cartera(prestamos)
+        monto = p["monto"]
+        n_pagos = p["n_pagos"].astype(float)
+        tasa = p["tasa_periodo"]
+        nivelada = p["nivelada"]
+        plazo_meses = np.broadcast_to(
+            np.asarray(prestamos["plazo_meses"], dtype=float), monto.shape)
+
+        # Payment k is a + b * (k - 1), plus s on the first m payments
+        a = np.where(nivelada, p["cuota_base"], p["abono_fijo"] + monto * tasa)
+        b = np.where(nivelada, 0.0, -p["abono_fijo"] * tasa)
+        s = (p["seguro_unitario"] + p["seguro_danos_por_pago"] +
+             p["seguro_vehiculo_por_pago"])
+        m = p["cuotas_con_seguro"].astype(float)
+        with np.errstate(divide='ignore'):
+            años = np.where(p["al_vencimiento"], plazo_meses / 12,
+                            1 / p["pagos_por_año"])
+
+        def valor(x, i):
+            h = x * años[i]
+            s0, s1, s2 = _sumas(h, n_pagos[i])
+            s0_m, s1_m, _ = _sumas(h, m[i])
+            base = a[i] - b[i]
+            return (base * s0 + b[i] * s1 + s[i] * s0_m - monto[i],
+                    -años[i] * (base * s1 + b[i] * s2 + s[i] * s1_m))
+
+        # The rate of the loan alone is the root without insurance, so
+        # Newton starts below the root and climbs to it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.log1p(tasa) / años
+        x[~np.isfinite(a)] = np.nan
+        x = _newton(valor, x, tolerancia, max_iteraciones)
+    return np.expm1(x) * 100
+
+
+def tcea_prestamo(*argumentos):
+    """
+    TCEA of one loan in constant time and memory.
+
+    Takes the same positional arguments as calcular_cuotas_df.
+
+    Returns:
+        TCEA in % (NaN when the term holds no whole payment)
+    """
+    prestamo = dict(zip(COLUMNAS_PRESTAMO, argumentos))
+    return tcea_cartera(prestamo)[0].item()
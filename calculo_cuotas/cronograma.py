@@ -0,0 +1,171 @@
+"""
+Compact amortization schedule: typed contiguous arrays, no DataFrame.
+
+A Cronograma keeps the payment numbers as int32, the payment dates (if
+any) as datetime64[D] and every amount in one column-major matrix, either
+float64 Lempiras or int64 centavos, so each column is a contiguous slice
+of it. Columns are handed out as read-only
+views and selecting columns shares the same memory, so the schedule can
+be cached once and shown, filtered and exported without copies. pandas,
+Excel and PDF only come in at the edges (a_dataframe and the exporters).
+"""
+import numpy as np
+
+from .metricas import medir
+from .motor import calcular_cuotas_arrays, calcular_cuotas_centavos
+
+
+class Cronograma:
+    """
+    Amortization schedule held as typed contiguous arrays.
+
+    Indexing by column name gives a read-only NumPy view, like a
+    DataFrame column, so the exporters accept a Cronograma wherever they
+    accept a DataFrame.
+
+    Args:
+        pago: Payment numbers (stored as int32)
+        montos: 2-D array with one column per amount column, float64
+            Lempiras or int64 centavos
+        nombres: Names of the amount columns of montos
+        centavos: Whether montos holds int64 centavos
+        visibles: Column names exposed, in order (defaults to all)
+        fechas: Optional payment dates, exposed as the 'Fecha' column
+    """
+    __slots__ = ("pago", "fechas", "montos", "centavos", "_columnas",
+                 "_visibles")
+
+    def __init__(self, pago, montos, nombres, centavos=False, visibles=None,
+                 fechas=None):
+        # Read-only views: the conversions return the caller's own array
+        # when it already has the right dtype and layout, and that array
+        # must stay writeable
+        self.pago = np.ascontiguousarray(pago, dtype=np.int32).view()
+        self.montos = np.asfortranarray(
+            montos, dtype=np.int64 if centavos else np.float64).view()
+        self.centavos = centavos
+        self.pago.flags.writeable = False
+        self.montos.flags.writeable = False
+
+        self._columnas = {"Pago": self.pago}
+        self.fechas = fechas
+        if fechas is not None:
+            self.fechas = np.ascontiguousarray(
+                fechas, dtype="datetime64[D]").view()
+            self.fechas.flags.writeable = False
+            self._columnas["Fecha"] = self.fechas
+        for k, nombre in enumerate(nombres):
+            self._columnas[nombre] = self.montos[:, k]
+        self._visibles = list(self._columnas) if visibles is None \
+            else list(visibles)
+
+    @classmethod
+    def desde_columnas(cls, columnas, centavos=False):
+        """Build from a mapping of column names to 1-D arrays."""
+        nombres = [nombre for nombre in columnas
+                   if nombre not in ("Pago", "Fecha")]
+        montos = np.empty((len(columnas["Pago"]), len(nombres)),
+                          dtype=np.int64 if centavos else np.float64,
+                          order="F")
+        for k, nombre in enumerate(nombres):
+            montos[:, k] = columnas[nombre]
+        return cls(columnas["Pago"], montos, nombres, centavos,
+                   fechas=columnas.get("Fecha"))
+
+    @property
+    def columns(self):
+        """Visible column names, in order."""
+        return list(self._visibles)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays, shared by every column selection."""
+        fechas = 0 if self.fechas is None else self.fechas.nbytes
+        return self.pago.nbytes + fechas + self.montos.nbytes
+
+    def __len__(self):
+        return len(self.pago)
+
+    def __getitem__(self, nombre):
+        if nombre not in self._visibles:
+            raise KeyError(nombre)
+        return self._columnas[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self._visibles
+
+    def __repr__(self):
+        unidad = "centavos" if self.centavos else "Lempiras"
+        return (f"Cronograma({len(self)} pagos, {len(self._visibles)} "
+                f"columnas, {unidad})")
+
+    def seleccionar(self, columnas):
+        """Schedule with only these columns, sharing the same arrays."""
+        faltantes = [c for c in columnas if c not in self._columnas]
+        if faltantes:
+            raise KeyError(faltantes[0])
+        return Cronograma._vista(self, columnas)
+
+    def quitar(self, columnas):
+        """Schedule without these columns, sharing the same arrays."""
+        return Cronograma._vista(
+            self, [c for c in self._visibles if c not in columnas])
+
+    @staticmethod
+    def _vista(origen, visibles):
+        vista = object.__new__(Cronograma)
+        vista.pago = origen.pago
+        vista.fechas = origen.fechas
+        vista.montos = origen.montos
+        vista.centavos = origen.centavos
+        vista._columnas = origen._columnas
+        vista._visibles = list(visibles)
+        return vista
+
+    def en_lempiras(self):
+        """The same schedule with float64 Lempiras (self if already so)."""
+        if not self.centavos:
+            return self
+        lempiras = Cronograma(
+            self.pago, self.montos / 100,
+            [c for c in self._columnas if c not in ("Pago", "Fecha")],
+            fechas=self.fechas)
+        return Cronograma._vista(lempiras, self._visibles)
+
+    def a_dataframe(self):
+        """DataFrame of the visible columns, in Lempiras."""
+        import pandas as pd
+
+        tabla = self.en_lempiras()
+        return pd.DataFrame({nombre: tabla[nombre]
+                             for nombre in tabla.columns})
+
+
+def calcular_cronograma(monto, tasa_anual, plazo_meses, frecuencia,
+                        tipo_cuota, incluir_seguro, porcentaje_seguro,
+                        incluir_seguro_danos, monto_asegurar,
+                        porcentaje_seguro_danos, impuesto_danos,
+                        bomberos_danos, papeleria_danos,
+                        incluir_seguro_vehiculo, monto_vehiculo,
+                        porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                        gasto_vehiculo, exacto=False):
+    """
+    Amortization schedule as a Cronograma.
+
+    Takes the same arguments as calcular_cuotas_df. With exacto the amounts
+    are the int64 centavos of calcular_cuotas_centavos.
+
+    Returns:
+        Cronograma with the COLUMNAS columns
+    """
+    calcular = calcular_cuotas_centavos if exacto else calcular_cuotas_arrays
+    with medir("calculo") as medicion:
+        cronograma = Cronograma.desde_columnas(calcular(
+            monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
+            incluir_seguro, porcentaje_seguro, incluir_seguro_danos,
+            monto_asegurar, porcentaje_seguro_danos, impuesto_danos,
+            bomberos_danos, papeleria_danos, incluir_seguro_vehiculo,
+            monto_vehiculo, porcentaje_seguro_vehiculo, impuesto_vehiculo,
+            gasto_vehiculo), centavos=exacto)
+        medicion.filas = len(cronograma)
+    return cronograma
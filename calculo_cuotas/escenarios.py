@@ -0,0 +1,109 @@
+"""
+Scenario sweeps: a pricing grid over rates, terms, frequencies and types.
+
+The whole grid is laid out as one flat portfolio of hypothetical loans and
+priced with a single parametros_cartera/totales_cartera pass, so a
+50 x 50 x 10 grid for both payment types is one array computation instead
+of 50,000 schedules.
+"""
+import numpy as np
+import pandas as pd
+
+from .cartera import (COLUMNAS_PRESTAMO, COLUMNAS_RESUMEN, parametros_cartera,
+                      totales_cartera)
+from .metricas import medir
+from .motor import FREQ_DICT
+
+# Columns returned by barrer_escenarios
+COLUMNAS_ESCENARIO = ["Frecuencia", "Tipo de Cuota", "Tasa", "Plazo"
+                      ] + COLUMNAS_RESUMEN
+
+# Grid axes, which the loan parameters may not override
+_EJES = ("tasa_anual", "plazo_meses", "frecuencia", "tipo_cuota")
+
+
+def barrer_escenarios(tasas, plazos, frecuencias=None, tipos_cuota=None,
+                      **prestamo):
+    """
+    Price every combination of rate, term, frequency and payment type.
+
+    Args:
+        tasas: Annual interest rates (%)
+        plazos: Terms in months
+        frecuencias: Payment frequencies (defaults to every FREQ_DICT key)
+        tipos_cuota: Payment types (defaults to both)
+        **prestamo: The other loan parameters as scalars, named as in
+            COLUMNAS_PRESTAMO; monto is required, insurance is optional
+
+    Returns:
+        DataFrame with the COLUMNAS_ESCENARIO columns, one row per
+        combination, ordered by frequency, type, rate and term
+    """
+    desconocidos = set(prestamo) - set(COLUMNAS_PRESTAMO).difference(_EJES)
+    if desconocidos:
+        raise TypeError(
+            f"Unexpected loan parameter: {sorted(desconocidos)[0]!r}")
+
+    frecuencias = list(FREQ_DICT) if frecuencias is None else list(frecuencias)
+    tipos_cuota = (['Nivelada', 'Saldos Insolutos']
+                   if tipos_cuota is None else list(tipos_cuota))
+    tasas = np.asarray(tasas, dtype=float).reshape(-1)
+    plazos = np.asarray(plazos).reshape(-1)
+
+    # Indices of every combination, the last axis varying fastest
+    i_frec, i_tipo, i_tasa, i_plazo = (
+        eje.reshape(-1) for eje in np.meshgrid(
+            np.arange(len(frecuencias)), np.arange(len(tipos_cuota)),
+            np.arange(len(tasas)), np.arange(len(plazos)), indexing='ij'))
+    frecuencia = np.array(frecuencias, dtype=object)[i_frec]
+    tipo_cuota = np.array(tipos_cuota, dtype=object)[i_tipo]
+
+    columnas = dict(prestamo)
+    columnas.update(
+        monto=np.broadcast_to(np.asarray(prestamo["monto"], dtype=float),
+                              i_frec.shape),
+        tasa_anual=tasas[i_tasa], plazo_meses=plazos[i_plazo],
+        frecuencia=frecuencia, tipo_cuota=tipo_cuota)
+    with medir("escenarios", filas=len(i_frec)):
+        totales = totales_cartera(parametros_cartera(columnas))
+
+    return pd.DataFrame({
+        "Frecuencia": frecuencia,
+        "Tipo de Cuota": tipo_cuota,
+        "Tasa": columnas["tasa_anual"],
+        "Plazo": columnas["plazo_meses"],
+        **totales
+    })
+
+
+def matriz_escenarios(barrido, frecuencia, tipo_cuota, valor="Primera Cuota"):
+    """
+    Rate x term matrix of one result for one frequency and payment type.
+
+    Args:
+        barrido: DataFrame returned by barrer_escenarios
+        frecuencia: Payment frequency to show
+        tipo_cuota: Payment type to show
+        valor: Column of COLUMNAS_RESUMEN to show
+
+    Returns:
+        DataFrame indexed by rate with one column per term
+    """
+    corte = barrido[(barrido["Frecuencia"] == frecuencia) &
+                    (barrido["Tipo de Cuota"] == tipo_cuota)]
+    return corte.pivot(index="Tasa", columns="Plazo", values=valor)
+
+
+def resumen_escenarios(barrido):
+    """Rows (concept, formatted value) summarizing a sweep for the PDF."""
+    cuotas = barrido["Primera Cuota"]
+    return [
+        ("Escenarios", f"{len(barrido):,}"),
+        ("Tasas", f"{barrido['Tasa'].min():.2f}% a "
+         f"{barrido['Tasa'].max():.2f}%"),
+        ("Plazos", f"{barrido['Plazo'].min()} a {barrido['Plazo'].max()} "
+         "meses"),
+        ("Frecuencias", f"{barrido['Frecuencia'].nunique()}"),
+        ("Cuota mínima", f"L. {cuotas.min():,.2f}"),
+        ("Cuota máxima", f"L. {cuotas.max():,.2f}")
+    ]
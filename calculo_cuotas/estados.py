@@ -0,0 +1,291 @@
+"""
+Bulk generation of account statements: one PDF and one XLSX per loan.
+
+The portfolio is split into chunks of loans that worker processes turn
+into files. With a directory as destination the workers write the files
+themselves and only send back their names; with a ZIP destination they
+send back the bytes of one chunk, which the parent appends to the archive
+and drops. Either way at most two chunks per worker are in flight, so
+memory does not grow with the portfolio.
+
+Each worker imports reportlab and openpyxl and builds the PDF styles
+(plantilla_pdf) once, when it starts, instead of once per document.
+
+Interrupted runs resume where they stopped:
+
+- In a directory every file is written under a temporary name and
+  renamed when complete, so the loans whose files all exist are skipped.
+- A ZIP file is checkpointed every intervalo_guardado seconds (its
+  central directory is written and saved aside). After a crash the
+  archive is cut back to the last checkpoint and the loans it holds are
+  skipped.
+"""
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cronograma import Cronograma
+from .motor import calcular_cuotas_arrays
+
+FORMATOS_ESTADO = ("pdf", "xlsx")
+
+# ZIP compression of each format: XLSX files are already deflated
+_COMPRESION = {"pdf": zipfile.ZIP_DEFLATED, "xlsx": zipfile.ZIP_STORED}
+
+# Temporary names of files being written by _escribir_atomico
+_TEMPORAL = re.compile(r"\.(pdf|xlsx)\.\d+\.tmp$")
+
+
+def _iniciar_trabajador():
+    """Worker initializer: load the exporters and build the PDF styles."""
+    import openpyxl  # noqa: F401
+
+    from .exportar import plantilla_pdf
+    plantilla_pdf()
+
+
+def _archivos(identificador, formatos):
+    return [f"{identificador}.{formato}" for formato in formatos]
+
+
+def _escribir_atomico(ruta, datos):
+    """Write datos to ruta so that ruta only ever holds a complete file."""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(datos)
+    os.replace(temporal, ruta)
+
+
+def _generar_lote(identificadores, columnas, formatos, titulo, directorio):
+    """
+    Worker: build the statements of one chunk of loans.
+
+    Returns:
+        (files, loans without a schedule); files are (name, size) pairs
+        when directorio is given (the files are already written) and
+        (name, bytes) pairs otherwise
+    """
+    from .exportar import convertir_a_excel, convertir_a_pdf
+
+    archivos, sin_tabla = [], []
+    filas = [valores.tolist() for valores in columnas]
+    for identificador, argumentos in zip(identificadores, zip(*filas)):
+        try:
+            df = Cronograma.desde_columnas(calcular_cuotas_arrays(*argumentos))
+        except ZeroDivisionError:
+            sin_tabla.append(identificador)
+            continue
+        for formato, nombre in zip(formatos,
+                                   _archivos(identificador, formatos)):
+            if formato == "pdf":
+                datos = convertir_a_pdf(
+                    df, titulo=titulo.format(id=identificador)).getvalue()
+            else:
+                datos = convertir_a_excel(df).getvalue()
+            if directorio is None:
+                archivos.append((nombre, datos))
+            else:
+                _escribir_atomico(os.path.join(directorio, nombre), datos)
+                archivos.append((nombre, len(datos)))
+    return archivos, sin_tabla
+
+
+def _leer_identificadores(prestamos, columna_id, n_prestamos):
+    """File name stem of every loan: its id column or its row number."""
+    if columna_id is None:
+        ancho = max(6, len(str(n_prestamos)))
+        return [f"prestamo_{n:0{ancho}d}" for n in range(1, n_prestamos + 1)]
+    identificadores = [str(valor) for valor in np.asarray(
+        prestamos[columna_id]).tolist()]
+    for identificador in identificadores:
+        if not identificador or identificador in (".", "..") or \
+                any(c in identificador for c in '/\\:*?"<>|'):
+            raise ValueError(
+                f"Loan id {identificador!r} is not a valid file name")
+    if len(set(identificadores)) != len(identificadores):
+        raise ValueError(f"Column {columna_id!r} has repeated loan ids")
+    return identificadores
+
+
+class _DestinoZip:
+    """
+    ZIP archive written incrementally, with checkpoints for resuming.
+
+    The checkpoint file holds the offset where the central directory
+    starts followed by the central directory bytes; appending to the
+    archive overwrites them, so they are what a crash destroys. It is
+    removed when the archive is complete.
+    """
+
+    def __init__(self, destino, intervalo_guardado):
+        self.destino = destino
+        self.intervalo = intervalo_guardado
+        self.reanudable = isinstance(destino, (str, os.PathLike))
+        self._punto = f"{destino}.punto" if self.reanudable else None
+        self._ultimo = time.monotonic()
+        self.existentes = set()
+        if self.reanudable and os.path.exists(destino):
+            self._recuperar()
+            with zipfile.ZipFile(destino) as archivo:
+                self.existentes = set(archivo.namelist())
+        self.archivo = zipfile.ZipFile(destino,
+                                       "a" if self.existentes else "w")
+        # From here until cerrar() a checkpoint always exists, so an
+        # archive without one is complete. Without it, an archive cut
+        # short would be read from the central directory of its last
+        # stored XLSX, itself a ZIP file.
+        self.guardar(forzar=True)
+
+    def _recuperar(self):
+        """Cut the archive back to its last checkpoint, if any."""
+        if not os.path.exists(self._punto):
+            return
+        with open(self._punto, "rb") as punto:
+            inicio = int.from_bytes(punto.read(8), "little")
+            directorio = punto.read()
+        with open(self.destino, "r+b") as archivo:
+            archivo.truncate(inicio)
+            archivo.seek(inicio)
+            archivo.write(directorio)
+
+    def escribir(self, nombre, datos, formato):
+        self.archivo.writestr(nombre, datos,
+                              compress_type=_COMPRESION[formato])
+
+    def guardar(self, forzar=False):
+        """Checkpoint the archive if intervalo_guardado has elapsed."""
+        if not self.reanudable or not forzar and \
+                time.monotonic() - self._ultimo < self.intervalo:
+            return
+        self.archivo.close()
+        with zipfile.ZipFile(self.destino) as archivo:
+            inicio = archivo.start_dir
+        with open(self.destino, "rb") as archivo:
+            archivo.seek(inicio)
+            _escribir_atomico(self._punto,
+                              inicio.to_bytes(8, "little") + archivo.read())
+        self.archivo = zipfile.ZipFile(self.destino, "a")
+        self._ultimo = time.monotonic()
+
+    def cerrar(self, completo):
+        self.archivo.close()
+        if completo and self.reanudable and os.path.exists(self._punto):
+            os.remove(self._punto)
+
+
+def generar_estados(prestamos, destino, formatos=FORMATOS_ESTADO,
+                    columna_id=None, max_workers=None, tamano_lote=20,
+                    titulo="Estado de Cuenta - Préstamo {id}", progreso=None,
+                    intervalo_guardado=30.0):
+    """
+    Write the amortization statement of every loan of a portfolio.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO), or the path of a portfolio file
+        destino: Directory, path ending in '.zip', or a writable binary
+            file-like object that receives a ZIP stream (not resumable)
+        formatos: Any of 'pdf' and 'xlsx'
+        columna_id: Column naming the files ('<id>.pdf'); defaults to
+            'prestamo_000001' and so on by row
+        max_workers: Number of worker processes (defaults to the CPU count)
+        tamano_lote: Number of loans per worker task
+        titulo: PDF title template; id is the loan id
+        progreso: Optional function called with (done, total) loans after
+            every chunk, skipped loans included
+        intervalo_guardado: Seconds between checkpoints of a ZIP file
+
+    Returns:
+        Dict with 'generados' (loans written), 'omitidos' (already done
+        by an earlier run), 'sin_tabla' (ids whose term holds no whole
+        payment) and 'bytes'
+    """
+    from .cartera import leer_cartera, normalizar_banderas
+    from .paralelo import leer_archivo_cartera
+
+    formatos = tuple(formatos)
+    if not formatos or set(formatos) - set(FORMATOS_ESTADO):
+        raise ValueError(f"formatos must be a subset of {FORMATOS_ESTADO}")
+    if tamano_lote < 1:
+        raise ValueError("tamano_lote must be at least 1")
+    if isinstance(prestamos, (str, os.PathLike)):
+        prestamos = leer_archivo_cartera(prestamos)
+
+    columnas = normalizar_banderas(leer_cartera(prestamos))
+    n_prestamos = len(columnas["monto"])
+    identificadores = _leer_identificadores(prestamos, columna_id,
+                                            n_prestamos)
+
+    es_zip = not isinstance(destino, (str, os.PathLike)) or \
+        str(destino).lower().endswith(".zip")
+    if es_zip:
+        salida = _DestinoZip(destino, intervalo_guardado)
+        hechos = salida.existentes
+        directorio = None
+    else:
+        os.makedirs(destino, exist_ok=True)
+        hechos = set()
+        for nombre in os.listdir(destino):
+            if _TEMPORAL.search(nombre):
+                # Left behind by a worker killed while writing
+                os.remove(os.path.join(destino, nombre))
+            else:
+                hechos.add(nombre)
+        directorio = os.fspath(destino)
+    pendientes = np.array([
+        i for i, identificador in enumerate(identificadores)
+        if not hechos.issuperset(_archivos(identificador, formatos))
+    ], dtype=np.int64)
+
+    resultado = {"generados": 0, "omitidos": n_prestamos - len(pendientes),
+                 "sin_tabla": [], "bytes": 0}
+    contados = resultado["omitidos"]
+    if progreso is not None:
+        progreso(contados, n_prestamos)
+
+    def recibir(futuro):
+        nonlocal contados
+        archivos, sin_tabla = futuro.result()
+        for nombre, datos in archivos:
+            if es_zip:
+                salida.escribir(nombre, datos, nombre.rsplit(".", 1)[1])
+                resultado["bytes"] += len(datos)
+            else:
+                resultado["bytes"] += datos
+        resultado["sin_tabla"].extend(sin_tabla)
+        enviados = len(archivos) // len(formatos)
+        resultado["generados"] += enviados
+        contados += enviados + len(sin_tabla)
+        if es_zip:
+            salida.guardar()
+        if progreso is not None:
+            progreso(contados, n_prestamos)
+
+    completo = False
+    max_workers = max_workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_iniciar_trabajador) as executor:
+            en_vuelo = deque()
+            for desde in range(0, len(pendientes), tamano_lote):
+                indices = pendientes[desde:desde + tamano_lote]
+                if len(en_vuelo) >= 2 * max_workers:
+                    recibir(en_vuelo.popleft())
+                en_vuelo.append(executor.submit(
+                    _generar_lote, [identificadores[i] for i in indices],
+                    [valores[indices] for valores in columnas.values()],
+                    formatos, titulo, directorio))
+            while en_vuelo:
+                recibir(en_vuelo.popleft())
+        completo = True
+    finally:
+        if es_zip:
+            if not completo:
+                salida.guardar(forzar=True)
+            salida.cerrar(completo)
+    return resultado
@@ -0,0 +1,480 @@
+"""
+Display formatting and Excel and PDF exports of an amortization schedule.
+
+Every function takes a DataFrame or a Cronograma (amounts in centavos are
+turned into Lempiras here, at the edge). reportlab and openpyxl are
+imported when an export is built, so importing this module (or the
+engine) does not load them.
+"""
+import base64
+import functools
+from io import BytesIO
+
+import numpy as np
+
+from .metricas import medir
+
+# Excel number format of each schedule column (others use General)
+FORMATOS_EXCEL = {
+    "Pago": "0",
+    "Fecha": "dd/mm/yyyy",
+    "Cuota": "#,##0.00",
+    "Interés": "#,##0.00",
+    "Abono": "#,##0.00",
+    "Abono Extra": "#,##0.00",
+    "Seguro de Préstamo": "#,##0.00",
+    "Seguro Daños": "#,##0.00",
+    "Seguro Vehículo": "#,##0.00",
+    "Saldo": "#,##0.00",
+    # Portfolio summaries and scenario sweeps
+    "Tasa": "0.00",
+    "Plazo": "0",
+    "Pagos": "0",
+    "Primera Cuota": "#,##0.00",
+    "Total a Pagar": "#,##0.00",
+    "Total Intereses": "#,##0.00",
+    "Total Seguro de Préstamo": "#,##0.00",
+    "Total Seguro Daños": "#,##0.00",
+    "Total Seguro Vehículo": "#,##0.00",
+    # 'Resumen' sheet of a schedule export; the TCEA is a fraction
+    "Total Capital": "#,##0.00",
+    "Total Abonos Extra": "#,##0.00",
+    "TCEA": "0.00%"
+}
+
+# Amount columns shown as 'L. 1,234.56' by formatear_tabla
+_COLUMNAS_MONTO = ("Cuota", "Interés", "Abono", "Abono Extra",
+                   "Seguro de Préstamo", "Seguro Daños", "Seguro Vehículo",
+                   "Saldo")
+
+# Totals of the summary of a schedule: (column summed, PDF concept,
+# column of the Excel 'Resumen' sheet)
+_TOTALES = (("Cuota", "Total a pagar", "Total a Pagar"),
+            ("Interés", "Total intereses", "Total Intereses"),
+            ("Abono", "Total capital", "Total Capital"),
+            ("Abono Extra", "Total abonos extraordinarios",
+             "Total Abonos Extra"),
+            ("Seguro de Préstamo", "Total seguro de préstamo",
+             "Total Seguro de Préstamo"),
+            ("Seguro Daños", "Total seguro de daños", "Total Seguro Daños"),
+            ("Seguro Vehículo", "Total seguro de vehículo",
+             "Total Seguro Vehículo"))
+
+# Rows converted from arrays to Python values at a time when streaming
+_FILAS_POR_BLOQUE = 4096
+
+
+def _en_lempiras(tabla):
+    """A Cronograma in centavos as Lempiras; anything else unchanged."""
+    return tabla.en_lempiras() if hasattr(tabla, "en_lempiras") else tabla
+
+
+def _columnas_de(tabla):
+    """
+    Column name -> 1-D array for a DataFrame, a Cronograma or a mapping.
+    """
+    if hasattr(tabla, "columns"):
+        tabla = _en_lempiras(tabla)
+        return {nombre: np.asarray(tabla[nombre]) for nombre in tabla.columns}
+    return dict(tabla)
+
+
+def _escribir_hoja(libro, titulo, columnas):
+    """Append one write-only sheet with the given columns to libro."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    hoja = libro.create_sheet(title=titulo)
+    nombres = list(columnas)
+    for i, nombre in enumerate(nombres, 1):
+        hoja.column_dimensions[get_column_letter(i)].width = max(
+            12, len(nombre) + 2)
+    hoja.freeze_panes = "A2"
+
+    negrita = Font(bold=True)
+    encabezado = []
+    for nombre in nombres:
+        celda = WriteOnlyCell(hoja, value=nombre)
+        celda.font = negrita
+        encabezado.append(celda)
+    hoja.append(encabezado)
+
+    # One styled cell per column, reused on every row: the write-only sheet
+    # serializes each row as soon as it is appended, so the number format
+    # is registered once per column instead of once per cell
+    plantillas = []
+    for nombre in nombres:
+        celda = WriteOnlyCell(hoja)
+        if nombre in FORMATOS_EXCEL:
+            celda.number_format = FORMATOS_EXCEL[nombre]
+        plantillas.append(celda)
+
+    arrays = list(columnas.values())
+    n_filas = len(arrays[0]) if arrays else 0
+    for desde in range(0, n_filas, _FILAS_POR_BLOQUE):
+        bloque = [a[desde:desde + _FILAS_POR_BLOQUE].tolist() for a in arrays]
+        for valores in zip(*bloque):
+            for celda, valor in zip(plantillas, valores):
+                celda.value = valor
+            hoja.append(plantillas)
+
+
+def escribir_excel_streaming(hojas, destino):
+    """
+    Write sheets to an XLSX file with constant working memory.
+
+    Rows go straight from the column arrays to openpyxl write-only
+    worksheets, so neither a DataFrame nor the cell objects of a whole
+    sheet are kept in memory.
+
+    Args:
+        hojas: Iterable of (title, table) pairs, where table is a DataFrame
+            or a mapping of column name to 1-D array; it may be a generator
+            producing the schedules one by one
+        destino: File path or binary file-like object
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    for titulo, tabla in hojas:
+        _escribir_hoja(libro, titulo, _columnas_de(tabla))
+    if not libro.worksheets:
+        libro.create_sheet(title="Amortización")
+    libro.save(destino)
+
+
+def escribir_excel_cartera(lotes, destino, nombre_hoja="Préstamo {n}"):
+    """
+    Write one sheet per loan from the output of generar_cronogramas.
+
+    Args:
+        lotes: Iterable of LoteCronogramas
+        destino: File path or binary file-like object
+        nombre_hoja: Sheet title template; n is the 1-based loan number
+    """
+    from .motor import COLUMNAS
+
+    def hojas():
+        for lote in lotes:
+            for j in range(lote.n_prestamos):
+                desde = lote.desplazamientos[j]
+                hasta = lote.desplazamientos[j + 1]
+                columnas = {"Pago": lote.pago[desde:hasta]}
+                for k, nombre in enumerate(COLUMNAS[1:]):
+                    columnas[nombre] = lote.valores[desde:hasta, k]
+                titulo = nombre_hoja.format(n=lote.inicio + j + 1)
+                yield titulo[:31], columnas
+
+    escribir_excel_streaming(hojas(), destino)
+
+
+def convertir_a_excel(df, streaming=True, tcea=None):
+    """
+    Convert DataFrame to Excel format in memory.
+
+    Args:
+        df: DataFrame or Cronograma to convert
+        streaming: Use the constant-memory write-only writer with number
+            formats per column; False goes through pandas.ExcelWriter
+        tcea: Effective annual cost in %; when given, a 'Resumen' sheet
+            with the totals and the TCEA follows the schedule
+
+    Returns:
+        BytesIO object containing Excel data
+    """
+    with medir("excel", filas=len(df)) as medicion:
+        output = _convertir_a_excel(df, streaming, tcea)
+        medicion.bytes = output.getbuffer().nbytes
+    return output
+
+
+def _hoja_resumen(df, tcea):
+    """
+    'Resumen' sheet columns: one row with the totals of the schedule and
+    its TCEA, as numbers (empty when the TCEA is not finite).
+    """
+    df = _en_lempiras(df)
+    fila = {"Pagos": len(df)}
+    if len(df) and "Cuota" in df.columns:
+        fila["Primera Cuota"] = float(np.asarray(df["Cuota"])[0])
+    for nombre, _, columna in _TOTALES:
+        if nombre in df.columns:
+            fila[columna] = float(np.asarray(df[nombre]).sum())
+    fila["TCEA"] = tcea / 100 if np.isfinite(tcea) else None
+    return {nombre: np.array([valor], dtype=object)
+            for nombre, valor in fila.items()}
+
+
+def _escribir_excel_pandas(df, hojas, destino):
+    """Write the sheets through pandas.ExcelWriter (no streaming)."""
+    import pandas as pd
+
+    with pd.ExcelWriter(destino, engine='openpyxl', mode='w') as writer:
+        df.to_excel(writer, index=False, sheet_name='Amortización')
+        for titulo, columnas in hojas[1:]:
+            pd.DataFrame(columnas).to_excel(writer, index=False,
+                                            sheet_name=titulo)
+            hoja = writer.sheets[titulo]
+            for celdas in hoja.iter_cols(min_row=2):
+                nombre = hoja.cell(1, celdas[0].column).value
+                for celda in celdas:
+                    celda.number_format = FORMATOS_EXCEL.get(nombre,
+                                                             "General")
+
+
+def _convertir_a_excel(df, streaming, tcea):
+    """Body of convertir_a_excel, without the instrumentation."""
+    hojas = [('Amortización', df)]
+    if tcea is not None:
+        hojas.append(('Resumen', _hoja_resumen(df, tcea)))
+    if streaming:
+        output = BytesIO()
+        escribir_excel_streaming(hojas, output)
+        output.seek(0)
+        return output
+
+    if hasattr(df, "a_dataframe"):
+        df = df.a_dataframe()
+    output = BytesIO()
+
+    # Use openpyxl engine with explicit type specification
+    try:
+        _escribir_excel_pandas(df, hojas, output)
+    except Exception as e:
+        # Fallback: use a temporary file approach
+        import tempfile
+        import os
+        output = BytesIO()
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
+            _escribir_excel_pandas(df, hojas, tmp.name)
+            tmp.seek(0)
+            with open(tmp.name, 'rb') as f:
+                output.write(f.read())
+            os.unlink(tmp.name)
+
+    output.seek(0)
+    return output
+
+
+def generar_link_descarga_excel(df):
+    """
+    Generate download link for Excel file.
+
+    Args:
+        df: DataFrame or Cronograma to export
+
+    Returns:
+        HTML string with download link
+    """
+    excel_data = convertir_a_excel(df)
+    with medir("base64") as medicion:
+        b64 = base64.b64encode(excel_data.read()).decode()
+        medicion.bytes = len(b64)
+    return f'<a href="data:application/octet-stream;base64,{b64}" download="tabla_amortizacion.xlsx">📅 Descargar Excel</a>'
+
+
+def formatear_tabla(df):
+    """
+    Schedule for display, with the amounts as 'L. 1,234.56' strings.
+
+    The strings are built straight from the column arrays, so the numeric
+    table is never copied.
+
+    Args:
+        df: DataFrame or Cronograma with COLUMNAS columns
+
+    Returns:
+        New DataFrame; 'Pago' and unknown columns keep their values
+    """
+    import pandas as pd
+
+    with medir("formato", filas=len(df)):
+        tabla = _en_lempiras(df)
+        columnas = {}
+        for nombre in tabla.columns:
+            valores = np.asarray(tabla[nombre])
+            if nombre in _COLUMNAS_MONTO:
+                valores = [f"L. {x:,.2f}" for x in valores.tolist()]
+            elif valores.dtype.kind == "M":
+                valores = [f"{x:%d/%m/%Y}" for x in valores.tolist()]
+            columnas[nombre] = valores
+        return pd.DataFrame(columnas, index=getattr(df, "index", None))
+
+
+def _formatear_columna(nombre, valores):
+    """Format a whole column of the table as strings in one pass."""
+    if nombre in ("Pago", "Pagos", "Plazo"):
+        return [f"{int(x)}" for x in valores.tolist()]
+    if valores.dtype.kind == "M":
+        return [f"{x:%d/%m/%Y}" for x in valores.tolist()]
+    if valores.dtype.kind in "iuf":
+        return [f"{x:,.2f}" for x in valores.tolist()]
+    return [str(x) for x in valores.tolist()]
+
+
+def _resumen_pdf(df, tcea=None):
+    """Rows of the summary page: (concept, formatted amount)."""
+    filas = [("Número de pagos", f"{len(df)}")]
+    if len(df) and "Cuota" in df.columns:
+        filas.append(("Primera cuota",
+                      f"L. {np.asarray(df['Cuota'])[0]:,.2f}"))
+    for nombre, concepto, _ in _TOTALES:
+        if nombre in df.columns:
+            total = np.asarray(df[nombre]).sum()
+            filas.append((concepto, f"L. {total:,.2f}"))
+    if tcea is not None:
+        filas.append(_fila_tcea(tcea))
+    return filas
+
+
+def _fila_tcea(tcea):
+    """Summary row of the effective annual cost."""
+    return ("TCEA (seguros incluidos)",
+            f"{tcea:,.2f}%" if np.isfinite(tcea) else "No disponible")
+
+
+@functools.lru_cache(maxsize=None)
+def plantilla_pdf():
+    """
+    Paragraph and table styles of the PDF export.
+
+    Built once per process and shared by every document.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    estilos = getSampleStyleSheet()
+    return {
+        "titulo": estilos['Heading1'],
+        "subtitulo": estilos['Heading2'],
+        "tabla": TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0),
+             colors.HexColor("#003366")),  # Header background
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header text color
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Grid lines
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header font
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # Center alignment
+            ('FONTSIZE', (0, 0), (-1, -1), 8),  # Font size
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        "resumen": TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor("#e6f2ff")),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ])
+    }
+
+
+def convertir_a_pdf(df, titulo="Tabla de Amortización", resumen=None,
+                    tcea=None):
+    """
+    Convert DataFrame to PDF format in memory.
+
+    The first page summarizes the schedule. The table follows in chunks of
+    exactly one page, each with its own header row, fixed column widths and
+    fixed row heights, so reportlab never has to split or re-measure a
+    large table and the build time grows linearly with the row count.
+
+    Args:
+        df: DataFrame or Cronograma to convert
+        titulo: Title printed on the summary page and page headers
+        resumen: Rows (concept, formatted value) of the summary page;
+            defaults to the totals of an amortization schedule
+        tcea: Effective annual cost in %, added to the summary page
+
+    Returns:
+        BytesIO object containing PDF data
+    """
+    with medir("pdf", filas=len(df)) as medicion:
+        output = _convertir_a_pdf(df, titulo, resumen, tcea)
+        medicion.bytes = output.getbuffer().nbytes
+    return output
+
+
+def _convertir_a_pdf(df, titulo, resumen, tcea):
+    """Body of convertir_a_pdf, without the instrumentation."""
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.platypus import (PageBreak, Paragraph, SimpleDocTemplate,
+                                    Spacer, Table)
+
+    plantilla = plantilla_pdf()
+    df = _en_lempiras(df)
+    encabezado = [str(c) for c in df.columns]
+    celdas = [_formatear_columna(c, np.asarray(df[c])) for c in df.columns]
+
+    # Column widths from the header and the longest value of each column
+    anchos = []
+    for nombre, valores in zip(encabezado, celdas):
+        mas_largo = max(valores, key=len, default="")
+        anchos.append(max(stringWidth(nombre, 'Helvetica-Bold', 8),
+                          stringWidth(mas_largo, 'Helvetica', 8)) + 10)
+
+    margen = 36
+    pagina = letter
+    if sum(anchos) > pagina[0] - 2 * margen:
+        pagina = landscape(letter)
+
+    output = BytesIO()
+    doc = SimpleDocTemplate(output, pagesize=pagina, leftMargin=margen,
+                            rightMargin=margen, topMargin=margen + 18,
+                            bottomMargin=margen)
+
+    def encabezado_pagina(canvas, documento):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.drawString(margen, pagina[1] - margen, titulo)
+        canvas.drawRightString(pagina[0] - margen, pagina[1] - margen,
+                               f"Página {documento.page}")
+        canvas.restoreState()
+
+    # Summary page
+    if resumen is None:
+        resumen = _resumen_pdf(df, tcea)
+    elif tcea is not None:
+        resumen = list(resumen) + [_fila_tcea(tcea)]
+    elements = [
+        Paragraph(titulo, plantilla["titulo"]),
+        Spacer(1, 12),
+        Paragraph("Resumen", plantilla["subtitulo"]),
+        Table(resumen,
+              colWidths=[200, 150],
+              style=plantilla["resumen"], hAlign='LEFT')
+    ]
+
+    # One table per page with the header repeated on each of them
+    alto_fila = 12
+    filas_por_pagina = max(1, int((doc.height - 12) // alto_fila) - 1)
+    filas = list(zip(*celdas))
+    for desde in range(0, len(filas), filas_por_pagina):
+        elements.append(PageBreak())
+        elements.append(
+            Table([encabezado] + filas[desde:desde + filas_por_pagina],
+                  colWidths=anchos, rowHeights=alto_fila,
+                  style=plantilla["tabla"]))
+
+    doc.build(elements, onFirstPage=encabezado_pagina,
+              onLaterPages=encabezado_pagina)
+    output.seek(0)
+    return output
+
+
+def generar_link_descarga_pdf(df):
+    """
+    Generate download link for PDF file.
+
+    Args:
+        df: DataFrame or Cronograma to export
+
+    Returns:
+        HTML string with download link
+    """
+    pdf_data = convertir_a_pdf(df)
+    with medir("base64") as medicion:
+        b64 = base64.b64encode(pdf_data.read()).decode()
+        medicion.bytes = len(b64)
+    return f'<a href="data:application/pdf;base64,{b64}" download="tabla_amortizacion.pdf">📄 Descargar PDF</a>'
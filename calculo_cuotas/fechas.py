@@ -0,0 +1,310 @@
+"""
+Schedules with real payment dates and day-count conventions.
+
+The undated engine counts payments: a 'Diario' loan pays 360 times a year
+and a monthly insurance charge is split with fixed divisors. Here every
+payment has a calendar date, generated from the disbursement date with
+NumPy datetime64 arithmetic:
+
+- Monthly frequencies ('Mensual' to 'Anual') fall on the day of the
+  disbursement every 1 to 12 months, or on the last day of shorter months.
+- 'Quincenal' adds 15 days to each of those monthly dates.
+- 'Semanal' and 'Diario' fall every 7 days and every day; they run
+  through the whole term, so their number of payments follows the
+  calendar.
+
+Each period accrues interest on the fraction of a year between its two
+dates under the day-count convention, so periods have different rates.
+Unless one is chosen, 'Semanal' and 'Diario' loans count actual days
+(Actual/365): under 30/360 a daily payment falling on the 31st would
+accrue nothing and the one on March 1st three days' worth. Frequencies
+whose payments are whole months apart keep 30/360, where those periods
+are exactly 1 to 12 twelfths of a year, as in the undated engine.
+A 'Nivelada' cuota still repays the loan exactly: with D_k the product of
+(1 + rate) over the first k periods, the cuota is monto / sum(1 / D_k) and
+the balance after k payments is D_k * (monto - cuota * sum_{j<=k} 1 / D_j).
+The insurance is the monthly charge times the months the period covers
+(twelve times its year fraction).
+"""
+import numpy as np
+
+from .metricas import medir
+from .motor import COLUMNAS, FREQ_DICT, CapaBase, combinar_capas
+from .seguros import calcular_seguro_danos, calcular_seguro_vehiculo
+
+# Day-count conventions: days between two dates / days in a year
+CONVENCIONES = ("30/360", "Actual/360", "Actual/365")
+
+# Frequencies that default to actual day counts (see convencion_defecto)
+_DIAS_REALES = ('Semanal', 'Diario')
+
+# Columns of a dated schedule
+COLUMNAS_FECHAS = ["Pago", "Fecha"] + COLUMNAS[1:]
+
+
+def convencion_defecto(frecuencia):
+    """Day-count convention used for a frequency when none is given."""
+    return "Actual/365" if frecuencia in _DIAS_REALES else "30/360"
+
+
+def _validar_convencion(convencion):
+    if convencion not in CONVENCIONES:
+        raise ValueError(f"convencion must be one of {CONVENCIONES}")
+
+
+# Days of every month of a common year
+_DIAS_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _a_civil(fechas):
+    """
+    (year, month, day) int64 arrays of datetime64[D] dates.
+
+    Integer arithmetic on the day number: much faster than converting
+    through datetime64[M] and datetime64[Y].
+    """
+    z = fechas.astype(np.int64) + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    dia = doy - (153 * mp + 2) // 5 + 1
+    mes = np.where(mp < 10, mp + 3, mp - 9)
+    return yoe + era * 400 + (mes <= 2), mes, dia
+
+
+def _desde_civil(año, mes, dia):
+    """datetime64[D] dates of (year, month, day) int64 arrays."""
+    año = año - (mes <= 2)
+    era = año // 400
+    yoe = año - era * 400
+    doy = (153 * np.where(mes > 2, mes - 3, mes + 9) + 2) // 5 + dia - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return (era * 146097 + doe - 719468).astype("datetime64[D]")
+
+
+def sumar_meses(fechas, meses):
+    """
+    Dates moved by whole months, keeping the day of the month.
+
+    Days past the end of the target month become its last day (31 January
+    plus one month is 28 or 29 February). Works element-wise on arrays.
+
+    Args:
+        fechas: Dates (anything np.datetime64 accepts)
+        meses: Months to add (may be negative)
+
+    Returns:
+        datetime64[D] array
+    """
+    año, mes, dia = _a_civil(np.asarray(fechas, dtype="datetime64[D]"))
+    mes = año * 12 + mes - 1 + np.asarray(meses, dtype=np.int64)
+    año, mes = mes // 12, mes % 12 + 1
+    bisiesto = (año % 4 == 0) & ((año % 100 != 0) | (año % 400 == 0))
+    ultimo = _DIAS_MES[mes - 1] + ((mes == 2) & bisiesto)
+    return _desde_civil(año, mes, np.minimum(dia, ultimo))
+
+
+def fraccion_año(inicio, fin, convencion="Actual/365"):
+    """
+    Fraction of a year between two dates under a day-count convention.
+
+    '30/360' is the US (bond basis) rule: the 31st counts as the 30th, and
+    so does the 31st that ends a period starting on the 30th or 31st.
+
+    Args:
+        inicio, fin: Dates; arrays are handled element-wise
+        convencion: One of CONVENCIONES
+
+    Returns:
+        Float array
+    """
+    _validar_convencion(convencion)
+    inicio = np.asarray(inicio, dtype="datetime64[D]")
+    fin = np.asarray(fin, dtype="datetime64[D]")
+    if convencion != "30/360":
+        dias = (fin - inicio).astype(np.int64)
+        return dias / (360.0 if convencion == "Actual/360" else 365.0)
+
+    return _treinta_360(*_a_civil(inicio), *_a_civil(fin))
+
+
+def _treinta_360(año_1, mes_1, dia_1, año_2, mes_2, dia_2):
+    """'30/360' year fraction between two (year, month, day) dates."""
+    dia_1 = np.minimum(dia_1, 30)
+    dia_2 = np.where(dia_1 == 30, np.minimum(dia_2, 30), dia_2)
+    return (360 * (año_2 - año_1) + 30 * (mes_2 - mes_1) +
+            (dia_2 - dia_1)) / 360.0
+
+
+def _fracciones(fechas, convencion):
+    """Year fraction between every pair of consecutive dates."""
+    if convencion != "30/360":
+        return fraccion_año(fechas[:-1], fechas[1:], convencion)
+    civil = _a_civil(fechas)
+    return _treinta_360(*(v[:-1] for v in civil), *(v[1:] for v in civil))
+
+
+def fechas_pago(fecha_desembolso, plazo_meses, frecuencia):
+    """
+    Calendar date of every payment of a loan.
+
+    Args:
+        fecha_desembolso: Disbursement date
+        plazo_meses: Loan term in months
+        frecuencia: Payment frequency
+
+    Returns:
+        datetime64[D] array, one date per payment ('Al vencimiento': the
+        maturity date)
+    """
+    desembolso = np.datetime64(fecha_desembolso, "D")
+    pagos_por_año = FREQ_DICT[frecuencia]
+    if pagos_por_año == 0:
+        return sumar_meses(desembolso, [plazo_meses])
+    if pagos_por_año <= 12:
+        # Whole months between payments
+        paso = 12 // pagos_por_año
+        pagos = np.arange(1, int(plazo_meses * pagos_por_año / 12) + 1)
+        return sumar_meses(desembolso, pagos * paso)
+    if frecuencia == 'Quincenal':
+        pagos = np.arange(1, int(plazo_meses * 2) + 1)
+        return sumar_meses(desembolso, pagos // 2) + \
+            np.where(pagos % 2 == 1, 15, 0).astype("timedelta64[D]")
+
+    # 'Semanal' and 'Diario' pay every 7 days or every day until maturity
+    dias = 7 if frecuencia == 'Semanal' else 1
+    vencimiento = sumar_meses(desembolso, plazo_meses)
+    n_pagos = int((vencimiento - desembolso).astype(np.int64) // dias)
+    return desembolso + (np.arange(1, n_pagos + 1) * dias).astype(
+        "timedelta64[D]")
+
+
+def calcular_base_fechas(monto, tasa_anual, plazo_meses, frecuencia,
+                         tipo_cuota, fecha_desembolso, convencion=None):
+    """
+    Base layer of a dated schedule.
+
+    Args:
+        monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota: As for
+            calcular_base
+        fecha_desembolso: Disbursement date
+        convencion: Day-count convention, one of CONVENCIONES (defaults
+            to convencion_defecto(frecuencia): Actual/365 for 'Semanal'
+            and 'Diario', 30/360 otherwise)
+
+    Returns:
+        (CapaBase, payment dates, months covered by each payment).
+        tasa_periodo is the rate of every payment. Insurance is charged
+        on the payments at least a year before the last one, and the loan
+        insurance is priced on the balance a year after disbursement.
+    """
+    if convencion is None:
+        convencion = convencion_defecto(frecuencia)
+    _validar_convencion(convencion)
+    desembolso = np.datetime64(fecha_desembolso, "D")
+    fechas = fechas_pago(desembolso, plazo_meses, frecuencia)
+    n_pagos = len(fechas)
+    if n_pagos == 0:
+        raise ZeroDivisionError("the term holds no whole payment")
+
+    fraccion = _fracciones(np.concatenate(([desembolso], fechas)),
+                           convencion)
+    tasa = tasa_anual / 100 * fraccion
+    pago = np.arange(1, n_pagos + 1)
+
+    if tipo_cuota == 'Nivelada' and FREQ_DICT[frecuencia]:
+        # Discount factor of every payment and the cuota they level out
+        descuento = 1 / np.cumprod(1 + tasa)
+        acumulado = np.cumsum(descuento)
+        cuota_base = monto / acumulado[-1]
+        saldo = (monto - cuota_base * acumulado) / descuento
+        saldo[-1] = 0.0
+    else:
+        abono_fijo = monto / n_pagos
+        saldo = monto - pago * abono_fijo
+    np.maximum(saldo, 0, out=saldo)  # Prevent negative balance
+
+    saldo_anterior = np.empty(n_pagos)
+    saldo_anterior[:1] = monto
+    saldo_anterior[1:] = saldo[:-1]
+    interes = saldo_anterior * tasa
+    if tipo_cuota == 'Nivelada' and FREQ_DICT[frecuencia]:
+        abono = cuota_base - interes
+        cuota = np.full(n_pagos, cuota_base)
+    else:
+        abono = np.full(n_pagos, abono_fijo)
+        cuota = abono + interes
+
+    # Insurance stops a year before the last payment: the dates are
+    # sorted, so the insured ones are those before the first payment
+    # whose date plus a year passes the last one
+    asegurados = np.searchsorted(fechas, sumar_meses(fechas[-1], -12),
+                                 side="right")
+    while asegurados < n_pagos and \
+            sumar_meses(fechas[asegurados], 12) <= fechas[-1]:
+        asegurados += 1  # Days clamped to the end of February
+    if FREQ_DICT[frecuencia] == 0:
+        asegurados = n_pagos
+    con_seguro = pago <= asegurados
+    primer_año = np.searchsorted(fechas, sumar_meses(desembolso, 12),
+                                 side="right")
+    saldo_referencia = saldo[primer_año - 1] if primer_año else monto
+
+    base = CapaBase(pago=pago, cuota=cuota, interes=interes, abono=abono,
+                    saldo=saldo, con_seguro=con_seguro,
+                    saldo_referencia=float(saldo_referencia),
+                    frecuencia=frecuencia,
+                    pagos_por_año=FREQ_DICT[frecuencia],
+                    plazo_meses=plazo_meses, monto=monto,
+                    tipo_cuota=tipo_cuota, tasa_periodo=tasa)
+    return base, fechas, 12 * fraccion
+
+
+def calcular_cronograma_fechas(monto, tasa_anual, plazo_meses, frecuencia,
+                               tipo_cuota, incluir_seguro, porcentaje_seguro,
+                               incluir_seguro_danos, monto_asegurar,
+                               porcentaje_seguro_danos, impuesto_danos,
+                               bomberos_danos, papeleria_danos,
+                               incluir_seguro_vehiculo, monto_vehiculo,
+                               porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                               gasto_vehiculo, fecha_desembolso,
+                               convencion=None):
+    """
+    Amortization schedule with payment dates, as a Cronograma.
+
+    Takes the same arguments as calcular_cuotas_df followed by those of
+    calcular_base_fechas.
+
+    Returns:
+        Cronograma with the COLUMNAS_FECHAS columns
+    """
+    from .cronograma import Cronograma
+
+    with medir("calculo") as medicion:
+        base, fechas, meses = calcular_base_fechas(
+            monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
+            fecha_desembolso, convencion)
+
+        # Every insurance is a monthly charge times the months covered
+        mensuales = [
+            (base.saldo_referencia / 1000) * porcentaje_seguro
+            if incluir_seguro == 'Sí' and base.pagos_por_año != 0 else 0,
+            calcular_seguro_danos(monto_asegurar, porcentaje_seguro_danos,
+                                  impuesto_danos, bomberos_danos,
+                                  papeleria_danos)
+            if incluir_seguro_danos == 'Sí' else 0,
+            calcular_seguro_vehiculo(monto_vehiculo,
+                                     porcentaje_seguro_vehiculo,
+                                     impuesto_vehiculo, gasto_vehiculo)
+            if incluir_seguro_vehiculo == 'Sí' else 0,
+        ]
+        seguros = [np.where(base.con_seguro, mensual * meses, 0.0)
+                   for mensual in mensuales]
+        columnas = combinar_capas(base, *seguros)
+        columnas["Fecha"] = fechas
+        cronograma = Cronograma.desde_columnas(
+            {nombre: columnas[nombre] for nombre in COLUMNAS_FECHAS})
+        medicion.filas = len(cronograma)
+    return cronograma
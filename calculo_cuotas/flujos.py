@@ -0,0 +1,188 @@
+"""
+Cash-flow projection of a whole portfolio by calendar month.
+
+Every loan is split into the calendar months it runs through, whatever
+its frequency: month k holds its payments made after month k - 1 and by
+month k (30 of them for 'Diario', none in most months for 'Anual'). The
+interest, principal and insurance of those payments have closed forms
+from the balances at both ends of the month, so no schedule is built.
+The (loan, month) totals are scatter-added into the portfolio months with
+np.bincount.
+
+Loans are processed in chunks whose (loan, month) pairs fit in a memory
+budget, so the working memory does not grow with the portfolio.
+"""
+import os
+
+import numpy as np
+
+from .metricas import medir
+from .motor import saldo_nivelada
+
+# Columns returned by proyectar_flujos
+COLUMNAS_FLUJO = [
+    "Mes", "Pagos", "Cuota", "Interés", "Abono", "Seguro de Préstamo",
+    "Seguro Daños", "Seguro Vehículo", "Saldo"
+]
+
+# Arrays of one entry per (loan, month) pair alive at once in a chunk
+_TEMPORALES = 24
+
+
+def _meses_prestamo(p, plazo_meses):
+    """Months from disbursement to the last payment of every loan."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        meses = np.ceil(p["n_pagos"] * 12 / p["pagos_por_año"] - 1e-9)
+    meses = np.where(p["al_vencimiento"], np.ceil(plazo_meses - 1e-9), meses)
+    meses = np.where(p["n_pagos"] >= 1, np.maximum(meses, 1), 0)
+    return meses.astype(np.int64)
+
+
+def _flujos_lote(p, plazo_meses, desfase, n_meses_total):
+    """
+    Monthly totals of one chunk of loans.
+
+    Args:
+        p: Dict returned by parametros_cartera for the chunk
+        plazo_meses: Term of every loan of the chunk
+        desfase: Month of the projection in which every loan is disbursed
+        n_meses_total: Number of months of the projection
+
+    Returns:
+        Array with one row per column of COLUMNAS_FLUJO[1:] and one column
+        per month of the projection
+    """
+    meses = _meses_prestamo(p, plazo_meses)
+    # One entry per (loan, month since disbursement) pair
+    prestamo = np.repeat(np.arange(len(meses)), meses)
+    mes = np.arange(len(prestamo)) - np.repeat(np.cumsum(meses) - meses,
+                                               meses) + 1
+    calendario = mes + desfase[prestamo]
+    dentro = (calendario >= 1) & (calendario <= n_meses_total)
+    prestamo, mes, calendario = prestamo[dentro], mes[dentro], \
+        calendario[dentro]
+
+    n_pagos = p["n_pagos"][prestamo]
+    pagos_por_año = p["pagos_por_año"][prestamo]
+    monto = p["monto"][prestamo]
+    tasa = p["tasa_periodo"][prestamo]
+    nivelada = p["nivelada"][prestamo]
+    abono_fijo = p["abono_fijo"][prestamo]
+
+    # An 'Al vencimiento' loan pays once, in its last month
+    def hechos(m, i=slice(None)):
+        """Payments made by month m of the pairs i."""
+        return np.where(p["al_vencimiento"][prestamo[i]],
+                        m >= meses[prestamo[i]], np.minimum(
+                            np.floor(m * pagos_por_año[i] / 12 + 1e-9),
+                            n_pagos[i])).astype(np.int64)
+
+    def saldo(k, i=slice(None)):
+        """Balance after k payments of the pairs i."""
+        return np.maximum(np.where(
+            nivelada[i], saldo_nivelada(monto[i], tasa[i], n_pagos[i], k),
+            monto[i] - k * abono_fijo[i]), 0)
+
+    # A month starts where the previous month of the same loan ended
+    primero = np.flatnonzero(np.diff(prestamo, prepend=-1) != 0)
+
+    def anterior(valores, primeros):
+        """Value of the previous pair; primeros for the first ones."""
+        inicio = np.empty_like(valores)
+        inicio[1:] = valores[:-1]
+        inicio[primero] = primeros
+        return inicio
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        hasta = hechos(mes)
+        desde = anterior(hasta, hechos(mes[primero] - 1, primero))
+        t = hasta - desde
+        saldo_fin = saldo(hasta)
+        saldo_inicio = anterior(saldo_fin, saldo(desde[primero], primero))
+        interes = np.where(
+            nivelada, t * p["cuota_base"][prestamo] - (saldo_inicio -
+                                                       saldo_fin),
+            tasa * (t * saldo_inicio - abono_fijo * t * (t - 1) / 2))
+    abono = np.where(nivelada, saldo_inicio - saldo_fin, t * abono_fijo)
+
+    # Insurance is charged on the first cuotas_con_seguro payments
+    asegurados = np.maximum(
+        np.minimum(hasta, p["cuotas_con_seguro"][prestamo]) - desde, 0)
+    seguros = [asegurados * p[nombre][prestamo]
+               for nombre in ("seguro_unitario", "seguro_danos_por_pago",
+                              "seguro_vehiculo_por_pago")]
+    valores = [t, interes + abono + sum(seguros), interes, abono, *seguros,
+               saldo_fin]
+    return np.stack([np.bincount(calendario - 1, v, minlength=n_meses_total)
+                     for v in valores])
+
+
+def _rebanada(prestamos, inicio, fin):
+    """Loans inicio to fin of a DataFrame or mapping of columns."""
+    if hasattr(prestamos, "iloc"):
+        return prestamos.iloc[inicio:fin]
+    return {nombre: valores if np.ndim(valores) == 0 else
+            valores[inicio:fin] for nombre, valores in prestamos.items()}
+
+
+def proyectar_flujos(prestamos, mes_desembolso=0, meses=None,
+                     memoria_lote=16 * 2**20):
+    """
+    Expected monthly inflows of a whole portfolio.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO), or the path of a portfolio file
+        mes_desembolso: Month of the projection in which each loan was
+            disbursed (0: at its start, negative for loans already
+            running): a scalar, one value per loan or the name of a column
+            of prestamos. Payments before month 1 are left out.
+        meses: Number of months to project (defaults to the last payment
+            of the portfolio)
+        memoria_lote: Approximate bytes of working memory of one chunk
+
+    Returns:
+        DataFrame with the COLUMNAS_FLUJO columns, one row per month.
+        'Pagos' is the number of payments due, the amounts are their
+        totals and 'Saldo' is the balance left at the end of the month.
+    """
+    import pandas as pd
+
+    from .cartera import parametros_cartera
+    from .paralelo import leer_archivo_cartera
+
+    if isinstance(prestamos, (str, os.PathLike)):
+        prestamos = leer_archivo_cartera(prestamos)
+    if isinstance(mes_desembolso, str):
+        mes_desembolso = np.asarray(prestamos[mes_desembolso])
+    n_prestamos = np.size(prestamos["monto"])
+    desfase = np.broadcast_to(
+        np.asarray(mes_desembolso, dtype=np.int64), (n_prestamos,))
+    plazo_meses = np.broadcast_to(np.asarray(prestamos["plazo_meses"],
+                                             dtype=float), (n_prestamos,))
+
+    # Each loan runs through at most its term in months
+    pares = np.cumsum(np.maximum(np.ceil(plazo_meses), 1).astype(np.int64))
+    if meses is None:
+        ultimo = np.ceil(plazo_meses) + desfase
+        meses = int(ultimo.max()) if n_prestamos else 0
+    meses = max(int(meses), 0)
+    por_lote = max(1, memoria_lote // (8 * _TEMPORALES))
+
+    totales = np.zeros((len(COLUMNAS_FLUJO) - 1, meses))
+    with medir("flujos", filas=n_prestamos):
+        inicio = 0
+        while inicio < n_prestamos:
+            antes = pares[inicio - 1] if inicio else 0
+            fin = max(int(np.searchsorted(pares, antes + por_lote,
+                                          side="right")), inicio + 1)
+            # Only the loans of the chunk are read into arrays
+            p = parametros_cartera(_rebanada(prestamos, inicio, fin))
+            totales += _flujos_lote(p, plazo_meses[inicio:fin],
+                                    desfase[inicio:fin], meses)
+            inicio = fin
+
+    flujos = pd.DataFrame(dict(zip(COLUMNAS_FLUJO[1:], totales)))
+    flujos["Pagos"] = flujos["Pagos"].astype(np.int64)
+    flujos.insert(0, "Mes", np.arange(1, meses + 1))
+    return flujos
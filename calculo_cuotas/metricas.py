@@ -0,0 +1,236 @@
+"""
+Per-stage latency instrumentation.
+
+The engine, the formatting and the exports time themselves with medir():
+every measurement feeds a per-stage histogram in REGISTRO_METRICAS, is
+logged as one JSON record on the 'calculo_cuotas.metricas' logger (at
+INFO, so it costs nothing until a handler is configured) and is kept in a
+short history from which the app builds its debug panel.
+
+The histograms are exported in the Prometheus text format, either to a
+file (escribir_metricas, e.g. for a node_exporter textfile collector) or
+from a local HTTP endpoint (servir_metricas).
+"""
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_LOG = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                    0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_PREFIJO = "calculo_cuotas_etapa"
+
+
+class Medicion:
+    """
+    One timed stage.
+
+    The code being timed may fill in filas (rows processed) and bytes
+    (size of the output) before the block ends.
+    """
+    __slots__ = ("etapa", "segundos", "filas", "bytes", "hilo", "secuencia")
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+        self.segundos = None
+        self.filas = None
+        self.bytes = None
+        self.hilo = threading.get_ident()
+        self.secuencia = None
+
+    def como_dict(self):
+        """Fields of the measurement as a plain dict."""
+        return {"etapa": self.etapa, "segundos": self.segundos,
+                "filas": self.filas, "bytes": self.bytes}
+
+
+class RegistroMetricas:
+    """
+    Thread-safe per-stage histograms, counters and recent history.
+
+    Args:
+        limites: Upper bounds of the latency buckets, in seconds
+        historial: Number of recent measurements kept for inspection
+    """
+
+    def __init__(self, limites=LIMITES_SEGUNDOS, historial=1000):
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        self._etapas = {}  # etapa -> [buckets, suma, cuenta, filas, bytes]
+        self._recientes = deque(maxlen=historial)
+        self._secuencia = itertools.count(1)
+        self._ultima = 0
+
+    def registrar(self, medicion):
+        """Add a finished measurement to the histograms and history."""
+        with self._lock:
+            datos = self._etapas.get(medicion.etapa)
+            if datos is None:
+                datos = [[0] * len(self.limites), 0.0, 0, 0, 0]
+                self._etapas[medicion.etapa] = datos
+            for i, limite in enumerate(self.limites):
+                if medicion.segundos <= limite:
+                    datos[0][i] += 1
+                    break
+            datos[1] += medicion.segundos
+            datos[2] += 1
+            datos[3] += medicion.filas or 0
+            datos[4] += medicion.bytes or 0
+            medicion.secuencia = self._ultima = next(self._secuencia)
+            self._recientes.append(medicion)
+
+    def marca(self):
+        """Sequence number of the latest measurement, for recientes()."""
+        with self._lock:
+            return self._ultima
+
+    def recientes(self, desde=0, hilo=None):
+        """
+        Measurements recorded after marca() returned desde.
+
+        Args:
+            desde: Value returned by marca()
+            hilo: Only keep those of this thread (defaults to the caller's)
+
+        Returns:
+            List of Medicion, oldest first
+        """
+        hilo = threading.get_ident() if hilo is None else hilo
+        with self._lock:
+            return [m for m in self._recientes
+                    if m.secuencia > desde and m.hilo == hilo]
+
+    def texto_prometheus(self):
+        """All histograms and counters in the Prometheus text format."""
+        with self._lock:
+            etapas = {etapa: (list(d[0]), *d[1:])
+                      for etapa, d in self._etapas.items()}
+
+        lineas = [
+            f"# HELP {_PREFIJO}_segundos Duration of each calculation or "
+            "export stage.",
+            f"# TYPE {_PREFIJO}_segundos histogram"
+        ]
+        for etapa, (buckets, suma, cuenta, _, _) in sorted(etapas.items()):
+            acumulado = 0
+            for limite, n in zip(self.limites, buckets):
+                acumulado += n
+                lineas.append(f'{_PREFIJO}_segundos_bucket{{etapa="{etapa}",'
+                              f'le="{limite:g}"}} {acumulado}')
+            lineas.append(f'{_PREFIJO}_segundos_bucket{{etapa="{etapa}",'
+                          f'le="+Inf"}} {cuenta}')
+            lineas.append(f'{_PREFIJO}_segundos_sum{{etapa="{etapa}"}} '
+                          f'{suma:.9g}')
+            lineas.append(f'{_PREFIJO}_segundos_count{{etapa="{etapa}"}} '
+                          f'{cuenta}')
+        for i, (nombre, ayuda) in enumerate(
+            (("filas", "Rows processed by each stage."),
+             ("bytes", "Bytes produced by each stage.")), start=3):
+            lineas.append(f"# HELP {_PREFIJO}_{nombre}_total {ayuda}")
+            lineas.append(f"# TYPE {_PREFIJO}_{nombre}_total counter")
+            for etapa, datos in sorted(etapas.items()):
+                lineas.append(f'{_PREFIJO}_{nombre}_total{{etapa="{etapa}"}} '
+                              f'{datos[i]}')
+        return "\n".join(lineas) + "\n"
+
+    def limpiar(self):
+        """Drop every histogram and the history."""
+        with self._lock:
+            self._etapas.clear()
+            self._recientes.clear()
+
+
+# Shared by every session of the Streamlit server
+REGISTRO_METRICAS = RegistroMetricas()
+
+
+@contextmanager
+def medir(etapa, filas=None, registro=None):
+    """
+    Time the enclosed block as one run of a stage.
+
+    Args:
+        etapa: Stage name ('calculo', 'formato', 'excel', ...)
+        filas: Rows processed, if already known
+        registro: RegistroMetricas to use (defaults to REGISTRO_METRICAS)
+
+    Yields:
+        The Medicion, whose filas and bytes may be set inside the block
+    """
+    medicion = Medicion(etapa)
+    medicion.filas = filas
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    finally:
+        medicion.segundos = time.perf_counter() - inicio
+        (REGISTRO_METRICAS if registro is None else registro).registrar(
+            medicion)
+        if _LOG.isEnabledFor(logging.INFO):
+            _LOG.info(json.dumps(medicion.como_dict(), ensure_ascii=False))
+
+
+def escribir_metricas(ruta, registro=None):
+    """
+    Write the metrics to a file in the Prometheus text format.
+
+    The file is replaced atomically, so a collector never reads it half
+    written.
+    """
+    registro = REGISTRO_METRICAS if registro is None else registro
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.write(registro.texto_prometheus())
+    os.replace(temporal, ruta)
+
+
+_SERVIDORES = {}
+_SERVIDORES_LOCK = threading.Lock()
+
+
+def servir_metricas(puerto=9464, direccion="127.0.0.1", registro=None):
+    """
+    Serve the metrics at http://direccion:puerto/metrics from a thread.
+
+    Calling it again with the same address returns the running server, so
+    it is safe to call on every Streamlit rerun.
+
+    Returns:
+        The http.server.ThreadingHTTPServer
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registro = REGISTRO_METRICAS if registro is None else registro
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            cuerpo = registro.texto_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type",
+                             "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    with _SERVIDORES_LOCK:
+        servidor = _SERVIDORES.get((direccion, puerto))
+        if servidor is None:
+            servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+            threading.Thread(target=servidor.serve_forever,
+                             name="metricas", daemon=True).start()
+            _SERVIDORES[(direccion, puerto)] = servidor
+    return servidor
@@ -0,0 +1,413 @@
+"""
+Vectorized amortization engine.
+
+Every column of the schedule is computed as a whole NumPy array: the
+balance of a 'Nivelada' loan comes from the closed-form annuity balance and
+the balance of a 'Saldos Insolutos' loan from its fixed principal payment,
+so no Python loop runs per payment.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from .metricas import medir
+from .seguros import (calcular_seguro_danos, calcular_seguro_vehiculo,
+                      seguro_por_pago)
+
+# Dictionary mapping payment frequencies to payments per year
+FREQ_DICT = {
+    'Diario': 360,
+    'Semanal': 52,
+    'Quincenal': 24,
+    'Mensual': 12,
+    'Bimensual': 6,
+    'Trimestral': 4,
+    'Cuatrimestral': 3,
+    'Semestral': 2,
+    'Anual': 1,
+    'Al vencimiento': 0
+}
+
+# Columns of the amortization schedule, in display order
+COLUMNAS = [
+    "Pago", "Cuota", "Interés", "Abono", "Seguro de Préstamo", "Seguro Daños",
+    "Seguro Vehículo", "Saldo"
+]
+
+
+def cuota_nivelada(monto, tasa_periodo, n_pagos):
+    """
+    Level payment (PMT formula) for a loan.
+
+    Args:
+        monto: Loan amount
+        tasa_periodo: Interest rate per period (fraction)
+        n_pagos: Number of payments
+
+    Returns:
+        Payment amount before insurance
+    """
+    factor = (1 + tasa_periodo)**n_pagos
+    return monto * (tasa_periodo * factor) / (factor - 1)
+
+
+def saldo_nivelada(monto, tasa_periodo, n_pagos, k):
+    """
+    Balance of a level payment loan after k payments, in closed form.
+
+    Works element-wise when any argument is a NumPy array.
+
+    Args:
+        monto: Loan amount
+        tasa_periodo: Interest rate per period (fraction)
+        n_pagos: Number of payments
+        k: Number of payments already made
+
+    Returns:
+        Outstanding balance (not clamped at zero)
+    """
+    factor_n = (1 + tasa_periodo)**n_pagos
+    factor_k = np.power(1 + tasa_periodo, k)
+    return monto * (factor_n - factor_k) / (factor_n - 1)
+
+
+class CapaBase(
+        namedtuple("CapaBase", [
+            "pago", "cuota", "interes", "abono", "saldo", "con_seguro",
+            "saldo_referencia", "frecuencia", "pagos_por_año", "plazo_meses",
+            "monto", "tipo_cuota", "tasa_periodo"
+        ])):
+    """
+    Base layer of a schedule: everything but the insurance.
+
+    It only depends on monto, tasa, plazo, frecuencia and tipo_cuota, so it
+    can be cached and reused while only insurance inputs change. cuota is
+    the payment without insurance, con_seguro marks the payments that
+    carry insurance and saldo_referencia is the balance the loan
+    insurance is priced on. The amounts are float64 Lempiras, or int64
+    centavos after base_en_centavos.
+    """
+    __slots__ = ()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays of the layer."""
+        return sum(v.nbytes for v in self[:6])
+
+
+def calcular_base(monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota):
+    """
+    Interest, principal and balance columns of a schedule.
+
+    Args:
+        monto: Loan amount
+        tasa_anual: Annual interest rate (percentage)
+        plazo_meses: Loan term in months
+        frecuencia: Payment frequency
+        tipo_cuota: Payment type (Nivelada or Saldos Insolutos)
+
+    Returns:
+        CapaBase
+    """
+    pagos_por_año = FREQ_DICT[frecuencia]
+
+    # Handle "At maturity" payment
+    if pagos_por_año == 0:
+        tasa_total = tasa_anual / 100 * (plazo_meses / 12)
+        interes = monto * tasa_total
+        return CapaBase(
+            pago=np.array([1]), cuota=np.array([interes + monto], dtype=float),
+            interes=np.array([interes], dtype=float),
+            abono=np.array([monto], dtype=float), saldo=np.zeros(1),
+            con_seguro=np.ones(1, dtype=bool), saldo_referencia=0.0,
+            frecuencia=frecuencia, pagos_por_año=0, plazo_meses=plazo_meses,
+            monto=monto, tipo_cuota=tipo_cuota, tasa_periodo=tasa_total)
+
+    # Calculate number of payments and interest rate per period
+    n_pagos = int(plazo_meses * pagos_por_año / 12)
+    tasa_periodo = tasa_anual / 100 / pagos_por_año
+    pago = np.arange(1, n_pagos + 1)
+
+    # The loan insurance is priced on the balance left after the first
+    # year of payments (or after the whole term if it is shorter)
+    ref_cuota = min(pagos_por_año, n_pagos)
+
+    if tipo_cuota == 'Nivelada':
+        cuota_base = cuota_nivelada(monto, tasa_periodo, n_pagos)
+        saldo_referencia = saldo_nivelada(monto, tasa_periodo, n_pagos,
+                                          ref_cuota)
+        saldo = saldo_nivelada(monto, tasa_periodo, n_pagos, pago)
+    else:
+        abono_fijo = monto / n_pagos
+        saldo_referencia = monto - ref_cuota * abono_fijo
+        saldo = monto - pago * abono_fijo
+    np.maximum(saldo, 0, out=saldo)  # Prevent negative balance
+
+    # Interest accrues on the balance left by the previous payment
+    saldo_anterior = np.empty(n_pagos)
+    saldo_anterior[:1] = monto
+    saldo_anterior[1:] = saldo[:-1]
+    interes = saldo_anterior * tasa_periodo
+
+    if tipo_cuota == 'Nivelada':
+        abono = cuota_base - interes
+        cuota_base = np.full(n_pagos, cuota_base)
+    else:
+        abono = np.full(n_pagos, abono_fijo)
+        cuota_base = abono + interes
+
+    # Insurance is charged on every payment except those of the last year
+    con_seguro = pago <= max(0, n_pagos - pagos_por_año)
+    return CapaBase(pago=pago, cuota=cuota_base, interes=interes, abono=abono,
+                    saldo=saldo, con_seguro=con_seguro,
+                    saldo_referencia=saldo_referencia, frecuencia=frecuencia,
+                    pagos_por_año=pagos_por_año, plazo_meses=plazo_meses,
+                    monto=monto, tipo_cuota=tipo_cuota,
+                    tasa_periodo=tasa_periodo)
+
+
+def capa_seguro_prestamo(base, incluir_seguro, porcentaje_seguro):
+    """'Seguro de Préstamo' column for a CapaBase."""
+    seguro_unitario = 0
+    if incluir_seguro == 'Sí' and base.pagos_por_año != 0:
+        seguro_unitario = (base.saldo_referencia / 1000) * \
+            porcentaje_seguro * 12 / base.pagos_por_año
+    return np.where(base.con_seguro, seguro_unitario, 0.0)
+
+
+def _capa_mensual(base, incluido, pago_mensual):
+    """Column of a monthly insurance charge spread over the payments."""
+    if base.pagos_por_año == 0:
+        # Paid in full at maturity
+        total = pago_mensual * base.plazo_meses if incluido else 0
+        return np.array([total], dtype=float)
+    por_pago = 0
+    if incluido:
+        por_pago = seguro_por_pago(pago_mensual, base.frecuencia,
+                                   base.pagos_por_año)
+    return np.where(base.con_seguro, por_pago, 0.0)
+
+
+def capa_seguro_danos(base, incluir_seguro_danos, monto_asegurar,
+                      porcentaje_seguro_danos, impuesto_danos, bomberos_danos,
+                      papeleria_danos):
+    """'Seguro Daños' column for a CapaBase."""
+    incluido = incluir_seguro_danos == 'Sí'
+    pago_mensual = calcular_seguro_danos(
+        monto_asegurar if incluido else 0,
+        porcentaje_seguro_danos if incluido else 0,
+        impuesto_danos if incluido else 0,
+        bomberos_danos if incluido else 0,
+        papeleria_danos if incluido else 0)
+    return _capa_mensual(base, incluido, pago_mensual)
+
+
+def capa_seguro_vehiculo(base, incluir_seguro_vehiculo, monto_vehiculo,
+                         porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                         gasto_vehiculo):
+    """'Seguro Vehículo' column for a CapaBase."""
+    incluido = incluir_seguro_vehiculo == 'Sí'
+    pago_mensual = calcular_seguro_vehiculo(
+        monto_vehiculo if incluido else 0,
+        porcentaje_seguro_vehiculo if incluido else 0,
+        impuesto_vehiculo if incluido else 0,
+        gasto_vehiculo if incluido else 0)
+    return _capa_mensual(base, incluido, pago_mensual)
+
+
+def combinar_capas(base, seguro, seguro_danos, seguro_vehiculo):
+    """
+    Schedule columns from a base layer and its three insurance columns.
+
+    Only 'Cuota' is computed; the other columns are the layer arrays. The
+    layers must all be in Lempiras or all in centavos.
+
+    Returns:
+        Dict mapping each name in COLUMNAS to a 1-D array
+    """
+    return {
+        "Pago": base.pago,
+        "Cuota": base.cuota + seguro + seguro_danos + seguro_vehiculo,
+        "Interés": base.interes,
+        "Abono": base.abono,
+        "Seguro de Préstamo": seguro,
+        "Seguro Daños": seguro_danos,
+        "Seguro Vehículo": seguro_vehiculo,
+        "Saldo": base.saldo
+    }
+
+
+def calcular_cuotas_arrays(monto, tasa_anual, plazo_meses, frecuencia,
+                           tipo_cuota, incluir_seguro, porcentaje_seguro,
+                           incluir_seguro_danos, monto_asegurar,
+                           porcentaje_seguro_danos, impuesto_danos,
+                           bomberos_danos, papeleria_danos,
+                           incluir_seguro_vehiculo, monto_vehiculo,
+                           porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                           gasto_vehiculo):
+    """
+    Calculate the amortization schedule as one NumPy array per column.
+
+    Takes the same arguments as calcular_cuotas_df; it is the base layer
+    plus the three insurance layers.
+
+    Returns:
+        Dict mapping each name in COLUMNAS to a 1-D array
+    """
+    base = calcular_base(monto, tasa_anual, plazo_meses, frecuencia,
+                         tipo_cuota)
+    return combinar_capas(
+        base, capa_seguro_prestamo(base, incluir_seguro, porcentaje_seguro),
+        capa_seguro_danos(base, incluir_seguro_danos, monto_asegurar,
+                          porcentaje_seguro_danos, impuesto_danos,
+                          bomberos_danos, papeleria_danos),
+        capa_seguro_vehiculo(base, incluir_seguro_vehiculo, monto_vehiculo,
+                             porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                             gasto_vehiculo))
+
+
+def a_centavos(valores):
+    """
+    Convert amounts in Lempiras to int64 centavos, rounding half up.
+
+    The product is first rounded to 6 decimals so binary noise (1.005 is
+    stored as 1.00499...) does not flip a half centavo downwards. Scalars
+    give a Python int.
+    """
+    if np.ndim(valores) == 0:
+        centavos = round(float(valores) * 100, 6)
+        return int(math.copysign(math.floor(abs(centavos) + 0.5), centavos))
+    centavos = np.round(np.asarray(valores, dtype=float) * 100, 6)
+    redondeo = np.floor(np.abs(centavos) + 0.5)
+    return np.copysign(redondeo, centavos).astype(np.int64)
+
+
+def calcular_cuotas_centavos(monto, tasa_anual, plazo_meses, frecuencia,
+                             tipo_cuota, incluir_seguro, porcentaje_seguro,
+                             incluir_seguro_danos, monto_asegurar,
+                             porcentaje_seguro_danos, impuesto_danos,
+                             bomberos_danos, papeleria_danos,
+                             incluir_seguro_vehiculo, monto_vehiculo,
+                             porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                             gasto_vehiculo):
+    """
+    Amortization schedule in exact int64 centavos.
+
+    Takes the same arguments as calcular_cuotas_df. Every amount is rounded
+    half up to the centavo with one policy per column, applied to whole
+    arrays:
+
+    - Saldo: the closed-form balance, rounded; the last one is exactly 0.
+    - Abono: the drop between consecutive rounded balances, so the abonos
+      add up to the rounded monto and the last payment absorbs the
+      residual.
+    - Interés: 'Nivelada' keeps the rounded level cuota on every payment
+      but the last, so its interest is that cuota minus the abono (never
+      below zero); otherwise (and on the last payment) the interest is
+      rounded.
+    - Insurance: the per-payment premium, rounded once.
+    - Cuota: the sum of the rounded components.
+
+    Returns:
+        Dict mapping each name in COLUMNAS to a 1-D array; 'Pago' holds
+        payment numbers and every other column int64 centavos
+    """
+    base = base_en_centavos(calcular_base(monto, tasa_anual, plazo_meses,
+                                          frecuencia, tipo_cuota))
+    return combinar_capas(
+        base,
+        seguro_en_centavos(
+            capa_seguro_prestamo(base, incluir_seguro, porcentaje_seguro)),
+        seguro_en_centavos(capa_seguro_danos(
+            base, incluir_seguro_danos, monto_asegurar,
+            porcentaje_seguro_danos, impuesto_danos, bomberos_danos,
+            papeleria_danos)),
+        seguro_en_centavos(capa_seguro_vehiculo(
+            base, incluir_seguro_vehiculo, monto_vehiculo,
+            porcentaje_seguro_vehiculo, impuesto_vehiculo, gasto_vehiculo)))
+
+
+def base_en_centavos(base):
+    """
+    The base layer in int64 centavos.
+
+    Applies the rounding policies described in calcular_cuotas_centavos.
+
+    Args:
+        base: CapaBase in Lempiras
+
+    Returns:
+        CapaBase whose amount arrays are int64 centavos
+    """
+    saldo = a_centavos(base.saldo)
+    saldo[-1] = 0
+    saldo_anterior = np.empty_like(saldo)
+    saldo_anterior[:1] = a_centavos(base.monto)
+    saldo_anterior[1:] = saldo[:-1]
+    abono = saldo_anterior - saldo
+
+    if base.tipo_cuota == 'Nivelada' and base.pagos_por_año != 0:
+        cuota_base = a_centavos(base.interes[0] + base.abono[0])
+        # Sub-centavo interest near the end may not go negative
+        interes = np.maximum(cuota_base - abono, 0)
+        interes[-1] = a_centavos(base.interes[-1])
+    else:
+        interes = a_centavos(base.interes)
+    return base._replace(cuota=abono + interes, interes=interes, abono=abono,
+                         saldo=saldo)
+
+
+def seguro_en_centavos(columna):
+    """
+    An insurance column in int64 centavos.
+
+    Each premium is one amount charged on a prefix of the payments, so it
+    is rounded once instead of row by row.
+    """
+    return np.where(columna != 0, a_centavos(columna[0]), 0)
+
+
+def calcular_cuotas_df(monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
+                       incluir_seguro, porcentaje_seguro, incluir_seguro_danos,
+                       monto_asegurar, porcentaje_seguro_danos, impuesto_danos,
+                       bomberos_danos, papeleria_danos,
+                       incluir_seguro_vehiculo, monto_vehiculo,
+                       porcentaje_seguro_vehiculo, impuesto_vehiculo,
+                       gasto_vehiculo, exacto=False):
+    """
+    Calculate loan amortization schedule with different payment frequencies and types.
+
+    Args:
+        monto: Loan amount
+        tasa_anual: Annual interest rate (percentage)
+        plazo_meses: Loan term in months
+        frecuencia: Payment frequency
+        tipo_cuota: Payment type (Nivelada or Saldos Insolutos)
+        incluir_seguro: Whether to include insurance
+        porcentaje_seguro: Insurance percentage per 1000
+        exacto: Round every amount to centavos with the policy of
+            calcular_cuotas_centavos, so the columns reconcile exactly
+
+    Returns:
+        DataFrame with amortization schedule
+    """
+    import pandas as pd
+
+    argumentos = (monto, tasa_anual, plazo_meses, frecuencia, tipo_cuota,
+                  incluir_seguro, porcentaje_seguro, incluir_seguro_danos,
+                  monto_asegurar, porcentaje_seguro_danos, impuesto_danos,
+                  bomberos_danos, papeleria_danos, incluir_seguro_vehiculo,
+                  monto_vehiculo, porcentaje_seguro_vehiculo,
+                  impuesto_vehiculo, gasto_vehiculo)
+    with medir("calculo") as medicion:
+        if not exacto:
+            df = pd.DataFrame(calcular_cuotas_arrays(*argumentos))
+        else:
+            # Centavos are only turned back into Lempiras at the edge
+            columnas = calcular_cuotas_centavos(*argumentos)
+            for nombre in COLUMNAS[1:]:
+                columnas[nombre] = columnas[nombre] / 100
+            df = pd.DataFrame(columnas)
+        medicion.filas = len(df)
+    return df
@@ -0,0 +1,156 @@
+"""
+Inverse solvers: what loan fits a target cuota.
+
+Given a target first cuota (insurance included) they find the largest
+monto, the shortest plazo or the implied annual rate, for whole arrays of
+clients at once. Every candidate is priced with parametros_cartera and
+totales_cartera, so the answers follow the same rules as
+calcular_cuotas_df, the three insurance components included.
+"""
+import numpy as np
+import pandas as pd
+
+from .cartera import parametros_cartera, totales_cartera
+
+
+def _columnas(prestamos, cuota_objetivo):
+    """Loan columns as a dict plus the target broadcast to every loan."""
+    if isinstance(prestamos, pd.DataFrame):
+        columnas = {nombre: prestamos[nombre].to_numpy()
+                    for nombre in prestamos.columns}
+    else:
+        columnas = {nombre: np.asarray(valores)
+                    for nombre, valores in prestamos.items()}
+    forma = np.broadcast_shapes(np.shape(cuota_objetivo),
+                                *(np.shape(v) for v in columnas.values()))
+    columnas = {nombre: np.broadcast_to(valores, forma).reshape(-1)
+                for nombre, valores in columnas.items()}
+    objetivo = np.broadcast_to(np.asarray(cuota_objetivo, dtype=float), forma)
+    return columnas, objetivo.reshape(-1)
+
+
+def _primera_cuota(columnas, **cambios):
+    """First cuota, insurance included, with some columns replaced."""
+    prestamos = {**columnas, **cambios}
+    return totales_cartera(parametros_cartera(prestamos))["Primera Cuota"]
+
+
+def monto_maximo(prestamos, cuota_objetivo):
+    """
+    Largest loan amount whose first cuota does not exceed the target.
+
+    The first cuota is linear in the amount (the damage and vehicle
+    premiums do not depend on it), so two evaluations give the exact
+    answer.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); the 'monto' column is ignored
+        cuota_objetivo: Target first cuota, scalar or one per loan
+
+    Returns:
+        Array of amounts, NaN where the insurance alone exceeds the target
+        or the term holds no whole payment
+    """
+    columnas, objetivo = _columnas(prestamos, cuota_objetivo)
+    fija = _primera_cuota(columnas, monto=np.zeros_like(objetivo))
+    por_lempira = _primera_cuota(columnas, monto=np.ones_like(objetivo)) - fija
+    with np.errstate(divide='ignore', invalid='ignore'):
+        monto = (objetivo - fija) / por_lempira
+    return np.where(monto >= 0, monto, np.nan)
+
+
+def plazo_minimo(prestamos, cuota_objetivo, plazo_maximo=360):
+    """
+    Shortest term in whole months whose first cuota fits the target.
+
+    The first cuota falls as the term grows, except for one jump: insurance
+    is not charged during the last year, so terms of a year or less carry
+    none and the first insured term costs more than the one before it.
+    Both sides of that jump are searched by bisection, for all loans at
+    once. 'Al vencimiento' loans work the other way (the single payment
+    grows with the term), so their answer is one month whenever that fits.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); the 'plazo_meses' column is ignored
+        cuota_objetivo: Target first cuota, scalar or one per loan
+        plazo_maximo: Longest term considered, in months
+
+    Returns:
+        Float array of terms in months, NaN where no term up to
+        plazo_maximo fits
+    """
+    columnas, objetivo = _columnas(prestamos, cuota_objetivo)
+    un_mes = np.ones(objetivo.shape, dtype=np.int64)
+    p = parametros_cartera({**columnas, "plazo_meses": un_mes})
+    al_vencimiento = p["al_vencimiento"]
+
+    # First term with more payments than a year holds, i.e. with insurance
+    with np.errstate(divide='ignore'):
+        corte = np.ceil(12 * (p["pagos_por_año"] + 1) / p["pagos_por_año"])
+    corte = np.minimum(np.where(al_vencimiento, 1, corte),
+                       plazo_maximo + 1).astype(np.int64)
+
+    # Prefer the uninsured terms below the jump when the longest one fits
+    sin_seguro = corte - 1
+    cabe_sin_seguro = (sin_seguro >= 1) & (
+        _primera_cuota(columnas, plazo_meses=np.maximum(sin_seguro, 1))
+        <= objetivo)
+    cabe_con_seguro = _primera_cuota(
+        columnas, plazo_meses=np.full(objetivo.shape, plazo_maximo)) <= objetivo
+    factible = cabe_sin_seguro | ((corte <= plazo_maximo) & cabe_con_seguro)
+
+    # Invariant: bajo never fits, alto fits (when factible)
+    bajo = np.where(cabe_sin_seguro, 0, sin_seguro)
+    alto = np.where(cabe_sin_seguro, sin_seguro, plazo_maximo)
+    while True:
+        pendiente = factible & (alto - bajo > 1)
+        if not pendiente.any():
+            break
+        medio = np.where(pendiente, (bajo + alto) // 2, alto)
+        cabe = _primera_cuota(columnas, plazo_meses=medio) <= objetivo
+        alto = np.where(pendiente & cabe, medio, alto)
+        bajo = np.where(pendiente & ~cabe, medio, bajo)
+
+    # A single payment at maturity only grows with the term
+    if al_vencimiento.any():
+        cabe = _primera_cuota(columnas, plazo_meses=un_mes) <= objetivo
+        alto = np.where(al_vencimiento, un_mes, alto)
+        factible = np.where(al_vencimiento, cabe, factible)
+    return np.where(factible, alto, np.nan)
+
+
+def tasa_implicita(prestamos, cuota_objetivo, tasa_maxima=1000.0,
+                   tolerancia=1e-10):
+    """
+    Annual rate (%) at which the first cuota equals the target.
+
+    Bisection over [tolerancia, tasa_maxima] for all loans at once; the
+    first cuota grows with the rate for every payment type. The search
+    starts just above zero because level payments have no formula at a
+    zero rate (calcular_cuotas_df raises there).
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); the 'tasa_anual' column is ignored
+        cuota_objetivo: Target first cuota, scalar or one per loan
+        tasa_maxima: Upper end of the search, in annual %
+        tolerancia: Width of the final bracket, in annual %
+
+    Returns:
+        Array of annual rates in %, NaN where the target is below the
+        cuota at a rate of tolerancia or above the cuota at tasa_maxima
+    """
+    columnas, objetivo = _columnas(prestamos, cuota_objetivo)
+    bajo = np.full(objetivo.shape, float(tolerancia))
+    alto = np.full(objetivo.shape, float(tasa_maxima))
+    factible = ((_primera_cuota(columnas, tasa_anual=bajo) <= objetivo) &
+                (_primera_cuota(columnas, tasa_anual=alto) >= objetivo))
+
+    for _ in range(int(np.ceil(np.log2(tasa_maxima / tolerancia)))):
+        medio = (bajo + alto) / 2
+        excede = _primera_cuota(columnas, tasa_anual=medio) > objetivo
+        alto = np.where(excede, medio, alto)
+        bajo = np.where(excede, bajo, medio)
+    return np.where(factible, (bajo + alto) / 2, np.nan)
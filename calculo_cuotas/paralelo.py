@@ -0,0 +1,143 @@
+"""
+Multi-core generation of full amortization schedules for a portfolio.
+
+The portfolio is split into chunks of loans that are priced in a
+ProcessPoolExecutor. Workers send back one compact LoteCronogramas per
+chunk (a float64 matrix with every row of every schedule plus the row
+offsets of each loan) instead of pickled DataFrames, and chunks are yielded
+in portfolio order whatever the number of workers. Workers only import the
+array engine, not pandas, so they start fast.
+"""
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .motor import COLUMNAS, calcular_cuotas_arrays
+
+class LoteCronogramas(
+        namedtuple("LoteCronogramas",
+                   ["inicio", "desplazamientos", "pago", "valores"])):
+    """
+    Schedules of a chunk of consecutive loans.
+
+    The rows of loan j (counting from the start of the chunk) are
+    pago[desplazamientos[j]:desplazamientos[j + 1]] and the same slice of
+    valores, whose columns are COLUMNAS[1:]. Loans whose term holds no
+    whole payment have no rows.
+    """
+    __slots__ = ()
+
+    @property
+    def n_prestamos(self):
+        """Number of loans in the chunk."""
+        return len(self.desplazamientos) - 1
+
+    def cronograma(self, j):
+        """DataFrame with the schedule of loan j of the chunk."""
+        import pandas as pd
+
+        desde, hasta = self.desplazamientos[j], self.desplazamientos[j + 1]
+        columnas = {"Pago": self.pago[desde:hasta]}
+        for k, nombre in enumerate(COLUMNAS[1:]):
+            columnas[nombre] = self.valores[desde:hasta, k]
+        return pd.DataFrame(columnas)
+
+
+def leer_archivo_cartera(ruta):
+    """
+    Load a portfolio file (CSV, Excel or Parquet) into a DataFrame.
+
+    Args:
+        ruta: Path to the file; the columns follow COLUMNAS_PRESTAMO
+
+    Returns:
+        DataFrame of loan parameters
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(str(ruta))[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        return pd.read_excel(ruta)
+    if extension == '.parquet':
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+
+def _procesar_lote(inicio, columnas):
+    """
+    Worker: build the schedules of one chunk as a LoteCronogramas.
+
+    columnas holds the loan parameter arrays in calcular_cuotas_df
+    argument order.
+    """
+    n_prestamos = len(columnas[0])
+    filas = [valores.tolist() for valores in columnas]
+
+    pagos, valores = [], []
+    desplazamientos = np.zeros(n_prestamos + 1, dtype=np.int64)
+    for j, argumentos in enumerate(zip(*filas)):
+        try:
+            cronograma = calcular_cuotas_arrays(*argumentos)
+        except ZeroDivisionError:
+            # Term too short for a single payment
+            desplazamientos[j + 1] = desplazamientos[j]
+            continue
+        pagos.append(cronograma["Pago"])
+        valores.append(np.column_stack([cronograma[c] for c in COLUMNAS[1:]]))
+        desplazamientos[j + 1] = desplazamientos[j] + len(cronograma["Pago"])
+
+    if pagos:
+        pago = np.concatenate(pagos).astype(np.int32)
+        matriz = np.concatenate(valores)
+    else:
+        pago = np.zeros(0, dtype=np.int32)
+        matriz = np.zeros((0, len(COLUMNAS) - 1))
+    return LoteCronogramas(inicio, desplazamientos, pago, matriz)
+
+
+def _lotes(prestamos, tamano_lote):
+    """Split the portfolio into (inicio, columns) chunks for the workers."""
+    from .cartera import leer_cartera, normalizar_banderas
+
+    # Workers get 'Sí'/'No' flags, which is what calcular_cuotas_arrays reads
+    columnas = normalizar_banderas(leer_cartera(prestamos))
+    n_prestamos = len(columnas["monto"])
+    for inicio in range(0, n_prestamos, tamano_lote):
+        yield inicio, [
+            np.ascontiguousarray(valores[inicio:inicio + tamano_lote])
+            for valores in columnas.values()
+        ]
+
+
+def generar_cronogramas(prestamos, max_workers=None, tamano_lote=500):
+    """
+    Generate the full schedule of every loan across worker processes.
+
+    At most two chunks per worker are in flight at any time, so memory
+    stays bounded however large the portfolio is.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO), or the path of a portfolio file
+        max_workers: Number of worker processes (defaults to the CPU count)
+        tamano_lote: Number of loans per chunk
+
+    Yields:
+        LoteCronogramas, in portfolio order
+    """
+    if tamano_lote < 1:
+        raise ValueError("tamano_lote must be at least 1")
+    if isinstance(prestamos, (str, os.PathLike)):
+        prestamos = leer_archivo_cartera(prestamos)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pendientes = deque()
+        for inicio, lote in _lotes(prestamos, tamano_lote):
+            if len(pendientes) >= 2 * max_workers:
+                yield pendientes.popleft().result()
+            pendientes.append(executor.submit(_procesar_lote, inicio, lote))
+        while pendientes:
+            yield pendientes.popleft().result()
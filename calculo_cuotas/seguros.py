@@ -0,0 +1,106 @@
+"""
+Insurance charges added on top of the loan payment.
+"""
+
+# Divisor that turns a monthly insurance charge into a charge per payment
+DIVISOR_MENSUAL = {
+    'Mensual': 1,
+    'Quincenal': 2,
+    'Semanal': 4.33,
+    'Diario': 30
+}
+
+
+def prima_mensual_danos(monto_asegurar, porcentaje_seguro_danos,
+                        impuesto_danos, bomberos_danos, papeleria_danos):
+    """
+    Monthly damage insurance premium, without the zero-amount check.
+
+    Works element-wise when the arguments are NumPy arrays.
+    """
+    # Fórmula: cantidad_asegurar / 1000 * porcentaje
+    seguro_base = (monto_asegurar / 1000) * porcentaje_seguro_danos
+    impuesto = seguro_base * (impuesto_danos / 100)
+    bomberos = seguro_base * (bomberos_danos / 100)
+
+    total_anual = seguro_base + impuesto + bomberos + papeleria_danos
+    return total_anual / 12
+
+
+def prima_mensual_vehiculo(monto_vehiculo, porcentaje_seguro_vehiculo,
+                           impuesto_vehiculo, gasto_vehiculo):
+    """
+    Monthly vehicle insurance premium, without the zero-amount check.
+
+    Works element-wise when the arguments are NumPy arrays.
+    """
+    # Fórmula: valor_vehiculo * porcentaje / 100
+    seguro_base = monto_vehiculo * (porcentaje_seguro_vehiculo / 100)
+    impuesto = seguro_base * (impuesto_vehiculo / 100)
+
+    total_anual = seguro_base + impuesto + gasto_vehiculo
+    return total_anual / 12
+
+
+def calcular_seguro_danos(monto_asegurar, porcentaje_seguro_danos,
+                          impuesto_danos, bomberos_danos, papeleria_danos):
+    """
+    Calculate damage insurance based on the correct formula.
+
+    Args:
+        monto_asegurar: Amount to insure
+        porcentaje_seguro_danos: Insurance percentage
+        impuesto_danos: Tax percentage
+        bomberos_danos: Firefighters percentage
+        papeleria_danos: Fixed paperwork expense
+
+    Returns:
+        Monthly payment amount
+    """
+    if monto_asegurar <= 0:
+        return 0
+
+    return prima_mensual_danos(monto_asegurar, porcentaje_seguro_danos,
+                               impuesto_danos, bomberos_danos,
+                               papeleria_danos)
+
+
+def calcular_seguro_vehiculo(monto_vehiculo, porcentaje_seguro_vehiculo,
+                             impuesto_vehiculo, gasto_vehiculo):
+    """
+    Calculate vehicle insurance based on amount, percentage, tax and expenses.
+
+    Args:
+        monto_vehiculo: Vehicle value
+        porcentaje_seguro_vehiculo: Insurance percentage
+        impuesto_vehiculo: Tax percentage (e.g., 15%)
+        gasto_vehiculo: Fixed expense amount
+
+    Returns:
+        Monthly payment amount
+    """
+    if monto_vehiculo <= 0:
+        return 0
+
+    return prima_mensual_vehiculo(monto_vehiculo, porcentaje_seguro_vehiculo,
+                                  impuesto_vehiculo, gasto_vehiculo)
+
+
+def seguro_por_pago(pago_mensual, frecuencia, pagos_por_año):
+    """
+    Split a monthly insurance charge into the charge for one payment.
+
+    Args:
+        pago_mensual: Monthly insurance charge
+        frecuencia: Payment frequency
+        pagos_por_año: Payments per year for the frequency
+
+    Returns:
+        Insurance amount charged on each payment
+    """
+    if frecuencia in DIVISOR_MENSUAL:
+        return pago_mensual / DIVISOR_MENSUAL[frecuencia]
+
+    # For other frequencies, calculate proportionally
+    pagos_mensuales = pagos_por_año / 12 if pagos_por_año > 0 else 0
+    return pago_mensual / pagos_mensuales if pagos_mensuales > 0 else 0
@@ -0,0 +1,607 @@
+"""
+Local HTTP JSON API over the calculation engine.
+
+    python -m calculo_cuotas servir --puerto 8000
+
+Endpoints (request and response bodies are JSON; loans are objects keyed
+as COLUMNAS_PRESTAMO, with optional insurance fields):
+
+    POST /prestamo          summary and full schedule of one loan
+    POST /resumen           summary of one loan, without the schedule
+    POST /lote              summaries of a list of loans, in one
+                            vectorized resumir_cartera pass
+    POST /seguros/danos     monthly damage insurance (calcular_seguro_danos)
+    POST /seguros/vehiculo  monthly vehicle insurance
+    GET  /salud             liveness and cache statistics
+    GET  /metrics           stage metrics in the Prometheus text format
+
+/prestamo and /lote answer NDJSON (one row or loan per line) instead of a
+single JSON document with ?formato=ndjson or 'Accept: application/x-ndjson'.
+Large bodies are sent with chunked transfer encoding as they are
+serialized, so a 10,800-row schedule starts arriving before it is fully
+encoded.
+
+The server is a small HTTP/1.1 implementation on asyncio with keep-alive,
+so it needs nothing beyond the standard library. The event loop only
+parses and writes; pricing and serialization run in a thread pool.
+Response bodies are cached (CACHE_RESPUESTAS) under the raw request body
+and under the normalized loans, so a repeated quote is answered without
+touching the engine, and a byte-identical one without even parsing it.
+Concurrent identical requests are computed once and shared.
+"""
+import asyncio
+import json
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .cache import CacheCalculos, clave_prestamo
+from .cartera import BANDERAS_SEGURO, COLUMNAS_PRESTAMO, normalizar_banderas
+from .metricas import REGISTRO_METRICAS, medir
+from .motor import FREQ_DICT
+
+_LOG = logging.getLogger(__name__)
+
+# Encoded response bodies, keyed by route, format and normalized request
+CACHE_RESPUESTAS = CacheCalculos(max_entradas=1024,
+                                 max_bytes=64 * 1024 * 1024, medir=len)
+
+# Largest request body also used verbatim as a cache key, in bytes
+MAX_CLAVE_CUERPO = 64 * 1024
+
+# Rows (or loans) serialized per chunk of a streamed response
+FILAS_POR_BLOQUE = 2000
+
+# Longest accepted term: a 'Diario' schedule of 36,000 rows
+MAX_PLAZO_MESES = 1200
+
+_TIPOS_CUOTA = ('Nivelada', 'Saldos Insolutos')
+_CAMPOS_DANOS = ("monto_asegurar", "porcentaje_seguro_danos",
+                 "impuesto_danos", "bomberos_danos", "papeleria_danos")
+_CAMPOS_VEHICULO = ("monto_vehiculo", "porcentaje_seguro_vehiculo",
+                    "impuesto_vehiculo", "gasto_vehiculo")
+# Insurance inputs, which the form also keeps at zero or above
+_NO_NEGATIVOS = ("porcentaje_seguro",) + _CAMPOS_DANOS + _CAMPOS_VEHICULO
+
+_JSON = "application/json; charset=utf-8"
+_NDJSON = "application/x-ndjson; charset=utf-8"
+
+
+class ErrorSolicitud(Exception):
+    """A request the API rejects, answered with estado and the message."""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _numero(datos, campo):
+    valor = datos[campo]
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or \
+            not math.isfinite(valor):
+        raise ErrorSolicitud(f"'{campo}' must be a finite number")
+    return valor
+
+
+def _no_negativo(datos, campo):
+    valor = _numero(datos, campo)
+    if valor < 0:
+        raise ErrorSolicitud(f"'{campo}' must not be negative")
+    return valor
+
+
+def leer_prestamo(datos):
+    """
+    Validate one loan of a request body.
+
+    Args:
+        datos: Dict keyed as COLUMNAS_PRESTAMO; insurance flags may be
+            'Sí'/'No' or booleans and optional fields may be missing
+
+    Returns:
+        Tuple of calcular_cuotas_df positional arguments
+
+    Raises:
+        ErrorSolicitud: If a field is missing, unknown or out of range
+    """
+    if not isinstance(datos, dict):
+        raise ErrorSolicitud("Each loan must be a JSON object")
+    desconocidos = set(datos) - set(COLUMNAS_PRESTAMO)
+    if desconocidos:
+        raise ErrorSolicitud(f"Unknown field: {sorted(desconocidos)[0]!r}")
+
+    argumentos = []
+    for campo, defecto in COLUMNAS_PRESTAMO.items():
+        if campo not in datos:
+            if defecto is None:
+                raise ErrorSolicitud(f"Missing field: {campo!r}")
+            argumentos.append(defecto)
+        elif campo == "frecuencia":
+            if datos[campo] not in FREQ_DICT:
+                raise ErrorSolicitud(
+                    f"'frecuencia' must be one of {list(FREQ_DICT)}")
+            argumentos.append(datos[campo])
+        elif campo == "tipo_cuota":
+            if datos[campo] not in _TIPOS_CUOTA:
+                raise ErrorSolicitud(
+                    f"'tipo_cuota' must be one of {list(_TIPOS_CUOTA)}")
+            argumentos.append(datos[campo])
+        elif campo in BANDERAS_SEGURO:
+            bandera = datos[campo]
+            if not isinstance(bandera, bool) and bandera not in ('Sí', 'No'):
+                raise ErrorSolicitud(f"'{campo}' must be 'Sí', 'No' or a "
+                                     "boolean")
+            argumentos.append(bandera)
+        elif campo == "plazo_meses":
+            plazo = _numero(datos, campo)
+            if plazo != int(plazo) or plazo < 1:
+                raise ErrorSolicitud("'plazo_meses' must be a positive "
+                                     "whole number of months")
+            if plazo > MAX_PLAZO_MESES:
+                raise ErrorSolicitud(f"'plazo_meses' must not exceed "
+                                     f"{MAX_PLAZO_MESES}")
+            argumentos.append(int(plazo))
+        elif campo in _NO_NEGATIVOS:
+            argumentos.append(_no_negativo(datos, campo))
+        else:
+            argumentos.append(_numero(datos, campo))
+    if argumentos[0] <= 0:
+        raise ErrorSolicitud("'monto' must be positive")
+    if argumentos[1] < 0:
+        raise ErrorSolicitud("'tasa_anual' must not be negative")
+    return tuple(normalizar_banderas(
+        dict(zip(COLUMNAS_PRESTAMO, argumentos))).values())
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _resumen(argumentos):
+    """resumir_prestamo, rejecting loans that have no valid schedule."""
+    from .cartera import resumir_prestamo
+
+    resumen = resumir_prestamo(*argumentos)
+    if resumen["Pagos"] == 0:
+        raise ErrorSolicitud("The term holds no whole payment", 422)
+    if math.isnan(resumen["Primera Cuota"]) and argumentos[1] == 0 and \
+            argumentos[4] == 'Nivelada':
+        raise ErrorSolicitud("A level payment needs a positive rate", 422)
+    # NaN or overflowing amounts (e.g. monto=1e308) cannot be encoded
+    if not all(math.isfinite(valor) for valor in resumen.values()):
+        raise ErrorSolicitud("The loan has no valid schedule", 422)
+    return resumen
+
+
+def _bloques(df, ndjson):
+    """Encoded chunks of the rows of df, as JSON arrays or NDJSON lines."""
+    for desde in range(0, len(df), FILAS_POR_BLOQUE):
+        bloque = df.iloc[desde:desde + FILAS_POR_BLOQUE]
+        if ndjson:
+            texto = bloque.to_json(orient="records", lines=True,
+                                   force_ascii=False).rstrip("\n") + "\n"
+        else:
+            texto = bloque.to_json(orient="values", force_ascii=False)[1:-1]
+            if desde:
+                texto = "," + texto
+        yield texto.encode("utf-8")
+
+
+def _objeto(cuerpo):
+    if not isinstance(cuerpo, dict):
+        raise ErrorSolicitud("The body must be a JSON object")
+    return dict(cuerpo)
+
+
+def _preparar_prestamo(cuerpo):
+    """Validated input and cache key of POST /prestamo."""
+    datos = _objeto(cuerpo)
+    exacto = datos.pop("centavos", False)
+    if not isinstance(exacto, bool):
+        raise ErrorSolicitud("'centavos' must be a boolean")
+    argumentos = leer_prestamo(datos)
+    return (argumentos, exacto), (clave_prestamo(*argumentos), exacto)
+
+
+def _prestamo(entrada, ndjson):
+    """Body chunks of POST /prestamo."""
+    from .motor import calcular_cuotas_df
+
+    argumentos, exacto = entrada
+    resumen = _resumen(argumentos)
+    df = calcular_cuotas_df(*argumentos, exacto=exacto)
+    if ndjson:
+        yield from _bloques(df, True)
+        return
+    yield (b'{"resumen":' + _json(resumen) + b',"columnas":' +
+           _json(list(df.columns)) + b',"filas":[')
+    yield from _bloques(df, False)
+    yield b"]}"
+
+
+def _preparar_resumen(cuerpo):
+    """Validated input and cache key of POST /resumen."""
+    argumentos = leer_prestamo(cuerpo)
+    return argumentos, clave_prestamo(*argumentos)
+
+
+def _resumen_ruta(argumentos, ndjson):
+    """Body of POST /resumen."""
+    yield _json(_resumen(argumentos))
+
+
+def _preparar_lote(cuerpo):
+    """Validated input and cache key of POST /lote."""
+    prestamos = cuerpo.get("prestamos") if isinstance(cuerpo, dict) \
+        else cuerpo
+    if not isinstance(prestamos, list) or not prestamos:
+        raise ErrorSolicitud("The body must be a non-empty list of loans "
+                             "or an object with a 'prestamos' list")
+    filas = []
+    for i, datos in enumerate(prestamos):
+        try:
+            filas.append(leer_prestamo(datos))
+        except ErrorSolicitud as error:
+            raise ErrorSolicitud(f"Loan {i}: {error}") from None
+    return filas, tuple(clave_prestamo(*fila) for fila in filas)
+
+
+def _lote(filas, ndjson):
+    """Body chunks of POST /lote."""
+    from .cartera import resumir_cartera
+
+    columnas = dict(zip(COLUMNAS_PRESTAMO, map(list, zip(*filas))))
+    resumen = resumir_cartera(columnas)
+    if ndjson:
+        yield from _bloques(resumen, True)
+        return
+    yield b'{"columnas":' + _json(list(resumen.columns)) + b',"filas":['
+    yield from _bloques(resumen, False)
+    yield b"]}"
+
+
+def _preparador_seguro(campos):
+    """Validating function of an insurance endpoint with these fields."""
+    def preparar(cuerpo):
+        datos = _objeto(cuerpo)
+        frecuencia = datos.pop("frecuencia", None)
+        if frecuencia is not None and frecuencia not in FREQ_DICT:
+            raise ErrorSolicitud(
+                f"'frecuencia' must be one of {list(FREQ_DICT)}")
+        desconocidos = set(datos) - set(campos)
+        if desconocidos:
+            raise ErrorSolicitud(
+                f"Unknown field: {sorted(desconocidos)[0]!r}")
+        for campo in campos:
+            if campo not in datos:
+                raise ErrorSolicitud(f"Missing field: {campo!r}")
+        entrada = (tuple(float(_no_negativo(datos, c)) for c in campos),
+                   frecuencia)
+        return entrada, entrada
+    return preparar
+
+
+def _seguro(entrada, calcular):
+    """Body of the insurance endpoints: the monthly and per-payment charge."""
+    from .seguros import seguro_por_pago
+
+    argumentos, frecuencia = entrada
+    mensual = float(calcular(*argumentos))
+    respuesta = {"pago_mensual": mensual}
+    if frecuencia is not None:
+        respuesta["frecuencia"] = frecuencia
+        respuesta["pago_por_cuota"] = float(
+            seguro_por_pago(mensual, frecuencia, FREQ_DICT[frecuencia]))
+    yield _json(respuesta)
+
+
+def _seguro_danos(entrada, ndjson):
+    from .seguros import calcular_seguro_danos
+    return _seguro(entrada, calcular_seguro_danos)
+
+
+def _seguro_vehiculo(entrada, ndjson):
+    from .seguros import calcular_seguro_vehiculo
+    return _seguro(entrada, calcular_seguro_vehiculo)
+
+
+# Route -> (function validating the parsed body into (input, cache key),
+# function of the input and the NDJSON flag yielding encoded chunks,
+# whether the route can answer NDJSON)
+RUTAS = {
+    "/prestamo": (_preparar_prestamo, _prestamo, True),
+    "/resumen": (_preparar_resumen, _resumen_ruta, False),
+    "/lote": (_preparar_lote, _lote, True),
+    "/seguros/danos": (_preparador_seguro(_CAMPOS_DANOS), _seguro_danos,
+                       False),
+    "/seguros/vehiculo": (_preparador_seguro(_CAMPOS_VEHICULO),
+                          _seguro_vehiculo, False),
+}
+
+
+def _preparar(preparar, cuerpo):
+    """Parse and validate a request body, in a worker thread."""
+    try:
+        datos = json.loads(cuerpo)
+    except ValueError:
+        raise ErrorSolicitud("The body is not valid JSON") from None
+    return preparar(datos)
+
+
+class ServicioCalculo:
+    """
+    The HTTP API server.
+
+    Args:
+        cache: CacheCalculos of encoded responses (defaults to
+            CACHE_RESPUESTAS; CacheCalculos(max_entradas=0) disables it)
+        max_workers: Threads pricing and serializing requests
+        max_cuerpo: Largest accepted request body, in bytes
+        inactividad: Seconds an idle keep-alive connection is kept open
+    """
+
+    def __init__(self, cache=None, max_workers=None,
+                 max_cuerpo=32 * 1024 * 1024, inactividad=30.0):
+        self.cache = CACHE_RESPUESTAS if cache is None else cache
+        self.max_cuerpo = max_cuerpo
+        self.inactividad = inactividad
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="servicio")
+        self._en_curso = {}  # normalized key -> future of the body
+
+    async def iniciar(self, direccion="127.0.0.1", puerto=8000):
+        """Start listening; returns the asyncio.Server."""
+        return await asyncio.start_server(self._conexion, direccion, puerto)
+
+    def cerrar(self):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _leer_linea(self, reader, estado, mensaje):
+        """Next line of the request head; too long lines are rejected."""
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # The stream cannot resync after this; the connection closes
+            raise ErrorSolicitud(mensaje, estado) from None
+
+    async def _leer_solicitud(self, reader):
+        """(method, target, headers, body) of the next request, or None."""
+        linea = await asyncio.wait_for(
+            self._leer_linea(reader, 400, "Request line too long"),
+            self.inactividad)
+        if not linea:
+            return None
+        partes = linea.decode("latin-1").split()
+        if len(partes) != 3 or not partes[2].startswith("HTTP/"):
+            raise ErrorSolicitud("Malformed request line")
+        metodo, destino, version = partes
+
+        cabeceras = {}
+        while True:
+            linea = await self._leer_linea(reader, 431,
+                                           "Request header too long")
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        if version == "HTTP/1.0" and \
+                cabeceras.get("connection", "").lower() != "keep-alive":
+            cabeceras["connection"] = "close"
+        if "chunked" in cabeceras.get("transfer-encoding", "").lower():
+            raise ErrorSolicitud("Chunked request bodies are not supported",
+                                 411)
+        try:
+            largo = int(cabeceras.get("content-length", 0))
+        except ValueError:
+            raise ErrorSolicitud("Invalid Content-Length") from None
+        if largo < 0:
+            raise ErrorSolicitud("Invalid Content-Length")
+        if largo > self.max_cuerpo:
+            raise ErrorSolicitud("Request body too large", 413)
+        cuerpo = await reader.readexactly(largo) if largo else b""
+        return metodo, destino, cabeceras, cuerpo
+
+    async def _conexion(self, reader, writer):
+        try:
+            while True:
+                try:
+                    solicitud = await self._leer_solicitud(reader)
+                except ErrorSolicitud as error:
+                    await self._enviar(writer, error.estado, _JSON,
+                                       _json({"error": str(error)}), False)
+                    break
+                if solicitud is None:
+                    break
+                seguir = solicitud[2].get("connection", "").lower() != "close"
+                await self._atender(writer, *solicitud, seguir)
+                if not seguir:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _enviar(self, writer, estado, tipo, cuerpo, seguir):
+        """Write a response whose whole body is known."""
+        writer.write(_cabeceras(estado, tipo, seguir, len(cuerpo)) + cuerpo)
+        await writer.drain()
+
+    async def _atender(self, writer, metodo, destino, cabeceras, cuerpo,
+                       seguir):
+        url = urlsplit(destino)
+        ruta = url.path.rstrip("/") or "/"
+        with medir(f"api{ruta}" if ruta in RUTAS else "api") as medicion:
+            if metodo == "GET" and ruta == "/salud":
+                respuesta = {"estado": "ok",
+                             "cache": self.cache.estadisticas()}
+                await self._enviar(writer, 200, _JSON, _json(respuesta),
+                                   seguir)
+                return
+            if metodo == "GET" and ruta == "/metrics":
+                texto = REGISTRO_METRICAS.texto_prometheus().encode("utf-8")
+                await self._enviar(writer, 200, "text/plain; version=0.0.4; "
+                                   "charset=utf-8", texto, seguir)
+                return
+            if ruta not in RUTAS:
+                await self._error(writer, 404, "Not found", seguir)
+                return
+            if metodo != "POST":
+                await self._error(writer, 405, "Use POST", seguir)
+                return
+
+            preparar, generar, acepta_ndjson = RUTAS[ruta]
+            formato = parse_qs(url.query).get("formato", [""])[0]
+            ndjson = acepta_ndjson and (
+                formato == "ndjson" or
+                "application/x-ndjson" in cabeceras.get("accept", ""))
+            tipo = _NDJSON if ndjson else _JSON
+
+            # A byte-identical body is answered before parsing it; an
+            # equivalent one after validation, by its normalized key
+            # (large bodies are not kept as keys, their size is not capped)
+            claves = [(ruta, ndjson, cuerpo)] \
+                if len(cuerpo) <= MAX_CLAVE_CUERPO else []
+            guardado = self.cache.buscar(claves[0]) if claves else None
+            if guardado is None:
+                try:
+                    entrada, clave = await asyncio.get_running_loop(
+                    ).run_in_executor(self._executor, _preparar, preparar,
+                                      cuerpo)
+                except ErrorSolicitud as error:
+                    await self._error(writer, error.estado, str(error),
+                                      seguir)
+                    return
+                clave = (ruta, ndjson, clave)
+                guardado = self.cache.buscar(clave)
+                if guardado is not None and claves:
+                    self.cache.guardar(claves[0], guardado)
+                claves.append(clave)
+            while guardado is None and clave in self._en_curso:
+                # The same request is being computed for another client;
+                # None means it failed there, so it is tried again here
+                # (unless yet another client took it over meanwhile)
+                guardado = await asyncio.shield(self._en_curso[clave])
+            if guardado is not None:
+                medicion.bytes = len(guardado)
+                await self._enviar(writer, 200, tipo, guardado, seguir)
+                return
+
+            futuro = asyncio.get_running_loop().create_future()
+            self._en_curso[clave] = futuro
+            respuesta = None
+            try:
+                respuesta = await self._transmitir(
+                    writer, generar(entrada, ndjson), tipo, claves, seguir)
+            finally:
+                # Waiters are released first, whatever happens below
+                futuro.set_result(respuesta)
+                if self._en_curso.get(clave) is futuro:
+                    del self._en_curso[clave]
+            medicion.bytes = len(respuesta or b"")
+
+    async def _transmitir(self, writer, bloques, tipo, claves, seguir):
+        """
+        Send the chunks of a generator as they are produced.
+
+        The first chunk is produced before the headers go out, so
+        validation errors still get a proper status. A body that fits in
+        one chunk is sent with Content-Length, a longer one with chunked
+        transfer encoding. The joined body is cached under every key of
+        claves and returned (None when an error was answered instead).
+        """
+        bucle = asyncio.get_running_loop()
+        siguiente = _siguiente(bloques)
+        try:
+            primero = await bucle.run_in_executor(self._executor, siguiente)
+            segundo = None if primero is None else \
+                await bucle.run_in_executor(self._executor, siguiente)
+        except ErrorSolicitud as error:
+            await self._error(writer, error.estado, str(error), seguir)
+            return None
+        except ZeroDivisionError:
+            await self._error(writer, 422, "The loan has no valid schedule",
+                              seguir)
+            return None
+        except Exception:
+            _LOG.exception("Error answering a request")
+            await self._error(writer, 500, "Internal error", seguir)
+            return None
+
+        if segundo is None:
+            cuerpo = primero or b""
+            await self._enviar(writer, 200, tipo, cuerpo, seguir)
+            for clave in claves:
+                self.cache.guardar(clave, cuerpo)
+            return cuerpo
+
+        writer.write(_cabeceras(200, tipo, seguir, None))
+        enviados = []
+        bloque = primero
+        while bloque is not None:
+            enviados.append(bloque)
+            writer.write(b"%x\r\n%s\r\n" % (len(bloque), bloque))
+            await writer.drain()
+            bloque = segundo if len(enviados) == 1 else \
+                await bucle.run_in_executor(self._executor, siguiente)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        cuerpo = b"".join(enviados)
+        for clave in claves:
+            self.cache.guardar(clave, cuerpo)
+        return cuerpo
+
+    async def _error(self, writer, estado, mensaje, seguir):
+        await self._enviar(writer, estado, _JSON, _json({"error": mensaje}),
+                           seguir)
+
+
+def _siguiente(bloques):
+    """Function returning the next non-empty chunk, or None at the end."""
+    def siguiente():
+        for bloque in bloques:
+            if bloque:
+                return bloque
+        return None
+    return siguiente
+
+
+def _cabeceras(estado, tipo, seguir, largo):
+    """Status line and headers; largo None means chunked encoding."""
+    lineas = [f"HTTP/1.1 {estado} {HTTPStatus(estado).phrase}",
+              f"Content-Type: {tipo}",
+              "Connection: " + ("keep-alive" if seguir else "close")]
+    if largo is None:
+        lineas.append("Transfer-Encoding: chunked")
+    else:
+        lineas.append(f"Content-Length: {largo}")
+    return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1")
+
+
+def servir(puerto=8000, direccion="127.0.0.1", max_workers=None):
+    """
+    Run the API until interrupted.
+
+    Args:
+        puerto: TCP port to listen on
+        direccion: Address to bind (the default only accepts local
+            connections)
+        max_workers: Threads pricing and serializing requests
+    """
+    servicio = ServicioCalculo(max_workers=max_workers)
+
+    async def principal():
+        servidor = await servicio.iniciar(direccion, puerto)
+        async with servidor:
+            await servidor.serve_forever()
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.cerrar()
@@ -0,0 +1,299 @@
+"""
+Monte Carlo interest-rate risk of a variable-rate portfolio.
+
+generar_trayectorias draws seeded paths of a reference rate, one value per
+reset period. simular_tasas reprices every loan of a portfolio under every
+path: a loan pays its own rate plus the change of the reference rate since
+disbursement (never below zero), reset every cada_meses months from
+disbursement, as reajustes_periodicos does for one loan.
+
+No schedule is built. Within a reset period a loan is an ordinary
+fixed-rate loan, so the cuotas, interest and closing balance of the period
+have a closed form (cuota_tramo, saldo_tramo), and each period is one
+array operation over a loans x paths matrix. Paths are priced in chunks
+sized to a memory budget, spread over worker processes that receive the
+portfolio once, when they start.
+"""
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .metricas import medir
+from .tasa_variable import cuota_tramo, saldo_tramo
+
+# Per-period measures of a simulation
+MEDIDAS_SIMULACION = ("Cuotas", "Intereses", "Saldo")
+
+# Loans priced by the worker processes, set by _iniciar_trabajador
+_PRESTAMOS = None
+
+# Arrays of loans x paths alive at once while pricing a period
+_TEMPORALES = 12
+
+
+def generar_trayectorias(tasa_inicial, n_trayectorias, n_periodos,
+                         volatilidad, reversion=0.0, media=None, semilla=None):
+    """
+    Seeded paths of a mean-reverting reference rate.
+
+    Each period the rate moves by reversion * (media - rate) plus a normal
+    shock of standard deviation volatilidad (a random walk when reversion
+    is 0).
+
+    Args:
+        tasa_inicial: Reference rate (%) during the first period
+        n_trayectorias: Number of paths
+        n_periodos: Number of reset periods, the first one included
+        volatilidad: Standard deviation of the change per period, in
+            percentage points
+        reversion: Share of the gap to media closed every period (0 to 1)
+        media: Long-run rate (%); defaults to tasa_inicial
+        semilla: Seed of the generator; the same seed gives the same paths
+
+    Returns:
+        Array of shape (n_trayectorias, n_periodos) with the rate (%) of
+        every period; the first column is tasa_inicial
+    """
+    if n_trayectorias < 1 or n_periodos < 1:
+        raise ValueError("n_trayectorias and n_periodos must be positive")
+    if not 0 <= reversion <= 1:
+        raise ValueError("reversion must be between 0 and 1")
+    media = tasa_inicial if media is None else media
+
+    choques = np.random.default_rng(semilla).standard_normal(
+        (n_trayectorias, n_periodos - 1)) * volatilidad
+    trayectorias = np.empty((n_trayectorias, n_periodos))
+    trayectorias[:, 0] = tasa_inicial
+    for s in range(1, n_periodos):
+        anterior = trayectorias[:, s - 1]
+        trayectorias[:, s] = anterior + reversion * (media - anterior) + \
+            choques[:, s - 1]
+    return trayectorias
+
+
+class SimulacionTasas(
+        namedtuple("SimulacionTasas",
+                   ["meses", "cuotas", "intereses", "saldos"])):
+    """
+    Portfolio cash flows under every simulated path.
+
+    Row i of cuotas, intereses and saldos is path i; column s is the reset
+    period that ends at month meses[s]. cuotas and intereses are the totals
+    due by the portfolio during the period (before insurance) and saldos
+    the balance left at its end.
+    """
+    __slots__ = ()
+
+    @property
+    def total_intereses(self):
+        """Interest over the whole life of the portfolio, per path."""
+        return self.intereses.sum(axis=1)
+
+    def percentiles(self, q=(5, 50, 95)):
+        """
+        Percentiles across paths of every measure, by period.
+
+        Args:
+            q: Percentiles to report, between 0 and 100
+
+        Returns:
+            DataFrame with one row per period: 'Periodo', 'Mes' (its last
+            month) and one '<measure> P<q>' column per measure of
+            MEDIDAS_SIMULACION and percentile
+        """
+        import pandas as pd
+
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        columnas = {"Periodo": np.arange(1, len(self.meses) + 1),
+                    "Mes": self.meses}
+        for medida, valores in zip(MEDIDAS_SIMULACION,
+                                   (self.cuotas, self.intereses,
+                                    self.saldos)):
+            for qi, fila in zip(q, np.percentile(valores, q, axis=0)):
+                columnas[f"{medida} P{qi:g}"] = fila
+        return pd.DataFrame(columnas)
+
+
+def _prestamos_simulacion(prestamos, cada_meses):
+    """
+    Per-loan inputs of the simulation, from portfolio columns.
+
+    Returns:
+        (dict of arrays for the loans with periodic payments, their
+        boundaries, end month of every period, path-independent per-period
+        cuotas, interest and balance of the 'Al vencimiento' loans)
+    """
+    from .cartera import leer_cartera, parametros_cartera
+
+    p = parametros_cartera(prestamos)
+    plazo_meses = leer_cartera(prestamos)["plazo_meses"].astype(float)
+    con_pagos = p["n_pagos"] >= 1
+    periodicos = con_pagos & ~p["al_vencimiento"]
+    vencimiento = con_pagos & p["al_vencimiento"]
+
+    pagos_por_año = p["pagos_por_año"][periodicos]
+    n_pagos = p["n_pagos"][periodicos]
+    # Month of the last payment, and the number of periods it falls in
+    ultimo_mes = np.concatenate((n_pagos * 12 / pagos_por_año,
+                                 plazo_meses[vencimiento]))
+    n_periodos = int(np.ceil(ultimo_mes.max() / cada_meses - 1e-9)) \
+        if len(ultimo_mes) else 0
+    meses = cada_meses * np.arange(1, n_periodos + 1)
+
+    # Payments made by the end of every period: period s holds the
+    # payments limites[:, s] + 1 to limites[:, s + 1]
+    limites = np.minimum(
+        np.floor(np.concatenate(([0], meses))[None, :] *
+                 pagos_por_año[:, None] / 12 + 1e-9).astype(np.int64),
+        n_pagos[:, None])
+    periodicos = {
+        "monto": p["monto"][periodicos],
+        "tasa_anual": p["tasa_periodo"][periodicos] * pagos_por_año * 100,
+        "pagos_por_año": pagos_por_año,
+        "n_pagos": n_pagos,
+        "nivelada": p["nivelada"][periodicos],
+        "abono_fijo": p["abono_fijo"][periodicos],
+        "limites": limites,
+    }
+
+    # 'Al vencimiento' loans pay once, at their fixed rate
+    periodo = np.ceil(plazo_meses[vencimiento] / cada_meses - 1e-9).astype(
+        np.int64) - 1
+    monto = p["monto"][vencimiento]
+    interes = monto * p["tasa_periodo"][vencimiento]
+    pagado = np.bincount(periodo, monto, minlength=n_periodos)
+    fijos = np.stack((
+        pagado + np.bincount(periodo, interes, minlength=n_periodos),
+        np.bincount(periodo, interes, minlength=n_periodos),
+        np.cumsum(pagado[::-1])[::-1] - pagado))
+    return periodicos, meses, fijos
+
+
+def _iniciar_trabajador(prestamos):
+    """Worker initializer: keep the loans of the simulation."""
+    global _PRESTAMOS
+    _PRESTAMOS = prestamos
+
+
+def _simular_lote(inicio, variaciones, prestamos=None):
+    """
+    Worker: price every loan under one chunk of paths.
+
+    Args:
+        inicio: Index of the first path of the chunk
+        variaciones: Change of the reference rate since disbursement
+            (percentage points), one row per path and column per period
+        prestamos: Loans from _prestamos_simulacion (defaults to those
+            given to the worker initializer)
+
+    Returns:
+        (inicio, cuotas, intereses, saldos), each summed over the loans,
+        one row per path and column per period
+    """
+    p = _PRESTAMOS if prestamos is None else prestamos
+    n_trayectorias, n_periodos = variaciones.shape
+    resultado = np.zeros((3, n_trayectorias, n_periodos))
+    saldo = np.broadcast_to(p["monto"][:, None],
+                            (len(p["monto"]), n_trayectorias))
+
+    for s in range(n_periodos):
+        if not len(saldo):
+            break
+        desde, hasta = p["limites"][:, s], p["limites"][:, s + 1]
+        n_pagos = p["n_pagos"][:, None]
+        t = (hasta - desde)[:, None]
+        tasa = np.maximum(p["tasa_anual"][:, None] + variaciones[:, s],
+                          0) / 100 / p["pagos_por_año"][:, None]
+        nivelada = p["nivelada"][:, None]
+        abono_fijo = p["abono_fijo"][:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # 'Nivelada': the cuota is recomputed over the payments left
+            cuota = cuota_tramo(saldo, tasa, n_pagos - desde[:, None])
+            saldo_fin = np.where(nivelada, saldo_tramo(saldo, tasa, cuota, t),
+                                 saldo - abono_fijo * t)
+        saldo_fin = np.where(hasta[:, None] == n_pagos, 0.0,
+                             np.maximum(saldo_fin, 0))
+        intereses = np.where(
+            nivelada, t * cuota - (saldo - saldo_fin),
+            tasa * (t * saldo - abono_fijo * t * (t - 1) / 2))
+        cuotas = np.where(nivelada, t * cuota, abono_fijo * t + intereses)
+
+        resultado[0, :, s] = cuotas.sum(axis=0)
+        resultado[1, :, s] = intereses.sum(axis=0)
+        resultado[2, :, s] = saldo_fin.sum(axis=0)
+
+        # Loans paid off in the period drop out
+        siguen = hasta < p["n_pagos"]
+        saldo = saldo_fin[siguen]
+        if not siguen.all():
+            p = {nombre: valores[siguen] for nombre, valores in p.items()}
+    return (inicio, *resultado)
+
+
+def simular_tasas(prestamos, trayectorias, cada_meses, max_workers=None,
+                  trayectorias_por_lote=None, memoria_lote=64 * 2**20):
+    """
+    Cash flows of a variable-rate portfolio under simulated rate paths.
+
+    Args:
+        prestamos: DataFrame or mapping of loan parameter columns (see
+            COLUMNAS_PRESTAMO); every loan is taken from its disbursement
+            and tasa_anual is its rate in the first period
+        trayectorias: Reference rate (%) by path and period, as returned
+            by generar_trayectorias; the last period's rate holds when the
+            portfolio runs longer
+        cada_meses: Months between two resets
+        max_workers: Number of worker processes (defaults to the CPU count)
+        trayectorias_por_lote: Number of paths per worker task; defaults to
+            as many as fit in memoria_lote
+        memoria_lote: Approximate bytes of working memory of one task
+
+    Returns:
+        SimulacionTasas; 'Al vencimiento' loans pay at their fixed rate
+    """
+    if cada_meses <= 0:
+        raise ValueError("cada_meses must be positive")
+    trayectorias = np.atleast_2d(np.asarray(trayectorias, dtype=float))
+    n_trayectorias = len(trayectorias)
+    if isinstance(prestamos, (str, os.PathLike)):
+        from .paralelo import leer_archivo_cartera
+        prestamos = leer_archivo_cartera(prestamos)
+
+    periodicos, meses, fijos = _prestamos_simulacion(prestamos, cada_meses)
+    n_periodos = len(meses)
+    columnas = np.minimum(np.arange(n_periodos), trayectorias.shape[1] - 1)
+    variaciones = trayectorias[:, columnas] - trayectorias[:, :1]
+
+    if trayectorias_por_lote is None:
+        trayectorias_por_lote = max(1, memoria_lote // (
+            8 * _TEMPORALES * max(1, len(periodicos["monto"]))))
+    if trayectorias_por_lote < 1:
+        raise ValueError("trayectorias_por_lote must be at least 1")
+
+    resultado = np.empty((3, n_trayectorias, n_periodos))
+    resultado[:] = fijos[:, None, :]
+    max_workers = max_workers or os.cpu_count() or 1
+    with medir("simulacion", filas=n_trayectorias * len(periodicos["monto"])):
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_iniciar_trabajador,
+                                 initargs=(periodicos,)) as executor:
+            pendientes = deque()
+
+            def recibir(futuro):
+                inicio, *lote = futuro.result()
+                hasta = inicio + len(lote[0])
+                for destino, valores in zip(resultado, lote):
+                    destino[inicio:hasta] += valores
+
+            for inicio in range(0, n_trayectorias, trayectorias_por_lote):
+                if len(pendientes) >= 2 * max_workers:
+                    recibir(pendientes.popleft())
+                pendientes.append(executor.submit(
+                    _simular_lote, inicio, np.ascontiguousarray(
+                        variaciones[inicio:inicio + trayectorias_por_lote])))
+            while pendientes:
+                recibir(pendientes.popleft())
+    return SimulacionTasas(meses, *resultado)
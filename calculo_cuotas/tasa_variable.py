@@ -0,0 +1,232 @@
+"""
+Variable-rate loans: schedules whose rate is reset on given payments.
+
+A rate path is a list of (payment number, new annual rate) pairs; the new
+rate applies from the interest of that payment on. Between two resets
+the loan is an ordinary fixed-rate loan that starts from the balance left
+by the previous segment, so every segment has a closed form:
+
+- 'Nivelada': the cuota is recomputed at each reset to repay the balance
+  over the remaining payments at the new rate, and the balance within
+  the segment is the closed-form annuity balance from there.
+- 'Saldos Insolutos': the fixed principal payment and the balances do not
+  change; only the interest of each payment follows its rate.
+
+Only the balance at the start of each segment is carried from one segment
+to the next (one scalar step per reset); the rows are then filled for all
+segments at once, from the first reset on.
+"""
+import numpy as np
+
+from .metricas import medir
+from .motor import (COLUMNAS, calcular_base, capa_seguro_danos,
+                    capa_seguro_prestamo, capa_seguro_vehiculo,
+                    combinar_capas)
+
+# Columns of a variable-rate schedule: 'Tasa' is the annual rate (%) of
+# each payment
+COLUMNAS_TASA_VARIABLE = ["Pago", "Tasa"] + COLUMNAS[1:]
+
+
+def cuota_tramo(saldo, tasa_periodo, restantes):
+    """
+    Level payment that repays saldo over restantes payments.
+
+    Like cuota_nivelada, but also valid for a zero rate; works
+    element-wise on arrays.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (1 + tasa_periodo)**restantes
+        cuota = saldo * tasa_periodo * factor / (factor - 1)
+    return np.where(tasa_periodo == 0, saldo / restantes, cuota)
+
+
+def saldo_tramo(saldo, tasa_periodo, cuota, t):
+    """
+    Balance left t level payments of cuota after saldo.
+
+    Valid for a zero rate; works element-wise on arrays.
+    """
+    factor = (1 + tasa_periodo)**t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saldo_t = saldo * factor - cuota * (factor - 1) / tasa_periodo
+    return np.where(tasa_periodo == 0, saldo - cuota * t, saldo_t)
+
+
+def reajustes_periodicos(tasas, cada_meses, frecuencia, desde_mes=None):
+    """
+    Rate path of a loan repriced every cada_meses months.
+
+    Args:
+        tasas: Annual rate (%) of each reset, in order
+        cada_meses: Months between two resets
+        frecuencia: Payment frequency of the loan
+        desde_mes: Month of the first reset (defaults to cada_meses)
+
+    Returns:
+        (pagos, tasas) arrays, ready for the pagos_reajuste and
+        tasas_reajuste arguments; the first payment after each reset
+        date carries the new rate
+    """
+    from .motor import FREQ_DICT
+
+    pagos_por_año = FREQ_DICT[frecuencia]
+    if cada_meses <= 0:
+        raise ValueError("cada_meses must be positive")
+    tasas = np.asarray(tasas, dtype=float)
+    meses = (cada_meses if desde_mes is None else desde_mes) + \
+        cada_meses * np.arange(len(tasas))
+    # Payments made by each reset date, plus one
+    pagos = np.floor(meses * pagos_por_año / 12 + 1e-9).astype(np.int64) + 1
+    return pagos, tasas
+
+
+def _reajustes(n_pagos, pagos_reajuste, tasas_reajuste):
+    """
+    Valid resets sorted by payment; the last one given for a payment wins.
+    """
+    pagos, tasas = np.broadcast_arrays(
+        np.asarray(pagos_reajuste, dtype=np.int64),
+        np.asarray(tasas_reajuste, dtype=float))
+    pagos, tasas = pagos.ravel(), tasas.ravel()
+    if (tasas < 0).any():
+        raise ValueError("tasas_reajuste may not be negative")
+    validos = (pagos >= 1) & (pagos <= n_pagos)
+    pagos, tasas = pagos[validos], tasas[validos]
+    orden = np.argsort(pagos, kind="stable")
+    pagos, tasas = pagos[orden], tasas[orden]
+    ultimo = np.append(pagos[1:] != pagos[:-1], True)[:len(pagos)]
+    return pagos[ultimo], tasas[ultimo]
+
+
+def _inicio_tramos(monto, tasa, inicio, n_pagos):
+    """
+    Balance and level cuota at the start of every segment.
+
+    A plain-float step per segment: with dozens of resets this is cheaper
+    than any array call.
+    """
+    saldo_inicio = np.empty(len(inicio))
+    cuota = np.empty(len(inicio))
+    saldo = float(monto)
+    for s, (r, desde) in enumerate(zip(tasa.tolist(), inicio.tolist())):
+        restantes = n_pagos - desde
+        factor = (1 + r)**restantes
+        cuota[s] = saldo / restantes if r == 0 else \
+            saldo * r * factor / (factor - 1)
+        saldo_inicio[s] = saldo
+        if s + 1 < len(inicio):
+            t = inicio[s + 1] - desde
+            factor = (1 + r)**t
+            saldo = saldo - cuota[s] * t if r == 0 else \
+                saldo * factor - cuota[s] * (factor - 1) / r
+    return saldo_inicio, cuota
+
+
+def aplicar_reajustes(base, pagos_reajuste, tasas_reajuste):
+    """
+    Base layer of a loan after rate resets.
+
+    Args:
+        base: CapaBase in Lempiras (see calcular_base); 'Al vencimiento'
+            loans have a single payment and are returned unchanged
+        pagos_reajuste: Payment number from which each new rate applies
+        tasas_reajuste: New annual rate (%) of each reset
+
+    Returns:
+        CapaBase whose tasa_periodo is the rate of every payment. The
+        term, the insured payments and the balance the loan insurance is
+        priced on are those agreed at disbursement.
+    """
+    n_pagos = len(base.pago)
+    pagos, tasas = _reajustes(n_pagos, pagos_reajuste, tasas_reajuste)
+    if base.pagos_por_año == 0 or not len(pagos):
+        return base
+
+    # Segment s starts after inicio[s] payments at rate tasa[s]; the first
+    # one is the original rate up to the first reset
+    inicio = np.concatenate(([0], pagos - 1))
+    tasa = np.concatenate(([base.tasa_periodo],
+                           tasas / 100 / base.pagos_por_año))
+    desde = inicio[1]
+    largos = np.diff(inicio, append=n_pagos)[1:]
+
+    def por_fila(valores):
+        """Value of every segment from the first reset on, per row."""
+        return np.repeat(valores[1:], largos)
+
+    tasa_fila = por_fila(tasa)
+    saldo_anterior = np.empty(n_pagos - desde)
+    saldo_anterior[:1] = base.saldo[desde - 1] if desde else base.monto
+
+    if base.tipo_cuota == 'Nivelada':
+        saldo_inicio, cuota = _inicio_tramos(base.monto, tasa, inicio,
+                                             n_pagos)
+        cuota_base = por_fila(cuota)
+        saldo = saldo_tramo(por_fila(saldo_inicio), tasa_fila, cuota_base,
+                            np.arange(desde + 1, n_pagos + 1) -
+                            por_fila(inicio))
+        saldo[-1] = 0.0
+        np.maximum(saldo, 0, out=saldo)  # Prevent negative balance
+        saldo_anterior[1:] = saldo[:-1]
+        interes = saldo_anterior * tasa_fila
+        abono = cuota_base - interes
+    else:
+        saldo = base.saldo[desde:]
+        abono = base.abono[desde:]
+        saldo_anterior[1:] = saldo[:-1]
+        interes = saldo_anterior * tasa_fila
+        cuota_base = abono + interes
+
+    return base._replace(
+        cuota=np.concatenate((base.cuota[:desde], cuota_base)),
+        interes=np.concatenate((base.interes[:desde], interes)),
+        abono=np.concatenate((base.abono[:desde], abono)),
+        saldo=np.concatenate((base.saldo[:desde], saldo)),
+        tasa_periodo=np.concatenate((np.full(desde, base.tasa_periodo),
+                                     tasa_fila)))
+
+
+def calcular_cronograma_reajustes(monto, tasa_anual, plazo_meses, frecuencia,
+                                  tipo_cuota, incluir_seguro,
+                                  porcentaje_seguro, incluir_seguro_danos,
+                                  monto_asegurar, porcentaje_seguro_danos,
+                                  impuesto_danos, bomberos_danos,
+                                  papeleria_danos, incluir_seguro_vehiculo,
+                                  monto_vehiculo, porcentaje_seguro_vehiculo,
+                                  impuesto_vehiculo, gasto_vehiculo,
+                                  pagos_reajuste, tasas_reajuste):
+    """
+    Amortization schedule of a variable-rate loan, as a Cronograma.
+
+    Takes the same arguments as calcular_cuotas_df, where tasa_anual is
+    the initial rate, followed by those of aplicar_reajustes.
+
+    Returns:
+        Cronograma with the COLUMNAS_TASA_VARIABLE columns
+    """
+    from .cronograma import Cronograma
+
+    with medir("calculo") as medicion:
+        base = aplicar_reajustes(
+            calcular_base(monto, tasa_anual, plazo_meses, frecuencia,
+                          tipo_cuota), pagos_reajuste, tasas_reajuste)
+        columnas = combinar_capas(
+            base, capa_seguro_prestamo(base, incluir_seguro,
+                                       porcentaje_seguro),
+            capa_seguro_danos(base, incluir_seguro_danos, monto_asegurar,
+                              porcentaje_seguro_danos, impuesto_danos,
+                              bomberos_danos, papeleria_danos),
+            capa_seguro_vehiculo(base, incluir_seguro_vehiculo,
+                                 monto_vehiculo, porcentaje_seguro_vehiculo,
+                                 impuesto_vehiculo, gasto_vehiculo))
+        if base.pagos_por_año:
+            columnas["Tasa"] = np.broadcast_to(
+                base.tasa_periodo * base.pagos_por_año * 100,
+                base.pago.shape)
+        else:
+            columnas["Tasa"] = np.full(1, float(tasa_anual))
+        cronograma = Cronograma.desde_columnas(
+            {nombre: columnas[nombre] for nombre in COLUMNAS_TASA_VARIABLE})
+        medicion.filas = len(cronograma)
+    return cronograma